@@ -0,0 +1,207 @@
+"""Admission control for claim endpoints.
+
+Requests to admitted routes pass two gates before they reach the endpoint:
+
+* a token bucket per tenant (policy number or API client), answered with
+  429 once the tenant has used up its burst;
+* a global cap on requests in flight. Requests over the cap wait in a
+  bounded queue per lane and are answered with 503 when their lane's queue
+  is full or they have waited ``queue_timeout`` seconds.
+
+A freed slot goes to the waiting request in the highest-priority lane (the
+lowest ``priority`` number), so payments are not stuck behind a surge of new
+claims. Both rejections carry Retry-After and cost no database work, which
+keeps latency of the requests that are admitted bounded under overload.
+"""
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Pattern, Tuple
+
+from starlette.responses import JSONResponse
+
+from metrics import observe_admission_wait, record_admission
+
+class Lane(NamedTuple):
+    name: str
+    priority: int  # lower goes first
+    queue_size: int
+    rate_limited: bool = True
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+    def response(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=self.status_code,
+            content={"detail": self.detail},
+            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))},
+        )
+
+class TenantLimiter:
+    """Token buckets of ``burst`` requests refilled at ``rate`` per second, one per tenant.
+
+    Only the ``max_tenants`` most recently seen tenants keep a bucket; an
+    evicted tenant comes back with a full one.
+    """
+
+    def __init__(self, rate: float, burst: float, max_tenants: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_tenants = max_tenants
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, tenant: Hashable) -> float:
+        """Take a token for ``tenant``: 0 if there was one, else seconds until there is"""
+        now = self._clock()
+        bucket = self._buckets.get(tenant)
+        if bucket is None:
+            bucket = self._buckets[tenant] = [self.burst, now]
+            if len(self._buckets) > self.max_tenants:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(tenant)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+class AdmissionController:
+    """At most ``max_in_flight`` admitted requests, the rest queued by lane priority"""
+
+    def __init__(self, max_in_flight: int, queue_timeout: float = 1.0):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._queues: Dict[int, Deque[asyncio.Future]] = {}
+        # Moving average of how long an admitted request holds its slot
+        self.service_time = 0.05
+
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def retry_after(self) -> float:
+        """Rough time until the queue has drained"""
+        return self.service_time * (self.waiting() + 1) / self.max_in_flight
+
+    async def acquire(self, lane: Lane):
+        if self.in_flight < self.max_in_flight and not self.waiting():
+            self.in_flight += 1
+            return
+        queue = self._queues.setdefault(lane.priority, deque())
+        if len(queue) >= lane.queue_size:
+            raise Rejected(503, self.retry_after(), "Server is at capacity, retry later")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue.append(future)
+        timer = loop.call_later(self.queue_timeout, self._expire, queue, future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as the request went away
+                self.release()
+            elif future in queue:
+                queue.remove(future)
+            raise
+        finally:
+            timer.cancel()
+
+    def _expire(self, queue: Deque[asyncio.Future], future: asyncio.Future):
+        if not future.done():
+            queue.remove(future)
+            future.set_exception(Rejected(503, self.retry_after(), "Timed out waiting for capacity, retry later"))
+
+    def release(self, held: Optional[float] = None):
+        if held is not None:
+            self.service_time += 0.1 * (held - self.service_time)
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    # Hand the slot straight to the waiter; in_flight is unchanged
+                    future.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "waiting": {str(priority): len(queue) for priority, queue in sorted(self._queues.items())},
+            "service_time": round(self.service_time, 4),
+        }
+
+Route = Tuple[str, Pattern, Lane]
+
+def route(method: str, path: str, lane: Lane) -> Route:
+    """Admitted route; ``{name}`` in ``path`` matches one path segment"""
+    return method, re.compile("^" + re.sub(r"\{\w+\}", "[^/]+", path) + "$"), lane
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests to ``routes``; other requests pass straight through.
+
+    ``tenant(scope)`` names the tenant whose bucket a request draws from, or
+    is None for requests that are only subject to the in-flight cap.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: List[Route],
+        controller: AdmissionController,
+        limiter: TenantLimiter,
+        tenant: Callable[[dict], Optional[Hashable]],
+    ):
+        self.app = app
+        self.routes = routes
+        self.controller = controller
+        self.limiter = limiter
+        self.tenant = tenant
+
+    def lane(self, scope) -> Optional[Lane]:
+        method, path = scope["method"], scope["path"]
+        for route_method, pattern, lane in self.routes:
+            if method == route_method and pattern.match(path):
+                return lane
+        return None
+
+    async def __call__(self, scope, receive, send):
+        lane = self.lane(scope) if scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            tenant = self.tenant(scope) if lane.rate_limited else None
+            if tenant is not None:
+                wait = self.limiter.take(tenant)
+                if wait:
+                    raise Rejected(429, wait, "Too many requests for this policy or client")
+            await self.controller.acquire(lane)
+        except Rejected as rejected:
+            record_admission(lane.name, "rate_limited" if rejected.status_code == 429 else "overloaded")
+            await rejected.response()(scope, receive, send)
+            return
+        admitted = time.perf_counter()
+        record_admission(lane.name, "admitted")
+        observe_admission_wait(lane.name, admitted - start)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - admitted)
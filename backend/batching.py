@@ -0,0 +1,92 @@
+"""Micro-batching of per-item calls into one call per batch.
+
+Used to send payouts as bulk payment gateway calls and to score claims for
+fraud a batch at a time.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+class MicroBatcher:
+    """Collects items per group and sends each group as one batch call.
+
+    ``submit`` waits for its own item's result; ``enqueue`` returns a
+    future for it straight away, for callers that do not wait. A group is flushed once it
+    holds ``max_batch_size`` items or ``linger`` seconds after its first item
+    arrived, whichever comes first. ``send_batch(group, items)`` must return
+    one result per item, in order; if it raises, every item in the batch
+    fails with that error.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[Hashable, List], Awaitable[List]],
+        max_batch_size: int = 100,
+        linger: float = 0.05,
+    ):
+        self.send_batch = send_batch
+        self.max_batch_size = max_batch_size
+        self.linger = linger
+        self._pending: Dict[Hashable, List[Tuple[object, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._in_flight: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, group: Hashable, item):
+        return await self.enqueue(group, item)
+
+    def enqueue(self, group: Hashable, item) -> asyncio.Future:
+        """Add ``item`` to its group's batch without waiting for it to be sent"""
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(group, [])
+        pending.append((item, future))
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif len(pending) == 1:
+            self._timers[group] = asyncio.get_running_loop().call_later(self.linger, self._flush, group)
+        return future
+
+    def _flush(self, group: Hashable):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(group, None)
+        if not pending:
+            return
+        self.batches += 1
+        self.items += len(pending)
+        self.largest_batch = max(self.largest_batch, len(pending))
+        task = asyncio.ensure_future(self._send(group, pending))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, group: Hashable, pending: List[Tuple[object, asyncio.Future]]):
+        try:
+            results = await self.send_batch(group, [item for item, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark the error as retrieved in case the submitter went away
+                    future.exception()
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def flush_all(self):
+        """Send everything still lingering and wait for in-flight batches"""
+        for group in list(self._pending):
+            self._flush(group)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "largest_batch": self.largest_batch,
+            "average_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "pending": sum(len(pending) for pending in self._pending.values()),
+        }
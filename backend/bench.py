@@ -0,0 +1,770 @@
+"""Throughput benchmarks for the claims backend.
+
+Run from the backend directory, e.g. ``python bench.py intake``. Benchmarks
+use ``MONGO_URL`` from the environment against a separate ``<DB_NAME>_bench``
+database, or an in-memory stand-in with ``--mock`` (needs ``mongomock-motor``).
+"""
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+import typer
+
+import server
+from mock_database import CountingDatabase, mock_client
+from mock_upstream import UpstreamSimulator
+
+cli = typer.Typer(help="Claims backend benchmarks")
+
+@cli.callback()
+def main():
+    """Claims backend benchmarks"""
+
+def use_database(mock: bool, db_name: str = ""):
+    """Point the server module at the benchmark database"""
+    if mock:
+        try:
+            server.client = mock_client()
+        except ImportError:
+            raise typer.BadParameter("--mock needs the mongomock-motor package")
+    name = db_name or f"{os.environ['DB_NAME']}_bench"
+    server.db = server.client[name]
+    return server.db
+
+def sized(size: Optional[int], full: int, mock_size: int, mock: bool) -> int:
+    """``size`` if given, otherwise the default for the database in use.
+
+    The in-memory stand-in scans a collection for every upsert and ``$in``
+    lookup, so it gets a smaller default that finishes in seconds.
+    """
+    if size is not None:
+        return size
+    return mock_size if mock else full
+
+def report(label: str, count: int, elapsed: float):
+    typer.echo(f"{label:<28} {count:>9,} in {elapsed:8.3f}s  {count / elapsed:>12,.0f}/s")
+
+def sample_intake_items(count: int) -> List[dict]:
+    base = server.create_scenario().model_dump(include={"policy_holder", "policy_details", "flight_segments"})
+    items = []
+    for i in range(count):
+        item = dict(base)
+        item["policy_details"] = {**base["policy_details"], "policy_number": f"TRV-2026-{i:07d}"}
+        items.append(item)
+    return items
+
+@cli.command()
+def intake(
+    sizes: List[int] = typer.Option([1_000, 10_000, 100_000], help="Claim counts to ingest"),
+    chunk_size: int = typer.Option(server.BULK_INSERT_CHUNK_SIZE, help="insert_many chunk size"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Bulk intake throughput (validation + chunked unordered insert_many)"""
+    db = use_database(mock)
+
+    async def run():
+        for size in sizes:
+            await db.claims.delete_many({})
+            items = sample_intake_items(size)
+            start = time.perf_counter()
+            summary = await server.ingest_claims(server.iter_json_items(items), chunk_size=chunk_size)
+            report(f"intake chunk={chunk_size}", summary["created"], time.perf_counter() - start)
+        await db.claims.delete_many({})
+
+    asyncio.run(run())
+
+@cli.command()
+def roundtrips(
+    claims: int = typer.Option(100, help="Claims to run through the full lifecycle"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Database operations per claim for the step-by-step and /validate lifecycles"""
+    db = use_database(mock)
+
+    server.upstream_simulator = UpstreamSimulator(default_latency="zero")
+
+    async def step_by_step(claim_id):
+        for step_number in range(1, 7):
+            await server.process_step(claim_id, step_number)
+
+    async def run():
+        for label, validate in (("process-step x6", step_by_step), ("validate", server.validate_claim)):
+            await db.claims.delete_many({})
+            counting = CountingDatabase(db)
+            server.db = counting
+            for n in range(claims):
+                # Duplicate detection allows one claim per policy and flight
+                started = await server.start_claim(policy_number=f"BENCH-{label[0]}-{n:07d}")
+                await validate(started["id"])
+                await server.approve_claim(started["id"])
+                await server.pay_claim_idempotently(started["id"])
+            # Buffered log rows count against the claims that produced them
+            await server.claim_log_writer.flush()
+            server.db = db
+            total = sum(counting.counts.values())
+            ops = ", ".join(f"{name}={count / claims:g}" for name, count in sorted(counting.counts.items()))
+            typer.echo(f"{label:<16} {total / claims:5.1f} DB ops/claim ({ops})")
+        await db.claims.delete_many({})
+
+    asyncio.run(run())
+
+def percentiles(samples: List[float]) -> dict:
+    import numpy as np
+
+    if not samples:
+        return {"count": 0}
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+def git_revision() -> str:
+    import subprocess
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+@cli.command()
+def load(
+    claims: int = typer.Option(200, help="Claim lifecycles to run"),
+    concurrency: int = typer.Option(20, help="Lifecycles in flight at once"),
+    latency: str = typer.Option("zero", help="Upstream latency spec, e.g. zero, 0.05, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA"),
+    profile: str = typer.Option("", help="Per-service upstream profiles as JSON (see mock_upstream.py)"),
+    seed: int = typer.Option(0, help="Seed for upstream latency and failure injection"),
+    db_latency: float = typer.Option(0.0, help="Delay added to every database operation in seconds"),
+    output: str = typer.Option("", help="JSON results file (default bench-results/load-<commit>.json)"),
+    baseline: str = typer.Option("", help="Earlier results file to compare against"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Full claim lifecycles over HTTP: latency percentiles, throughput and DB ops per claim"""
+    import json
+    from collections import defaultdict
+    from datetime import datetime, timezone
+    from pathlib import Path
+
+    import httpx
+
+    db = use_database(mock)
+    try:
+        simulator = UpstreamSimulator(json.loads(profile) if profile else {}, latency, seed)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    server.upstream_simulator = simulator
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+
+    async def call(http, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await http.request(method, url, **kwargs)
+        timings[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors[f"{endpoint} {response.status_code}"] += 1
+            raise RuntimeError(f"{endpoint}: HTTP {response.status_code}")
+        return response.json()
+
+    async def lifecycle(http, slots, n: int):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                # Duplicate detection allows one claim per policy and flight
+                claim_id = (await call(http, "start", "POST", "/api/claim/start", params={"policy_number": f"LOAD-{n:07d}"}))["id"]
+                for step_number in range(1, 7):
+                    await call(http, "process_step", "POST", f"/api/claim/{claim_id}/process-step", params={"step_number": step_number})
+                await call(http, "approve", "POST", f"/api/claim/{claim_id}/approve")
+                await call(http, "pay", "POST", f"/api/claim/{claim_id}/pay", headers={"Idempotency-Key": f"pay-{claim_id}"})
+            except RuntimeError:
+                return
+            timings["lifecycle"].append(time.perf_counter() - start)
+
+    async def run():
+        await db.claims.delete_many({})
+        await db.claim_logs.delete_many({})
+        counting = CountingDatabase(db, db_latency)
+        server.db = counting
+        slots = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench", timeout=None) as http:
+            start = time.perf_counter()
+            await asyncio.gather(*(lifecycle(http, slots, n) for n in range(claims)))
+            elapsed = time.perf_counter() - start
+        server.db = db
+        await db.claims.delete_many({})
+        await db.claim_logs.delete_many({})
+        return elapsed, counting.counts
+
+    elapsed, counts = asyncio.run(run())
+    completed = len(timings["lifecycle"])
+    requests = sum(len(samples) for endpoint, samples in timings.items() if endpoint != "lifecycle")
+    results = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"claims": claims, "concurrency": concurrency, "latency": latency, "profile": profile, "seed": seed,
+                   "db_latency": db_latency, "mock": mock},
+        "elapsed_s": round(elapsed, 3),
+        "claims_per_s": round(completed / elapsed, 2),
+        "requests_per_s": round(requests / elapsed, 2),
+        "completed": completed,
+        "errors": dict(errors),
+        "upstream": simulator.stats(),
+        "latency": {endpoint: percentiles(samples) for endpoint, samples in sorted(timings.items())},
+        "db_ops_per_claim": {
+            "total": round(sum(counts.values()) / max(completed, 1), 2),
+            **{name: round(count / max(completed, 1), 2) for name, count in sorted(counts.items())},
+        },
+    }
+
+    typer.echo(f"{completed:,}/{claims:,} lifecycles in {elapsed:.2f}s: {results['claims_per_s']:,} claims/s, "
+               f"{results['requests_per_s']:,} requests/s, {results['db_ops_per_claim']['total']} DB ops/claim")
+    for endpoint, stats in results["latency"].items():
+        typer.echo(f"  {endpoint:<14} p50 {stats['p50_ms']:9.2f}ms  p95 {stats['p95_ms']:9.2f}ms  p99 {stats['p99_ms']:9.2f}ms")
+    if errors:
+        typer.echo(f"  errors: {dict(errors)}")
+
+    path = Path(output or f"bench-results/load-{results['revision']}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    typer.echo(f"results written to {path}")
+
+    if baseline:
+        previous = json.loads(Path(baseline).read_text())
+        typer.echo(f"compared with {previous.get('revision', baseline)}:")
+        for key in ("claims_per_s", "requests_per_s"):
+            typer.echo(f"  {key:<14} {previous[key]:>10} -> {results[key]:>10}")
+        typer.echo(f"  {'db ops/claim':<14} {previous['db_ops_per_claim']['total']:>10} -> {results['db_ops_per_claim']['total']:>10}")
+        for endpoint, stats in results["latency"].items():
+            before = previous["latency"].get(endpoint)
+            if before and before.get("count"):
+                typer.echo(f"  {endpoint + ' p99':<14} {before['p99_ms']:>10} -> {stats['p99_ms']:>10} ms")
+
+@cli.command()
+def cache(
+    claims: int = typer.Option(10_000, help="Concurrent claims on the same flight"),
+    latency: float = typer.Option(0.05, help="Simulated upstream latency in seconds"),
+):
+    """Upstream flight-status/weather calls with and without the lookup cache"""
+    flight = server.create_scenario().flight_segments[0].model_dump()
+    flight_date = server.segment_key(flight)[1]
+
+    async def run():
+        services = server.ExternalServices({})
+        for label, lookup in (
+            ("uncached", lambda: asyncio.gather(
+                services._fetch_flight_status(flight["flight_number"]),
+                services._fetch_weather(flight["departure_code"]))),
+            ("cached", lambda: asyncio.gather(
+                services.get_flight_status(flight["flight_number"], flight_date),
+                services.get_weather(flight["departure_code"]))),
+        ):
+            server.upstream_simulator = UpstreamSimulator(default_latency=f"fixed:{latency}")
+            start = time.perf_counter()
+            await asyncio.gather(*(lookup() for _ in range(claims)))
+            elapsed = time.perf_counter() - start
+            upstream_calls = sum(server.upstream_simulator.calls.values())
+            typer.echo(f"{label:<10} {claims:,} claims: {upstream_calls:,} upstream calls in {elapsed:.3f}s")
+        typer.echo(f"cache stats: {services.cache_stats()}")
+
+    asyncio.run(run())
+
+@cli.command()
+def indexes(
+    sizes: List[int] = typer.Option([10_000, 1_000_000], help="Claim counts to seed"),
+    lookups: int = typer.Option(200, help="find_one lookups per measurement"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in (ignores indexes)"),
+):
+    """find_one latency by claim id and status before and after the schema migrations"""
+    db = use_database(mock)
+
+    async def measure(label: str, ids: List[str]):
+        sample = [ids[i * len(ids) // lookups] for i in range(lookups)]
+        for name, query in (
+            ("by id", lambda claim_id: {"id": claim_id}),
+            ("by policy", lambda claim_id: {"policy_details.policy_number": f"P-{claim_id[-6:]}"}),
+        ):
+            start = time.perf_counter()
+            for claim_id in sample:
+                await db.claims.find_one(query(claim_id), {"_id": 0, "id": 1})
+            elapsed = time.perf_counter() - start
+            typer.echo(f"{label:<8} {len(ids):>10,} docs  {name:<10} {elapsed / lookups * 1000:8.3f} ms/lookup")
+
+    async def run():
+        for size in sizes:
+            await db.claims.drop()
+            await db.schema_migrations.drop()
+            ids = []
+            for offset in range(0, size, 10_000):
+                batch = [
+                    {
+                        "id": f"claim-{n:010d}",
+                        "status": "paid",
+                        "policy_details": {"policy_number": f"P-{n % 1_000_000:06d}"},
+                        "created_at": f"2026-01-01T00:00:00.{n:06d}+00:00",
+                    }
+                    for n in range(offset, min(offset + 10_000, size))
+                ]
+                await db.claims.insert_many(batch)
+                ids.extend(doc["id"] for doc in batch)
+            await measure("before", ids)
+            await server.migrate(db)
+            await measure("after", ids)
+        await db.claims.drop()
+        await db.schema_migrations.drop()
+
+    asyncio.run(run())
+
+@cli.command()
+def scenario(
+    iterations: int = typer.Option(20_000, help="Scenarios to build per measurement"),
+    requests: int = typer.Option(2_000, help="GET /api/scenario requests per measurement"),
+):
+    """create_scenario + serialization cost and /api/scenario requests/sec"""
+    import httpx
+    from fastapi import FastAPI
+
+    for label, build in (
+        ("validated model_dump", lambda: server.create_scenario().model_dump()),
+        ("template render", server.render_scenario),
+        ("template render_json", server.scenario_template.render_json),
+    ):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build()
+        report(label, iterations, time.perf_counter() - start)
+
+    # The endpoint as it was before templates: full model validation and jsonable_encoder
+    legacy_app = FastAPI()
+
+    @legacy_app.get("/api/scenario")
+    async def legacy_scenario():
+        return server.create_scenario().model_dump()
+
+    async def run():
+        for label, app in (("GET /api/scenario legacy", legacy_app), ("GET /api/scenario", server.app)):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+                start = time.perf_counter()
+                for _ in range(requests):
+                    response = await http.get("/api/scenario")
+                    response.raise_for_status()
+                report(label, requests, time.perf_counter() - start)
+
+    asyncio.run(run())
+
+@cli.command()
+def serialization(
+    log_counts: List[int] = typer.Option([10, 1_000, 10_000], help="Agent log entries per claim"),
+    entries: int = typer.Option(200_000, help="Log entries serialized per measurement"),
+):
+    """Claim response serialization: FastAPI's default path, model re-validation and orjson"""
+    import json
+
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+
+    from responses import ORJSONResponse
+
+    paths = (
+        ("jsonable_encoder + json", lambda doc: JSONResponse(jsonable_encoder(doc)).body),
+        ("model_validate + dump_json", lambda doc: server.ClaimWorkflow.model_validate(doc).model_dump_json().encode()),
+        ("orjson", lambda doc: ORJSONResponse(doc).body),
+    )
+    for count in log_counts:
+        doc = server.render_scenario()
+        doc["agent_logs"] = [
+            server.AgentLog(
+                timestamp="12:00:00", agent="Claim Processing Agent", message=f"Log entry {i}",
+                log_type="info", trace_id="0" * 32
+            ).model_dump()
+            for i in range(count)
+        ]
+        expected = json.loads(paths[0][1](doc))
+        iterations = max(5, entries // max(count, 1))
+        baseline = None
+        for label, serialize in paths:
+            body = serialize(doc)
+            assert json.loads(body) == expected, label
+            start = time.perf_counter()
+            for _ in range(iterations):
+                serialize(doc)
+            per_response = (time.perf_counter() - start) / iterations
+            baseline = baseline or per_response
+            typer.echo(f"{count:>6} logs  {label:<28} {per_response * 1000:9.3f} ms/response "
+                       f"{len(body) / per_response / 1e6:8.1f} MB/s  {baseline / per_response:5.1f}x")
+
+@cli.command()
+def settlement(
+    claims: int = typer.Option(1_000_000, help="Claims on the cancelled flight"),
+    per_claim: int = typer.Option(10_000, help="Claims timed through the per-claim path"),
+    seed: int = typer.Option(7, help="Random seed"),
+):
+    """Vectorized whole-flight settlement versus the per-claim rules (tests/test_compensation.py checks they agree)"""
+    import numpy as np
+    import pandas as pd
+    from compensation import compensation_for, parse_coverage, settle_claims
+
+    rng = np.random.default_rng(seed)
+    rates = np.array(["$100 per 6 hours", "$50 per 3 hours", "$150 per 4 hours", "$1,000 per 12 hours"])
+    caps = np.array(["$500", "$300", "$1,200", ""])
+    plan = rng.integers(0, len(rates), claims)
+    frame = pd.DataFrame({
+        "delay_hours": rng.integers(0, 72, claims),
+        "flight_delay_coverage": rates[plan],
+        "max_delay_coverage": caps[plan],
+        "policy_status": np.where(rng.random(claims) < 0.97, "Active", "Lapsed"),
+    })
+
+    start = time.perf_counter()
+    result = settle_claims(frame)
+    report("settle_claims", claims, time.perf_counter() - start)
+
+    sample = frame.head(per_claim)
+    start = time.perf_counter()
+    for row in sample.itertuples():
+        compensation_for(row.delay_hours, parse_coverage(row.flight_delay_coverage, row.max_delay_coverage), row.policy_status)
+    report("per-claim compensation_for", per_claim, time.perf_counter() - start)
+    typer.echo(f"total payout ${result['compensation'].sum():,.0f}")
+
+@cli.command()
+def fraud(
+    claims: int = typer.Option(100_000, help="Claims to score"),
+    policies: int = typer.Option(90_000, help="Distinct policies the claims are drawn from"),
+    shared: float = typer.Option(0.01, help="Share of policies paying into a small pool of shared accounts"),
+    seed: int = typer.Option(7, help="Random seed"),
+):
+    """Batch fraud scoring throughput and how many claims each flag catches"""
+    import numpy as np
+    import pandas as pd
+    from fraud import FLAG_NAMES, score_claims
+
+    rng = np.random.default_rng(seed)
+    policy = rng.integers(0, policies, claims)
+    # Every policy has its own account, except a few paying into 100 shared ones
+    account = np.where(rng.random(policies) < shared, rng.integers(0, 100, policies), np.arange(100, policies + 100))
+    caps = np.array(["$500", "$300", "$1,200", ""])
+    frame = pd.DataFrame({
+        "policy_number": pd.Series(policy).map("TRV-{:07d}".format),
+        "bank_account": pd.Series(account[policy]).map("ACC-{:08d}".format),
+        "compensation_amount": rng.choice([100, 200, 300, 500], claims).astype(float),
+        "max_delay_coverage": caps[policy % len(caps)],
+    })
+
+    start = time.perf_counter()
+    scores = score_claims(frame)
+    report("score_claims", claims, time.perf_counter() - start)
+
+    flags = scores["flags"].explode().value_counts()
+    typer.echo(", ".join(f"{level}: {count:,}" for level, count in scores["risk_level"].value_counts().items()))
+    typer.echo(", ".join(f"{name}: {int(flags.get(name, 0)):,}" for name in FLAG_NAMES))
+
+@cli.command()
+def itinerary(
+    claims: int = typer.Option(10_000, help="Itineraries to evaluate"),
+    flights: int = typer.Option(200, help="Distinct flights the itineraries are drawn from"),
+    legs: int = typer.Option(4, help="Segments per itinerary"),
+    latency: float = typer.Option(0.05, help="Simulated flight status latency in seconds"),
+    seed: int = typer.Option(7, help="Random seed"),
+):
+    """Bulk delay attribution with status lookups shared across itineraries"""
+    import random
+    from datetime import datetime, timedelta
+    from itinerary import SEGMENT_TIME_FORMAT, evaluate_itineraries
+
+    rng = random.Random(seed)
+    start_time = datetime(2026, 10, 17, 8, 0)
+
+    def segment(number: int, departure: datetime, delay: int) -> dict:
+        return {
+            "flight_number": f"XX{number:04d}",
+            "scheduled_departure": departure.strftime(SEGMENT_TIME_FORMAT),
+            "scheduled_arrival": (departure + timedelta(hours=3)).strftime(SEGMENT_TIME_FORMAT),
+            "delay_hours": delay,
+        }
+
+    itineraries = []
+    for _ in range(claims):
+        departure = start_time
+        segments = []
+        for _ in range(legs):
+            segments.append(segment(rng.randrange(flights), departure, 0))
+            departure += timedelta(hours=5)
+        itineraries.append(segments)
+
+    calls = 0
+
+    async def fetch_status(flight_number: str, flight_date: str) -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(latency)
+        return {"flight": {"ident": flight_number, "delay_minutes": 60 * (int(flight_number[2:]) % 8)}}
+
+    async def run():
+        start = time.perf_counter()
+        journeys = await evaluate_itineraries(itineraries, fetch_status)
+        report("evaluate_itineraries", claims, time.perf_counter() - start)
+        missed = sum(journey.missed_connections > 0 for journey in journeys)
+        typer.echo(f"status lookups: {calls:,} for {claims * legs:,} segments, {missed:,} itineraries with missed connections")
+
+    asyncio.run(run())
+
+@cli.command()
+def parametric(
+    policies: Optional[int] = typer.Option(None, help="Policies registered for parametric cover [default: 50,000; 2,000 with --mock]"),
+    flights: int = typer.Option(500, help="Distinct flights the policies are drawn from"),
+    events: Optional[int] = typer.Option(None, help="Flight status events to ingest [default: 100,000; 10,000 with --mock]"),
+    delayed: float = typer.Option(0.01, help="Share of events delayed past the threshold"),
+    seed: int = typer.Option(7, help="Random seed"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Flight status events/sec through the parametric index, and the claims they trigger"""
+    import random
+    from itinerary import segment_key
+
+    db = use_database(mock)
+    policies = sized(policies, 50_000, 2_000, mock)
+    events = sized(events, 100_000, 10_000, mock)
+    rng = random.Random(seed)
+    base = server.create_scenario().model_dump(include={"policy_holder", "policy_details", "flight_segments"})
+    date = segment_key(base["flight_segments"][0])[1]
+
+    def policy(i: int) -> dict:
+        segments = [
+            {**segment, "flight_number": f"XX{rng.randrange(flights):04d}", "delay_hours": 0, "status": "On Time"}
+            for segment in base["flight_segments"]
+        ]
+        return {**base, "policy_details": {**base["policy_details"], "policy_number": f"PAR-{i:07d}"}, "flight_segments": segments}
+
+    def event() -> dict:
+        delay = 420 if rng.random() < delayed else rng.choice((0, 15, 45, 120))
+        return {"date": date, "flight": {"ident": f"XX{rng.randrange(flights):04d}", "status": "Delayed", "delay_minutes": delay}}
+
+    async def run():
+        await db.parametric_policies.delete_many({})
+        await db.claims.delete_many({})
+        await db.claim_jobs.delete_many({})
+        server.parametric_index = server.SegmentIndex()
+        server.claim_jobs.collection = db.claim_jobs
+
+        start = time.perf_counter()
+        summary = await server.register_parametric_policies(server.iter_json_items(policy(i) for i in range(policies)))
+        report("register policies", summary["registered"], time.perf_counter() - start)
+
+        feed = [event() for _ in range(events)]
+        start = time.perf_counter()
+        summary = await server.ingest_flight_events(server.iter_json_items(feed))
+        elapsed = time.perf_counter() - start
+        report("flight status events", events, elapsed)
+        typer.echo(f"{summary['delayed']:,} delayed events, {summary['triggered_segments']:,} segments triggered, "
+                   f"{summary['claims_created']:,} claims created ({summary['claims_created'] / elapsed:,.0f}/s), "
+                   f"{events / elapsed * 60:,.0f} events/min; index {server.parametric_index.stats()}")
+
+        await db.parametric_policies.delete_many({})
+        await db.claims.delete_many({})
+        await db.claim_jobs.delete_many({})
+
+    asyncio.run(run())
+
+@cli.command("export")
+def export_claims(
+    claims: Optional[int] = typer.Option(None, help="Paid claims to seed and export [default: 100,000; 5,000 with --mock]"),
+    chunk_size: int = typer.Option(server.EXPORT_CHUNK_SIZE, help="Claims per chunk"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Streaming CSV and Parquet export throughput and peak memory"""
+    import tempfile
+    import tracemalloc
+    from pathlib import Path
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from export import default_watermark, export_query, export_to_file
+
+    db = use_database(mock)
+    claims = sized(claims, 100_000, 5_000, mock)
+
+    async def run():
+        await db.claims.delete_many({})
+        base = server.render_scenario()
+        for offset in range(0, claims, 10_000):
+            batch = []
+            for n in range(offset, min(offset + 10_000, claims)):
+                claim = {**base, "id": f"export-{n:010d}", "status": "paid", "agent_logs": []}
+                claim["created_at"] = f"2026-01-01T00:00:00.{n:06d}+00:00" if n < 1_000_000 else f"2026-01-02T00:00:00.{n % 1_000_000:06d}+00:00"
+                claim["claim_details"] = {"claim_id": f"CLM-{n}", "compensation_amount": 100.0, "status": "Paid"}
+                claim["payment_response"] = {"batch_id": f"BATCH-{n // 100}", "payment": {
+                    "transaction_id": f"TXN-{n:012d}", "reference": f"CLAIM-export-{n:010d}", "amount": 100.0,
+                    "currency": "SGD", "status": "COMPLETED", "method": "Bank Transfer"
+                }}
+                batch.append(claim)
+            await db.claims.insert_many(batch)
+
+        query = export_query(None, default_watermark(0))
+        with tempfile.TemporaryDirectory() as directory:
+            for export_format in ("csv", "parquet"):
+                path = Path(directory) / f"claims.{export_format}"
+                tracemalloc.start()
+                start = time.perf_counter()
+                size = await export_to_file(db.claims, path, query, export_format, chunk_size)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                report(f"export {export_format}", claims, elapsed)
+                rows = pq.ParquetFile(path).metadata.num_rows if export_format == "parquet" else sum(1 for _ in path.open()) - 1
+                typer.echo(f"  {rows:,} rows, {size / 1e6:,.1f} MB, peak Python memory {peak / 1e6:,.1f} MB, "
+                           f"peak Arrow memory {pa.default_memory_pool().max_memory() / 1e6:,.1f} MB")
+        await db.claims.delete_many({})
+
+    asyncio.run(run())
+
+@cli.command()
+def payouts(
+    claims: int = typer.Option(1_000, help="Approved claims to pay"),
+    batch_size: int = typer.Option(server.PAYOUT_BATCH_SIZE, help="Payout batch size"),
+    linger: float = typer.Option(server.PAYOUT_BATCH_LINGER, help="Payout batch linger in seconds"),
+    latency: float = typer.Option(0.1, help="Simulated payment gateway latency per call in seconds"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Payouts/sec for per-claim gateway calls versus batched bulk payouts"""
+    db = use_database(mock)
+
+    server.upstream_simulator = UpstreamSimulator(default_latency=f"fixed:{latency}")
+    server.payout_batcher.max_batch_size = batch_size
+    server.payout_batcher.linger = linger
+
+    async def run():
+        base = server.render_scenario()
+        for label, size in (("per-claim process_payment", 1), (f"batched payouts ({batch_size})", batch_size)):
+            await db.claims.delete_many({})
+            await db.claim_logs.delete_many({})
+            ids = []
+            documents = []
+            for i in range(claims):
+                claim = {**base, "id": f"payout-{i}", "status": "approved", "log_count": 0, "agent_logs": []}
+                claim["claim_details"] = {"compensation_amount": 100, "status": "Approved"}
+                claim["policy_holder"] = {**base["policy_holder"], "bank": ("DBS Bank", "OCBC Bank", "UOB")[i % 3]}
+                documents.append(claim)
+                ids.append(claim["id"])
+            await db.claims.insert_many(documents)
+
+            server.PAYOUT_BATCH_SIZE = size
+            start = time.perf_counter()
+            results = await server.pay_claims(ids)
+            elapsed = time.perf_counter() - start
+            paid = sum(result["status"] == "paid" for result in results)
+            report(label, paid, elapsed)
+        typer.echo(f"batcher: {server.payout_batcher.stats()}")
+        await db.claims.delete_many({})
+        await db.claim_logs.delete_many({})
+
+    asyncio.run(run())
+
+@cli.command()
+def overload(
+    rate: float = typer.Option(40, help="New claims per second the server handles comfortably"),
+    factor: float = typer.Option(10, help="Overload multiple of --rate for the second phase"),
+    pay_rate: float = typer.Option(10, help="Payments per second during both phases"),
+    duration: float = typer.Option(5, help="Seconds per phase"),
+    max_in_flight: int = typer.Option(16, help="Admission in-flight cap (0 keeps ADMISSION_MAX_IN_FLIGHT)"),
+    latency: str = typer.Option("0.05", help="Upstream latency spec, e.g. zero, 0.05, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA"),
+    db_latency: float = typer.Option(0.01, help="Delay added to every database operation in seconds"),
+    admission: bool = typer.Option(True, help="Keep admission control on (--no-admission to compare)"),
+    mock: bool = typer.Option(False, help="Use an in-memory MongoDB stand-in"),
+):
+    """Open-loop intake at --rate and then --factor times that, with payments alongside: per-lane p99 and rejections.
+
+    The defaults keep the server's capacity bound by database and upstream
+    waits rather than CPU, since client, server and any in-memory database
+    share one event loop here.
+    """
+    import logging
+    from collections import defaultdict
+
+    import httpx
+
+    # A log line per request would cost the shared event loop more than a rejection does
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    db = use_database(mock)
+    server.claim_jobs.collection = db.claim_jobs
+    try:
+        server.upstream_simulator = UpstreamSimulator({}, latency)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if not admission:
+        server.admission.max_in_flight = 10 ** 9
+    elif max_in_flight:
+        server.admission.max_in_flight = max_in_flight
+    results = {}
+
+    async def send(http, lane: str, due: float, method: str, url: str, **kwargs):
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        response = await http.request(method, url, **kwargs)
+        # Measured from when the request was due, so time spent queued in the client counts too
+        latency = time.perf_counter() - due
+        outcome = "ok" if response.status_code < 400 else str(response.status_code)
+        results[phase_name][lane][outcome].append(latency)
+
+    async def approved_claims(count: int) -> List[str]:
+        claims = []
+        for _ in range(count):
+            claim = server.render_scenario()
+            claim["status"] = "approved"
+            claim["claim_details"] = {"compensation_amount": 100, "status": "Approved"}
+            claims.append(claim)
+        if claims:
+            await db.claims.insert_many(claims)
+        return [claim["id"] for claim in claims]
+
+    async def phase(http, intake_rate: float, offset: int):
+        # Both phases start from an empty collection; in-memory stand-ins slow down as it grows
+        await db.claims.delete_many({})
+        await db.claim_logs.delete_many({})
+        payments = await approved_claims(int(pay_rate * duration))
+        start = time.perf_counter()
+        tasks = [
+            send(http, "intake", start + n / intake_rate, "POST", "/api/claim/start",
+                 params={"policy_number": f"OVERLOAD-{offset + n:08d}"})
+            for n in range(int(intake_rate * duration))
+        ]
+        tasks += [
+            send(http, "payment", start + n / pay_rate, "POST", f"/api/claim/{claim_id}/pay",
+                 headers={"Idempotency-Key": f"pay-{claim_id}"})
+            for n, claim_id in enumerate(payments)
+        ]
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    async def run():
+        nonlocal phase_name
+        server.db = CountingDatabase(db, db_latency)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench", timeout=None) as http:
+            for phase_name, intake_rate, offset in (("1x", rate, 0), (f"{factor:g}x", rate * factor, 10 ** 7)):
+                results[phase_name] = defaultdict(lambda: defaultdict(list))
+                elapsed = await phase(http, intake_rate, offset)
+                typer.echo(f"{phase_name}: {intake_rate:,.0f} claims/s + {pay_rate:,.0f} payments/s offered for {duration:g}s, "
+                           f"finished in {elapsed:.2f}s")
+                for lane, outcomes in sorted(results[phase_name].items()):
+                    ok = percentiles(outcomes.get("ok", []))
+                    rejected = {code: len(samples) for code, samples in sorted(outcomes.items()) if code != "ok"}
+                    line = f"  {lane:<8} ok {ok['count']:>6,}"
+                    if ok["count"]:
+                        line += f"  p50 {ok['p50_ms']:8.2f}ms  p99 {ok['p99_ms']:8.2f}ms  max {ok['max_ms']:8.2f}ms"
+                    typer.echo(line + (f"  rejected {rejected}" if rejected else ""))
+        server.db = db
+        await db.claims.delete_many({})
+        await db.claim_logs.delete_many({})
+        await db.payment_requests.delete_many({})
+
+    phase_name = ""
+    asyncio.run(run())
+    typer.echo(f"admission: {server.admission.stats()}")
+
+if __name__ == "__main__":
+    cli()
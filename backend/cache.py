@@ -0,0 +1,113 @@
+"""In-process TTL cache with LRU eviction and single-flight loading."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable
+
+class _LoadAbandoned(Exception):
+    """The caller running a shared load was cancelled before it finished"""
+
+class TTLCache:
+    """Async read-through cache.
+
+    Entries expire ``ttl`` seconds after being loaded and the least recently
+    used entry is evicted beyond ``max_entries``. Concurrent misses for the
+    same key share a single loader call (single-flight); a failed load is
+    not cached and its error is raised to every waiter. If the caller
+    running the load is cancelled, a waiter takes the load over instead.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _lookup(self, key: Hashable):
+        """``(True, value)`` for a fresh entry, otherwise ``(False, None)``"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        return False, None
+
+    def get(self, key: Hashable, default=None):
+        """Cached value without loading it on a miss"""
+        found, value = self._lookup(key)
+        if not found:
+            self.misses += 1
+            return default
+        return value
+
+    def put(self, key: Hashable, value):
+        self._store(key, value)
+
+    def discard(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable]):
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+        while in_flight is not None:
+            try:
+                return await asyncio.shield(in_flight)
+            except _LoadAbandoned:
+                # The first waiter to get here starts a new load; the rest join it
+                in_flight = self._in_flight.get(key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Only this caller went away; waiters must not see its cancellation
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the error as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def _store(self, key: Hashable, value):
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,104 @@
+"""Agent logs of claims: a bounded tail on the claim and the full history in ``claim_logs``.
+
+Every update that adds logs pushes them onto the claim's ``agent_logs`` tail
+and bumps ``log_count`` in the same write, which allocates their sequence
+numbers. The history rows, one per entry keyed by (claim_id, seq), are not
+written in that round trip: ``ClaimLogWriter`` buffers them and inserts
+everything appended within ``linger`` seconds with a single ``insert_many``.
+
+The claim update is the source of truth for ``log_count`` and the tail;
+the history is written after it and is not atomic with it:
+
+* a history write that fails is logged rather than failing the step or
+  payment that produced it;
+* rows still buffered when the process dies are lost from the history for
+  good, apart from the last ``CLAIM_LOG_TAIL`` entries kept on the claim;
+* until rows are written, readers see them only through the claim's tail
+  (see ``unflushed_tail``), so a page of history can be incomplete.
+  ``GET /claim/{id}/logs`` says how many entries it has not returned yet.
+"""
+import logging
+from typing import Awaitable, Callable, List
+
+from pymongo.errors import BulkWriteError
+
+from batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+CLAIM_LOG_TAIL = 20
+DUPLICATE_KEY_ERROR = 11000
+
+def claim_log_update(log_dicts: List[dict]) -> dict:
+    """Update operators appending logs to a claim's tail and bumping its log count"""
+    return {
+        "$push": {"agent_logs": {"$each": log_dicts, "$slice": -CLAIM_LOG_TAIL}},
+        "$inc": {"log_count": len(log_dicts)}
+    }
+
+def claim_log_rows(claim: dict, log_dicts: List[dict]) -> List[dict]:
+    """History rows for logs whose sequence numbers end at the claim's updated log_count"""
+    first_seq = claim["log_count"] - len(log_dicts) + 1
+    return [
+        {"claim_id": claim["id"], "seq": first_seq + offset, **log}
+        for offset, log in enumerate(log_dicts)
+    ]
+
+def unflushed_tail(claim: dict, after: int) -> List[dict]:
+    """Entries of the claim's tail following on directly from sequence number ``after``.
+
+    Empty if the tail starts further on, so a reader never skips rows that
+    are only waiting to be written.
+    """
+    tail = claim.get("agent_logs") or []
+    first_seq = claim.get("log_count", 0) - len(tail) + 1
+    if first_seq > after + 1:
+        return []
+    return [
+        {"seq": first_seq + offset, **log}
+        for offset, log in enumerate(tail)
+        if first_seq + offset > after
+    ]
+
+class ClaimLogWriter:
+    """Buffers claim log history rows and inserts them in batches.
+
+    ``insert_rows(rows)`` writes one batch; rows whose (claim_id, seq) is
+    already stored are skipped, other failures are logged.
+    """
+
+    def __init__(
+        self,
+        insert_rows: Callable[[List[dict]], Awaitable],
+        max_batch_size: int = 1000,
+        linger: float = 0.05,
+    ):
+        self.insert_rows = insert_rows
+        self.failed_rows = 0
+        self._batcher = MicroBatcher(self._write, max_batch_size=max_batch_size, linger=linger)
+
+    def append(self, claim: dict, log_dicts: List[dict]):
+        """Queue history rows for logs just added to ``claim`` (the updated document)"""
+        if log_dicts:
+            self._batcher.enqueue(None, claim_log_rows(claim, log_dicts))
+
+    async def _write(self, _, batches: List[List[dict]]) -> List[None]:
+        rows = [row for batch in batches for row in batch]
+        try:
+            await self.insert_rows(rows)
+        except BulkWriteError as e:
+            failed = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+            if failed:
+                self.failed_rows += len(failed)
+                logger.error("Failed to write %d of %d claim log rows: %s", len(failed), len(rows), failed[0].get("errmsg"))
+        except Exception:
+            self.failed_rows += len(rows)
+            logger.exception("Failed to write %d claim log rows", len(rows))
+        return [None] * len(batches)
+
+    async def flush(self):
+        """Write everything buffered and wait for writes in progress"""
+        await self._batcher.flush_all()
+
+    def stats(self) -> dict:
+        return {**self._batcher.stats(), "failed_rows": self.failed_rows}
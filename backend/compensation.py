@@ -0,0 +1,87 @@
+"""Flight delay compensation rules.
+
+Coverage strings from ``PolicyDetails`` ("$100 per 6 hours", "$500") are
+parsed into numeric terms: a claim is eligible once the delay reaches one
+full period, pays ``amount`` per full period and never more than the cap.
+``compensation_for`` evaluates one claim; ``settle_claims`` evaluates a whole
+flight's claims at once with NumPy and must give identical amounts.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+RATE_PATTERN = re.compile(r"\$\s*([\d,]+(?:\.\d+)?)\s*per\s*(\d+(?:\.\d+)?)\s*h(?:ou)?rs?", re.IGNORECASE)
+AMOUNT_PATTERN = re.compile(r"\$\s*([\d,]+(?:\.\d+)?)")
+
+class CoverageTerms(NamedTuple):
+    amount_per_period: float
+    period_hours: float
+    cap: float
+
+    @property
+    def minimum_delay_hours(self) -> float:
+        return self.period_hours
+
+@lru_cache(maxsize=4096)
+def parse_rate(flight_delay_coverage: str):
+    """(amount per period, period hours) from e.g. "$100 per 6 hours" """
+    rate = RATE_PATTERN.search(flight_delay_coverage or "")
+    if not rate:
+        raise ValueError(f"Unrecognised flight delay coverage: {flight_delay_coverage!r}")
+    return float(rate.group(1).replace(",", "")), float(rate.group(2))
+
+@lru_cache(maxsize=4096)
+def parse_cap(max_delay_coverage: str) -> float:
+    """Cap from e.g. "$500"; a missing cap means uncapped"""
+    cap = AMOUNT_PATTERN.search(max_delay_coverage or "")
+    return float(cap.group(1).replace(",", "")) if cap else float("inf")
+
+def parse_coverage(flight_delay_coverage: str, max_delay_coverage: str = "") -> CoverageTerms:
+    """Parse e.g. ("$100 per 6 hours", "$500") into coverage terms"""
+    amount, period = parse_rate(flight_delay_coverage)
+    return CoverageTerms(amount_per_period=amount, period_hours=period, cap=parse_cap(max_delay_coverage))
+
+def terms_for_policy(policy_details: dict) -> CoverageTerms:
+    return parse_coverage(policy_details["flight_delay_coverage"], policy_details.get("max_delay_coverage", ""))
+
+def is_eligible(delay_hours: float, terms: CoverageTerms, policy_status: str = "Active") -> bool:
+    return policy_status == "Active" and delay_hours >= terms.minimum_delay_hours
+
+def compensation_for(delay_hours: float, terms: CoverageTerms, policy_status: str = "Active") -> float:
+    """Tiered, capped payout for a single claim"""
+    if not is_eligible(delay_hours, terms, policy_status):
+        return 0.0
+    return float(min((delay_hours // terms.period_hours) * terms.amount_per_period, terms.cap))
+
+def settle_claims(claims: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized eligibility and payout for many claims.
+
+    ``claims`` needs ``delay_hours``, ``flight_delay_coverage`` and
+    ``max_delay_coverage`` columns and may have ``policy_status`` (default
+    Active). Coverage strings are parsed once per distinct value. Returns a
+    frame on the same index with ``eligible``, ``tiers`` and
+    ``compensation`` columns.
+    """
+    rate_codes, rates = pd.factorize(claims["flight_delay_coverage"])
+    cap_codes, caps = pd.factorize(claims["max_delay_coverage"].fillna(""))
+    parsed_rates = np.array([parse_rate(rate) for rate in rates], dtype=float).reshape(-1, 2)
+    parsed_caps = np.array([parse_cap(cap) for cap in caps], dtype=float)
+    amount, period = parsed_rates[rate_codes, 0], parsed_rates[rate_codes, 1]
+    cap = parsed_caps[cap_codes]
+
+    delay = claims["delay_hours"].to_numpy(dtype=float)
+    active = (
+        claims["policy_status"].to_numpy() == "Active"
+        if "policy_status" in claims
+        else np.ones(len(claims), dtype=bool)
+    )
+    eligible = active & (delay >= period)
+    tiers = np.where(eligible, np.floor_divide(delay, period), 0)
+    compensation = np.minimum(tiers * amount, cap)
+    return pd.DataFrame(
+        {"eligible": eligible, "tiers": tiers.astype(np.int64), "compensation": compensation},
+        index=claims.index,
+    )
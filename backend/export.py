@@ -0,0 +1,258 @@
+"""Streaming claims export for finance reconciliation.
+
+Claims are read from a MongoDB cursor in ``created_at`` order and flattened
+into one row per claim with a fixed set of columns (``EXPORT_COLUMNS``), so
+every chunk has the same schema. Each chunk is written out as CSV rows or a
+Parquet row group before the next one is read; memory stays bounded by the
+chunk size however many claims are exported.
+
+Exports are incremental: a run covers claims created after ``since`` up to
+``until`` and hands back ``until`` as the watermark to pass as ``since`` next
+time. ``until`` defaults to a few seconds in the past so claims still being
+inserted with an earlier ``created_at`` are picked up by the next run.
+
+Run from the backend directory, e.g.
+``python export.py claims.parquet --watermark-file finance.watermark``.
+"""
+import asyncio
+import csv
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+import typer
+
+EXPORT_CHUNK_SIZE = 10_000
+EXPORT_WATERMARK_LAG_SECONDS = 5
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# (column, type) of every exported row; types are "string", "int" or "float"
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "string"),
+    ("created_at", "string"),
+    ("status", "string"),
+    ("policy_number", "string"),
+    ("policy_type", "string"),
+    ("currency", "string"),
+    ("holder_name", "string"),
+    ("bank", "string"),
+    ("bank_account", "string"),
+    ("claim_id", "string"),
+    ("claim_type", "string"),
+    ("delay_duration", "int"),
+    ("compensation_amount", "float"),
+    ("filing_date", "string"),
+    ("claim_status", "string"),
+    ("segment_count", "int"),
+    ("flight_numbers", "string"),
+    ("route", "string"),
+    ("first_scheduled_departure", "string"),
+    ("max_segment_delay_hours", "int"),
+    ("payment_transaction_id", "string"),
+    ("payment_reference", "string"),
+    ("payment_batch_id", "string"),
+    ("payment_amount", "float"),
+    ("payment_currency", "string"),
+    ("payment_status", "string"),
+    ("payment_method", "string"),
+]
+EXPORT_COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+EXPORT_PROJECTION = {
+    "_id": 0, "id": 1, "created_at": 1, "status": 1, "policy_holder": 1, "policy_details": 1,
+    "claim_details": 1, "flight_segments": 1, "payment_response": 1
+}
+
+def flatten_claim(claim: dict) -> tuple:
+    """One export row, in ``EXPORT_COLUMNS`` order"""
+    holder = claim.get("policy_holder") or {}
+    policy = claim.get("policy_details") or {}
+    details = claim.get("claim_details") or {}
+    segments = claim.get("flight_segments") or []
+    response = claim.get("payment_response") or {}
+    payment = response.get("payment") or {}
+    route = [segments[0]["departure_code"], *(segment["arrival_code"] for segment in segments)] if segments else []
+    return (
+        claim.get("id"),
+        claim.get("created_at"),
+        claim.get("status"),
+        policy.get("policy_number"),
+        policy.get("policy_type"),
+        policy.get("currency"),
+        holder.get("name"),
+        holder.get("bank"),
+        holder.get("bank_account"),
+        details.get("claim_id"),
+        details.get("claim_type"),
+        details.get("delay_duration"),
+        details.get("compensation_amount"),
+        details.get("filing_date"),
+        details.get("status"),
+        len(segments),
+        "|".join(segment["flight_number"] for segment in segments),
+        "-".join(route),
+        segments[0].get("scheduled_departure") if segments else None,
+        max((segment.get("delay_hours") or 0 for segment in segments), default=None),
+        payment.get("transaction_id"),
+        payment.get("reference"),
+        response.get("batch_id"),
+        payment.get("amount"),
+        payment.get("currency"),
+        payment.get("status"),
+        payment.get("method"),
+    )
+
+def default_watermark(lag_seconds: float = EXPORT_WATERMARK_LAG_SECONDS) -> str:
+    """Upper bound for an export started now"""
+    return (datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)).isoformat()
+
+def export_query(since: Optional[str], until: str, status: Optional[str] = None) -> dict:
+    created_at = {"$lte": until}
+    if since:
+        created_at["$gt"] = since
+    query = {"created_at": created_at}
+    if status:
+        query["status"] = status
+    return query
+
+async def iter_claim_chunks(collection, query: dict, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[List[tuple]]:
+    """Flattened rows of the matching claims, oldest first, ``chunk_size`` at a time"""
+    cursor = collection.find(query, EXPORT_PROJECTION).sort([("created_at", 1), ("id", 1)]).batch_size(chunk_size)
+    rows = []
+    async for claim in cursor:
+        rows.append(flatten_claim(claim))
+        if len(rows) >= chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+async def stream_csv(chunks: AsyncIterator[List[tuple]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMN_NAMES)
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _DrainableSink:
+    """Write-only file for ParquetWriter whose buffered bytes can be taken out as they are written.
+
+    ``tell`` keeps counting across drains because Parquet records absolute
+    offsets of every row group in the file footer.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._position += len(data)
+        return self._buffer.write(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+
+def parquet_batch(rows: List[tuple], schema):
+    import pyarrow as pa
+
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+        schema=schema
+    )
+
+async def stream_parquet(chunks: AsyncIterator[List[tuple]]) -> AsyncIterator[bytes]:
+    """Parquet file bytes, one row group per chunk"""
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for rows in chunks:
+            writer.write_batch(parquet_batch(rows, schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def stream_export(collection, query: dict, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    chunks = iter_claim_chunks(collection, query, chunk_size)
+    return stream_parquet(chunks) if export_format == "parquet" else stream_csv(chunks)
+
+async def export_to_file(collection, path: Path, query: dict, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """Write an export to ``path`` (via a temporary file), returning the bytes written"""
+    partial = path.with_name(path.name + ".partial")
+    written = 0
+    with partial.open("wb") as out:
+        async for data in stream_export(collection, query, export_format, chunk_size):
+            out.write(data)
+            written += len(data)
+    partial.replace(path)
+    return written
+
+cli = typer.Typer(add_completion=False)
+
+@cli.command()
+def main(
+    output: Path = typer.Argument(..., help="File to write; the format defaults to its extension"),
+    export_format: str = typer.Option("", "--format", help="csv or parquet"),
+    since: str = typer.Option("", help="Only claims created after this created_at"),
+    until: str = typer.Option("", help="Only claims created up to this created_at (default: a few seconds ago)"),
+    status: str = typer.Option("", help="Only claims with this status, e.g. paid"),
+    watermark_file: Optional[Path] = typer.Option(None, help="Read --since from and store the new watermark in this file"),
+    chunk_size: int = typer.Option(EXPORT_CHUNK_SIZE, help="Claims per chunk (CSV write / Parquet row group)"),
+):
+    """Export claims flattened to CSV or Parquet"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    export_format = export_format or output.suffix.lstrip(".")
+    if export_format not in EXPORT_FORMATS:
+        raise typer.BadParameter(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if not since and watermark_file and watermark_file.exists():
+        since = watermark_file.read_text().strip()
+    until = until or default_watermark()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    collection = client[os.environ['DB_NAME']].claims
+
+    start = datetime.now(timezone.utc)
+    written = asyncio.run(export_to_file(collection, output, export_query(since or None, until, status or None), export_format, chunk_size))
+    client.close()
+    if watermark_file:
+        watermark_file.write_text(until + "\n")
+    elapsed = (datetime.now(timezone.utc) - start).total_seconds()
+    typer.echo(f"{output}: {written:,} bytes in {elapsed:.2f}s, claims created after {since or 'the beginning'} up to {until}")
+
+if __name__ == "__main__":
+    cli()
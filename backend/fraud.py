@@ -0,0 +1,103 @@
+"""Batch fraud scoring and duplicate-claim keys.
+
+``score_claims`` scores a whole batch of claims with NumPy from three
+features: how many claims the policy made recently (velocity), the payout
+relative to the policy's cap, and how many different policies are paid into
+the same bank account. Every feature adds a bounded number of points on top
+of a base score, and each one past its threshold raises a flag. Only
+low-risk claims without flags are recommended for auto-approval.
+
+``duplicate_key`` hashes (policy number, flight number, departure date) of a
+claim's first segment; a unique index on it rejects a second claim for the
+same journey at insert time.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from compensation import parse_cap
+from itinerary import segment_key
+
+BASE_RISK_SCORE = 5
+VELOCITY_POINTS = 20
+VELOCITY_MAX_POINTS = 40
+AMOUNT_MAX_POINTS = 20
+SHARED_ACCOUNT_POINTS = 15
+SHARED_ACCOUNT_MAX_POINTS = 45
+
+VELOCITY_FLAG_CLAIMS = 3
+SHARED_ACCOUNT_FLAG_POLICIES = 2
+MEDIUM_RISK_SCORE = 40
+HIGH_RISK_SCORE = 70
+
+FLAG_NAMES = ("HIGH_CLAIM_VELOCITY", "AMOUNT_AT_COVERAGE_CAP", "SHARED_BANK_ACCOUNT")
+# Flag lists for every combination of raised flags, by bitmask
+FLAG_COMBINATIONS = [
+    [name for bit, name in enumerate(FLAG_NAMES) if mask >> bit & 1] for mask in range(2 ** len(FLAG_NAMES))
+]
+
+def duplicate_key(policy_number: str, first_segment: dict) -> str:
+    flight_number, date = segment_key(first_segment)
+    return hashlib.blake2b(f"{policy_number}|{flight_number}|{date}".encode(), digest_size=16).hexdigest()
+
+def claim_duplicate_key(claim: dict) -> str:
+    return duplicate_key(claim["policy_details"]["policy_number"], claim["flight_segments"][0])
+
+def score_claims(claims: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized risk scores for many claims.
+
+    ``claims`` needs ``policy_number``, ``compensation_amount`` and
+    ``max_delay_coverage`` columns and may have ``bank_account``. Velocity
+    and shared accounts are counted within the batch unless the frame
+    already carries ``policy_claims`` (claims per policy, this one included)
+    and ``account_policies`` (distinct policies per account), e.g. counted
+    over stored claims. Returns a frame on the same index with the features,
+    ``risk_score``, ``risk_level``, ``recommendation`` and ``flags``.
+    """
+    if "policy_claims" in claims:
+        policy_claims = claims["policy_claims"].to_numpy(dtype=float)
+    else:
+        policy_claims = claims.groupby("policy_number")["policy_number"].transform("size").to_numpy(dtype=float)
+
+    accounts = claims["bank_account"] if "bank_account" in claims else pd.Series(None, index=claims.index, dtype=object)
+    if "account_policies" in claims:
+        account_policies = claims["account_policies"].fillna(0).to_numpy(dtype=float)
+    else:
+        account_policies = (
+            claims.assign(bank_account=accounts).groupby("bank_account")["policy_number"].transform("nunique")
+            .fillna(0).to_numpy(dtype=float)
+        )
+    # Claims without an account on file share nothing
+    account_policies = np.where(accounts.isna().to_numpy(), 0, account_policies)
+
+    cap_codes, caps = pd.factorize(claims["max_delay_coverage"].fillna(""))
+    cap = np.array([parse_cap(value) for value in caps], dtype=float)[cap_codes]
+    amount = claims["compensation_amount"].to_numpy(dtype=float)
+    amount_ratio = np.where(np.isfinite(cap) & (cap > 0), amount / np.where(cap > 0, cap, 1), 0.0)
+
+    score = (
+        BASE_RISK_SCORE
+        + np.minimum(np.maximum(policy_claims - 1, 0) * VELOCITY_POINTS, VELOCITY_MAX_POINTS)
+        + np.minimum(amount_ratio, 1) * AMOUNT_MAX_POINTS
+        + np.minimum(np.maximum(account_policies - 1, 0) * SHARED_ACCOUNT_POINTS, SHARED_ACCOUNT_MAX_POINTS)
+    ).round().astype(np.int64)
+
+    flag_masks = (
+        (policy_claims >= VELOCITY_FLAG_CLAIMS) * 1
+        + (amount_ratio >= 1) * 2
+        + (account_policies >= SHARED_ACCOUNT_FLAG_POLICIES) * 4
+    )
+    level = np.where(score >= HIGH_RISK_SCORE, "High", np.where(score >= MEDIUM_RISK_SCORE, "Medium", "Low"))
+    return pd.DataFrame(
+        {
+            "policy_claims": policy_claims.astype(np.int64),
+            "amount_ratio": amount_ratio,
+            "account_policies": account_policies.astype(np.int64),
+            "risk_score": score,
+            "risk_level": level,
+            "recommendation": np.where((level == "Low") & (flag_masks == 0), "APPROVE", "REVIEW"),
+            "flags": [list(FLAG_COMBINATIONS[mask]) for mask in flag_masks.tolist()],
+        },
+        index=claims.index,
+    )
@@ -0,0 +1,124 @@
+"""Delay attribution across multi-segment itineraries.
+
+The delay that matters to the traveller is how late they reach the final
+destination; per-leg delays overlap (a late inbound leg pushes the
+connection back) so they are not summed. For every leg we separate the
+knock-on delay forced by the inbound leg from the leg's own delay and flag
+missed connections and rebooked legs.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SEGMENT_TIME_FORMAT = "%d %b %Y, %H:%M"
+MIN_CONNECTION_TIME = timedelta(minutes=45)
+REBOOKED_STATUSES = {"Rescheduled", "Rebooked"}
+
+class LegAttribution(NamedTuple):
+    flight_number: str
+    departure_delay_hours: float
+    arrival_delay_hours: float
+    knock_on_hours: float
+    own_delay_hours: float
+    missed_connection: bool
+    rebooked: bool
+
+class JourneyDelay(NamedTuple):
+    legs: List[LegAttribution]
+    effective_delay_hours: float
+    missed_connections: int
+    primary_cause: Optional[str]
+
+def segment_key(segment: dict) -> Tuple[str, str]:
+    """(flight number, departure date) identifying a flight shared across claims"""
+    return segment["flight_number"], segment["scheduled_departure"].split(",")[0]
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, SEGMENT_TIME_FORMAT) if value else None
+
+def _hours(delta: timedelta) -> float:
+    return delta.total_seconds() / 3600
+
+def _actual_times(segment: dict, status: Optional[dict]):
+    """Actual departure/arrival, falling back to the status feed's reported delay"""
+    scheduled_departure = _parse(segment["scheduled_departure"])
+    scheduled_arrival = _parse(segment["scheduled_arrival"])
+    actual_departure = _parse(segment.get("actual_departure"))
+    actual_arrival = _parse(segment.get("actual_arrival"))
+    if actual_departure is None or actual_arrival is None:
+        reported = timedelta(minutes=((status or {}).get("flight") or {}).get("delay_minutes", 0))
+        if not reported:
+            reported = timedelta(hours=segment.get("delay_hours", 0))
+        actual_departure = actual_departure or scheduled_departure + reported
+        actual_arrival = actual_arrival or scheduled_arrival + reported
+    return scheduled_departure, scheduled_arrival, actual_departure, actual_arrival
+
+def attribute_delays(
+    segments: List[dict],
+    statuses: Optional[Dict[Tuple[str, str], dict]] = None,
+    min_connection: timedelta = MIN_CONNECTION_TIME,
+) -> JourneyDelay:
+    """Attribute the journey's arrival delay to its legs, in itinerary order"""
+    statuses = statuses or {}
+    legs = []
+    previous_arrival = None
+    for segment in segments:
+        scheduled_departure, scheduled_arrival, actual_departure, actual_arrival = _actual_times(
+            segment, statuses.get(segment_key(segment))
+        )
+        departure_delay = actual_departure - scheduled_departure
+        arrival_delay = actual_arrival - scheduled_arrival
+
+        knock_on = timedelta(0)
+        missed_connection = False
+        if previous_arrival is not None:
+            earliest_departure = previous_arrival + min_connection
+            missed_connection = earliest_departure > scheduled_departure
+            knock_on = max(timedelta(0), min(earliest_departure - scheduled_departure, departure_delay))
+        own_delay = max(timedelta(0), arrival_delay - knock_on)
+
+        legs.append(LegAttribution(
+            flight_number=segment["flight_number"],
+            departure_delay_hours=_hours(departure_delay),
+            arrival_delay_hours=_hours(arrival_delay),
+            knock_on_hours=_hours(knock_on),
+            own_delay_hours=_hours(own_delay),
+            missed_connection=missed_connection,
+            rebooked=missed_connection or segment.get("status") in REBOOKED_STATUSES,
+        ))
+        previous_arrival = actual_arrival
+
+    primary = max(legs, key=lambda leg: leg.own_delay_hours, default=None)
+    return JourneyDelay(
+        legs=legs,
+        effective_delay_hours=max(0.0, legs[-1].arrival_delay_hours) if legs else 0.0,
+        missed_connections=sum(leg.missed_connection for leg in legs),
+        primary_cause=primary.flight_number if primary and primary.own_delay_hours > 0 else None,
+    )
+
+async def fetch_segment_statuses(
+    segments: Iterable[dict],
+    fetch_status: Callable[[str, str], Awaitable[dict]],
+) -> Dict[Tuple[str, str], dict]:
+    """Fetch every distinct (flight, date) once, all concurrently"""
+    keys = list(dict.fromkeys(segment_key(segment) for segment in segments))
+    results = await asyncio.gather(*(fetch_status(flight_number, date) for flight_number, date in keys))
+    return dict(zip(keys, results))
+
+async def evaluate_itineraries(
+    itineraries: List[List[dict]],
+    fetch_status: Callable[[str, str], Awaitable[dict]],
+) -> List[JourneyDelay]:
+    """Attribute delays for many itineraries, sharing status lookups for common segments"""
+    statuses = await fetch_segment_statuses(
+        (segment for segments in itineraries for segment in segments), fetch_status
+    )
+    return [attribute_delays(segments, statuses) for segments in itineraries]
+
+def journey_summary(journey: JourneyDelay) -> dict:
+    return {
+        "effective_delay_hours": journey.effective_delay_hours,
+        "missed_connections": journey.missed_connections,
+        "primary_cause": journey.primary_cause,
+        "legs": [leg._asdict() for leg in journey.legs],
+    }
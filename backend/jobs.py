@@ -0,0 +1,288 @@
+"""MongoDB-backed job queue and async worker pool for background claim processing.
+
+Jobs are leased with a visibility timeout: a worker that crashes or hangs
+stops renewing its lease and the job becomes leasable again once the lease
+expires. Failed jobs are retried with exponential backoff and jitter until
+``max_attempts`` is reached; a job whose lease expires on its last attempt
+is marked failed too. A handler that raises ``RetryLater`` is waiting on
+something else rather than failing; its job is put back for the given
+delay without using up an attempt.
+"""
+import asyncio
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+class RetryLater(Exception):
+    """The job cannot make progress yet; run it again in ``delay`` seconds"""
+
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason or f"Retry in {delay:g}s")
+        self.delay = delay
+
+class JobQueue:
+    """Durable job queue stored in a MongoDB collection"""
+
+    def __init__(
+        self,
+        collection,
+        visibility_timeout: float = 60.0,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.collection = collection
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+
+    def _new_job(self, job_type: str, payload: dict, now: datetime, delay: float) -> dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "payload": payload,
+            "status": JOB_QUEUED,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "available_at": now + timedelta(seconds=delay),
+            "lease_expires_at": None,
+            "leased_by": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    async def enqueue(self, job_type: str, payload: dict, delay: float = 0) -> dict:
+        job = self._new_job(job_type, payload, datetime.now(timezone.utc), delay)
+        await self.collection.insert_one(job)
+        job.pop("_id", None)
+        return job
+
+    async def enqueue_many(self, job_type: str, payloads: List[dict], delay: float = 0) -> List[dict]:
+        """Enqueue one job per payload with a single insert_many"""
+        if not payloads:
+            return []
+        now = datetime.now(timezone.utc)
+        jobs = [self._new_job(job_type, payload, now, delay) for payload in payloads]
+        await self.collection.insert_many(jobs)
+        for job in jobs:
+            job.pop("_id", None)
+        return jobs
+
+    async def lease(self, worker_id: str) -> Optional[dict]:
+        """Claim the next due job, including jobs whose lease has expired.
+
+        A job whose lease expired on its last attempt is not run again: its
+        worker crashed or hung every time, so it is marked failed instead.
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+            job = await self.collection.find_one_and_update(
+                {"$or": [
+                    {"status": JOB_QUEUED, "available_at": {"$lte": now}},
+                    {"status": JOB_LEASED, "lease_expires_at": {"$lte": now}},
+                ]},
+                {
+                    "$set": {
+                        "status": JOB_LEASED,
+                        "leased_by": worker_id,
+                        "lease_expires_at": now + timedelta(seconds=self.visibility_timeout),
+                        "updated_at": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("available_at", ASCENDING)],
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None or job["attempts"] <= job["max_attempts"]:
+                return job
+            logger.warning("Job %s (%s) lease expired on its last attempt", job["id"], job["type"])
+            await self.collection.update_one(
+                {"id": job["id"], "leased_by": worker_id},
+                {
+                    "$set": {
+                        "status": JOB_FAILED,
+                        "lease_expires_at": None,
+                        "last_error": f"Lease expired after {job['max_attempts']} attempts",
+                        "updated_at": now,
+                    },
+                    "$inc": {"attempts": -1},
+                },
+            )
+
+    async def extend_lease(self, job: dict, worker_id: str) -> bool:
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"id": job["id"], "status": JOB_LEASED, "leased_by": worker_id},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=self.visibility_timeout), "updated_at": now}},
+        )
+        return result.modified_count == 1
+
+    async def complete(self, job: dict, worker_id: str):
+        await self.collection.update_one(
+            {"id": job["id"], "leased_by": worker_id},
+            {"$set": {"status": JOB_DONE, "lease_expires_at": None, "updated_at": datetime.now(timezone.utc)}},
+        )
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+
+    async def fail(self, job: dict, worker_id: str, error: str):
+        now = datetime.now(timezone.utc)
+        if job["attempts"] >= job["max_attempts"]:
+            update = {"status": JOB_FAILED, "lease_expires_at": None}
+        else:
+            update = {
+                "status": JOB_QUEUED,
+                "lease_expires_at": None,
+                "leased_by": None,
+                "available_at": now + timedelta(seconds=self.retry_delay(job["attempts"])),
+            }
+        update.update({"last_error": error, "updated_at": now})
+        await self.collection.update_one({"id": job["id"], "leased_by": worker_id}, {"$set": update})
+
+    async def postpone(self, job: dict, worker_id: str, delay: float, reason: str):
+        """Requeue a job after ``delay`` seconds, giving back the attempt its lease took"""
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"id": job["id"], "leased_by": worker_id},
+            {
+                "$set": {
+                    "status": JOB_QUEUED,
+                    "lease_expires_at": None,
+                    "leased_by": None,
+                    "available_at": now + timedelta(seconds=delay),
+                    "last_error": reason,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": -1},
+            },
+        )
+
+    async def depth(self) -> Dict[str, int]:
+        counts = {JOB_QUEUED: 0, JOB_LEASED: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+class WorkerPool:
+    """Fixed number of async workers leasing jobs from a JobQueue.
+
+    The number of workers is the concurrency limit. Idle workers poll with a
+    backoff from ``poll_interval`` up to ``max_poll_interval``.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Callable[[dict], Awaitable[None]]],
+        concurrency: int = 4,
+        poll_interval: float = 0.1,
+        max_poll_interval: float = 2.0,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.stats: Dict[str, dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def start(self):
+        self._stopping.clear()
+        for n in range(self.concurrency):
+            worker_id = f"worker-{n}-{uuid.uuid4().hex[:6]}"
+            self.stats[worker_id] = {
+                "processed": 0, "failed": 0, "postponed": 0, "busy_seconds": 0.0, "started": time.monotonic()
+            }
+            self._tasks.append(asyncio.create_task(self._run(worker_id)))
+
+    async def stop(self, timeout: float = 10.0):
+        """Let workers finish their current job, then cancel anything left"""
+        self._stopping.set()
+        if self._tasks:
+            done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        self._tasks = []
+
+    async def _run(self, worker_id: str):
+        idle_sleep = self.poll_interval
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.lease(worker_id)
+            except Exception:
+                logger.exception("Worker %s failed to lease a job", worker_id)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=idle_sleep)
+                except asyncio.TimeoutError:
+                    pass
+                idle_sleep = min(idle_sleep * 2, self.max_poll_interval)
+                continue
+            idle_sleep = self.poll_interval
+            await self._process(worker_id, job)
+
+    async def _renew_lease(self, worker_id: str, job: dict):
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            if not await self.queue.extend_lease(job, worker_id):
+                return
+
+    async def _process(self, worker_id: str, job: dict):
+        stats = self.stats[worker_id]
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(self._renew_lease(worker_id, job))
+        try:
+            handler = self.handlers[job["type"]]
+            await handler(job)
+        except RetryLater as e:
+            stats["postponed"] += 1
+            logger.info("Job %s (%s) postponed %gs: %s", job["id"], job["type"], e.delay, e)
+            await self.queue.postpone(job, worker_id, e.delay, str(e))
+        except Exception as e:
+            stats["failed"] += 1
+            logger.warning("Job %s (%s) attempt %d failed: %s", job["id"], job["type"], job["attempts"], e)
+            await self.queue.fail(job, worker_id, repr(e))
+        else:
+            stats["processed"] += 1
+            await self.queue.complete(job, worker_id)
+        finally:
+            heartbeat.cancel()
+            stats["busy_seconds"] += time.monotonic() - started
+
+    def worker_stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "worker": worker_id,
+                "processed": stats["processed"],
+                "failed": stats["failed"],
+                "postponed": stats["postponed"],
+                "jobs_per_second": round(stats["processed"] / max(now - stats["started"], 1e-9), 3),
+                "utilization": round(stats["busy_seconds"] / max(now - stats["started"], 1e-9), 3),
+            }
+            for worker_id, stats in self.stats.items()
+        ]
@@ -0,0 +1,133 @@
+"""Prometheus metrics for the claims backend.
+
+Metrics are registered in their own ``REGISTRY`` rather than the process-wide
+default, so ``/metrics`` only exposes what this module defines and tests can
+read values with ``REGISTRY.get_sample_value`` without a Prometheus server.
+Labelled children are resolved once and reused, so recording a sample is a
+dict lookup and a few counter increments.
+"""
+import functools
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from pymongo import monitoring
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CLAIM_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 4 * 3600, 24 * 3600)
+
+VALIDATION_STEP_SECONDS = Histogram(
+    "claim_validation_step_seconds", "Duration of each claim validation step",
+    ["step"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "external_call_seconds", "Duration of calls to external services",
+    ["call", "outcome"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+DB_OPERATION_SECONDS = Histogram(
+    "mongodb_operation_seconds", "Duration of MongoDB commands",
+    ["collection", "command", "outcome"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+CLAIM_END_TO_END_SECONDS = Histogram(
+    "claim_end_to_end_seconds", "Time from claim creation until it is paid",
+    buckets=CLAIM_BUCKETS, registry=REGISTRY,
+)
+CLAIM_TRANSITIONS = Counter(
+    "claim_transitions_total", "Claim status transitions by the status entered",
+    ["status"], registry=REGISTRY,
+)
+
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total", "Requests to admitted routes by lane and outcome",
+    ["lane", "outcome"], registry=REGISTRY,
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds", "Time admitted requests waited for capacity",
+    ["lane"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+
+_children: Dict[Tuple, object] = {}
+
+def _child(metric, *labels):
+    """Cached labelled child; label resolution is the expensive part of recording"""
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+def observe_step(step_number: int, seconds: float):
+    _child(VALIDATION_STEP_SECONDS, str(step_number)).observe(seconds)
+
+def record_transition(status: str, count: int = 1):
+    _child(CLAIM_TRANSITIONS, status).inc(count)
+
+def record_admission(lane: str, outcome: str):
+    _child(ADMISSION_DECISIONS, lane, outcome).inc()
+
+def observe_admission_wait(lane: str, seconds: float):
+    _child(ADMISSION_WAIT_SECONDS, lane).observe(seconds)
+
+def observe_claim_paid(created_at: str):
+    """Record end-to-end time for a claim created at the ISO timestamp ``created_at``"""
+    try:
+        created = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        return
+    CLAIM_END_TO_END_SECONDS.observe((datetime.now(timezone.utc) - created).total_seconds())
+
+def timed_call(call: str):
+    """Decorator recording an external call's duration and outcome"""
+    def decorator(fn):
+        ok = _child(EXTERNAL_CALL_SECONDS, call, "ok")
+        error = _child(EXTERNAL_CALL_SECONDS, call, "error")
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                error.observe(time.perf_counter() - start)
+                raise
+            ok.observe(time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+class CommandMetrics(monitoring.CommandListener):
+    """pymongo command listener timing every MongoDB operation.
+
+    Motor runs commands on its worker threads, so the collection recorded
+    when a command starts is keyed by connection and request id.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else ""
+            )
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        _child(DB_OPERATION_SECONDS, collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+def render_latest() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,199 @@
+"""Versioned schema migrations for the claims database.
+
+Each migration is an async function taking the database. Applied versions
+are recorded in the ``schema_migrations`` collection, so ``migrate`` only
+runs what is pending and is safe to call on every startup. Migrations must
+be idempotent because two instances starting together may both run one.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+from claim_logs import CLAIM_LOG_TAIL, DUPLICATE_KEY_ERROR
+
+logger = logging.getLogger(__name__)
+
+Migration = Tuple[int, str, Callable[[object], Awaitable[None]]]
+
+CLAIM_ARCHIVE_RETENTION_DAYS = 365
+
+async def create_claim_id_index(db):
+    await db.claims.create_index("id", unique=True, name="claims_id_unique")
+
+async def create_reporting_indexes(db):
+    await db.claims.create_index(
+        [("status", ASCENDING), ("created_at", DESCENDING)],
+        name="claims_status_created_at"
+    )
+    await db.claims.create_index(
+        [("policy_details.policy_number", ASCENDING), ("created_at", DESCENDING)],
+        name="claims_policy_number_created_at"
+    )
+
+async def create_archive_collection(db):
+    # Archived claims are kept for a retention period, then removed by MongoDB's TTL monitor
+    await db.claims_archive.create_index("id", unique=True, name="claims_archive_id_unique")
+    await db.claims_archive.create_index(
+        "archived_at",
+        expireAfterSeconds=CLAIM_ARCHIVE_RETENTION_DAYS * 24 * 3600,
+        name="claims_archive_ttl"
+    )
+
+async def create_listing_indexes(db):
+    # Keyset pagination sorts on (created_at, id); flight filters use the segment flight numbers
+    await db.claims.create_index(
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+        name="claims_created_at_id"
+    )
+    await db.claims.create_index(
+        [("flight_segments.flight_number", ASCENDING), ("created_at", DESCENDING)],
+        name="claims_flight_number_created_at"
+    )
+
+async def move_agent_logs_to_collection(db):
+    """Copy embedded agent_logs into claim_logs and trim claims to a bounded tail"""
+    await db.claim_logs.create_index([("claim_id", ASCENDING), ("seq", ASCENDING)], unique=True, name="claim_logs_claim_seq")
+    async for claim in db.claims.find({"log_count": {"$exists": False}}, {"_id": 0, "id": 1, "agent_logs": 1}):
+        logs = claim.get("agent_logs") or []
+        if logs:
+            await db.claim_logs.delete_many({"claim_id": claim["id"]})
+            await db.claim_logs.insert_many([
+                {"claim_id": claim["id"], "seq": seq, **log} for seq, log in enumerate(logs, start=1)
+            ])
+        await db.claims.update_one(
+            {"id": claim["id"]},
+            {"$set": {"log_count": len(logs), "agent_logs": logs[-CLAIM_LOG_TAIL:]}}
+        )
+
+PAYMENT_IDEMPOTENCY_TTL_HOURS = 24
+
+async def create_payment_requests_collection(db):
+    # Idempotency keys are unique and forgotten a day after first use
+    await db.payment_requests.create_index("key", unique=True, name="payment_requests_key_unique")
+    await db.payment_requests.create_index(
+        "created_at",
+        expireAfterSeconds=PAYMENT_IDEMPOTENCY_TTL_HOURS * 3600,
+        name="payment_requests_ttl"
+    )
+
+async def create_parametric_policies_collection(db):
+    # Policies registered for parametric cover, one document per policy number
+    await db.parametric_policies.create_index("policy_number", unique=True, name="parametric_policies_number_unique")
+
+async def create_fraud_screening_indexes(db):
+    # One claim per (policy, flight, date): claims store a hash of the three as
+    # duplicate_key. Claims from before the key existed are left without one.
+    await db.claims.create_index(
+        "duplicate_key",
+        unique=True,
+        partialFilterExpression={"duplicate_key": {"$exists": True}},
+        name="claims_duplicate_key_unique"
+    )
+    # Shared bank account lookups during screening
+    await db.claims.create_index(
+        [("policy_holder.bank_account", ASCENDING), ("created_at", DESCENDING)],
+        partialFilterExpression={"policy_holder.bank_account": {"$type": "string"}},
+        name="claims_bank_account_created_at"
+    )
+
+async def backfill_claim_versions(db):
+    # Claims from before versioning start at version 0; the first update makes them 1
+    await db.claims.update_many({"version": {"$exists": False}}, {"$set": {"version": 0}})
+
+async def create_claim_logs_archive_collection(db):
+    # Logs of archived claims follow them and expire with them
+    await db.claim_logs_archive.create_index(
+        [("claim_id", ASCENDING), ("seq", ASCENDING)], unique=True, name="claim_logs_archive_claim_seq"
+    )
+    await db.claim_logs_archive.create_index(
+        "archived_at",
+        expireAfterSeconds=CLAIM_ARCHIVE_RETENTION_DAYS * 24 * 3600,
+        name="claim_logs_archive_ttl"
+    )
+
+MIGRATIONS: List[Migration] = [
+    (1, "Unique index on claims.id", create_claim_id_index),
+    (2, "Reporting indexes on status/created_at and policy number", create_reporting_indexes),
+    (3, "Claims archive collection with retention TTL", create_archive_collection),
+    (4, "Listing indexes on created_at/id and flight number", create_listing_indexes),
+    (5, "Move agent logs into the claim_logs collection", move_agent_logs_to_collection),
+    (6, "Payment idempotency keys with expiry", create_payment_requests_collection),
+    (7, "Parametric cover policies keyed by policy number", create_parametric_policies_collection),
+    (8, "Unique duplicate-claim key and bank account index", create_fraud_screening_indexes),
+    (9, "Version number on claims for ETags and conditional updates", backfill_claim_versions),
+    (10, "Claim logs archive collection with retention TTL", create_claim_logs_archive_collection),
+]
+
+async def applied_versions(db) -> set:
+    return {doc["version"] async for doc in db.schema_migrations.find({}, {"_id": 0, "version": 1})}
+
+async def migrate(db, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """Apply pending migrations in version order and return the versions applied"""
+    done = await applied_versions(db)
+    applied = []
+    for version, description, apply in sorted(migrations, key=lambda migration: migration[0]):
+        if version in done:
+            continue
+        logger.info("Applying migration %d: %s", version, description)
+        await apply(db)
+        await db.schema_migrations.update_one(
+            {"version": version},
+            {"$set": {"description": description, "applied_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        applied.append(version)
+    return applied
+
+async def archive_claims(
+    db,
+    older_than_days: int,
+    statuses=("paid", "rejected"),
+    batch_size: int = 1000,
+    on_archived: Optional[Callable[[List[str]], None]] = None,
+) -> int:
+    """Move finished claims older than ``older_than_days`` into ``claims_archive``.
+
+    Their agent logs move into ``claim_logs_archive`` before the claims are
+    removed, so an interrupted run leaves no logs without a claim.
+    ``on_archived(ids)`` is called with each batch of claim ids once they
+    are gone from ``claims``, e.g. to drop anything cached about them.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    archived = 0
+    while True:
+        batch = await db.claims.find(
+            {"status": {"$in": list(statuses)}, "created_at": {"$lt": cutoff}},
+            {"_id": 0}
+        ).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return archived
+        now = datetime.now(timezone.utc)
+        for doc in batch:
+            doc["archived_at"] = now
+        ids = [doc["id"] for doc in batch]
+        # Remove archived copies of any ids left over from an interrupted run before re-inserting
+        await db.claims_archive.delete_many({"id": {"$in": ids}})
+        await db.claims_archive.insert_many(batch, ordered=False)
+        await archive_claim_logs(db, ids, now)
+        await db.claims.delete_many({"id": {"$in": ids}})
+        if on_archived is not None:
+            on_archived(ids)
+        archived += len(batch)
+
+async def archive_claim_logs(db, claim_ids: List[str], archived_at: datetime):
+    """Move the claims' logs into ``claim_logs_archive``"""
+    logs = await db.claim_logs.find({"claim_id": {"$in": claim_ids}}, {"_id": 0}).to_list(None)
+    if not logs:
+        return
+    for log in logs:
+        log["archived_at"] = archived_at
+    try:
+        await db.claim_logs_archive.insert_many(logs, ordered=False)
+    except BulkWriteError as e:
+        # Rows already archived by an interrupted run are fine, anything else is not
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+            raise
+    await db.claim_logs.delete_many({"claim_id": {"$in": claim_ids}})
@@ -0,0 +1,76 @@
+"""In-memory MongoDB stand-in and database instrumentation for tests and benchmarks.
+
+``mock_client`` needs the ``mongomock-motor`` package, which is only a
+development dependency. ``CountingDatabase`` wraps any Motor database.
+"""
+import asyncio
+
+def patch_mongomock_find_and_modify():
+    """Make mongomock's find_one_and_update return the updated document like MongoDB does.
+
+    mongomock re-runs the original filter to fetch the AFTER document when the
+    projection excludes ``_id``, so updates that change a filtered field
+    (e.g. a status transition) return None.
+    """
+    from mongomock.collection import Collection
+
+    if getattr(Collection._find_and_modify, "patched", False):
+        return
+    original = Collection._find_and_modify
+
+    def find_and_modify(self, query, projection=None, *args, **kwargs):
+        if projection is None or not isinstance(projection, dict) or projection.get("_id", 1):
+            return original(self, query, projection, *args, **kwargs)
+        if any(projection.values()):
+            with_id = {**projection, "_id": 1}
+        else:
+            with_id = {field: value for field, value in projection.items() if field != "_id"}
+        document = original(self, query, with_id, *args, **kwargs)
+        if document is not None:
+            document.pop("_id", None)
+        return document
+
+    find_and_modify.patched = True
+    Collection._find_and_modify = find_and_modify
+
+def mock_client():
+    """In-memory Motor client behaving like MongoDB for the queries the server runs"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    patch_mongomock_find_and_modify()
+    return AsyncMongoMockClient()
+
+class CountingCollection:
+    """Collection proxy that counts every awaited database operation.
+
+    With a ``latency`` each operation first sleeps that long, which also
+    makes in-memory stand-ins yield to the event loop like a real driver.
+    """
+
+    def __init__(self, collection, counts, latency=None):
+        self._collection = collection
+        self._counts = counts
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr) or name in ("find", "aggregate", "watch"):
+            return attr
+
+        async def counted(*args, **kwargs):
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if self._latency is not None:
+                await asyncio.sleep(self._latency)
+            return await attr(*args, **kwargs)
+        return counted
+
+class CountingDatabase:
+    """Database proxy handing out CountingCollection wrappers"""
+
+    def __init__(self, database, latency=None):
+        self._database = database
+        self.counts = {}
+        self.latency = latency
+
+    def __getattr__(self, name):
+        return CountingCollection(getattr(self._database, name), self.counts, self.latency)
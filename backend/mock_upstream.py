@@ -0,0 +1,164 @@
+"""Latency and failure simulation for the mock external services.
+
+Every mock endpoint awaits ``UpstreamSimulator.call(service)`` before
+answering. Each service has a profile:
+
+- ``latency``: a distribution spec (see ``parse_latency``)
+- ``tail_rate`` / ``tail_latency``: probability of drawing from a second,
+  slower distribution instead, for long-tail behaviour
+- ``error_rate``: probability of failing with an ``UpstreamError``
+- ``timeout_rate`` / ``timeout``: probability of hanging for ``timeout``
+  seconds and then failing, as a client deadline would
+
+Configured from the environment:
+
+- ``MOCK_UPSTREAM_LATENCY``: default latency for every service
+  (``uniform:0.3:0.8`` unless set; ``zero`` disables sleeping)
+- ``MOCK_UPSTREAM_PROFILE``: JSON object, or a path to a JSON file, mapping
+  service names (``policy``, ``flight``, ``weather``, ``eligibility``,
+  ``screening``, ``payment``; ``*`` for all) to profile overrides
+- ``MOCK_UPSTREAM_SEED``: makes every service's sequence of delays and
+  failures reproducible. Each service draws from its own seeded generator,
+  so the sequence does not depend on how calls to different services
+  interleave.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+from typing import Callable, Dict, NamedTuple, Optional
+
+from upstream import UpstreamError
+
+Distribution = Callable[[random.Random], float]
+
+DEFAULT_LATENCY = "uniform:0.3:0.8"
+
+def parse_latency(spec: str) -> Distribution:
+    """Distribution from a spec: ``zero``, ``SECONDS``, ``fixed:S``, ``uniform:LOW:HIGH``,
+    ``normal:MEAN:STDDEV``, ``lognormal:MEDIAN:SIGMA`` or ``exponential:MEAN``"""
+    kind, _, args = str(spec).strip().partition(":")
+    try:
+        values = [float(value) for value in args.split(":")] if args else []
+        if kind in ("zero", "none"):
+            return lambda rng: 0.0
+        if kind == "fixed":
+            (seconds,) = values
+            return lambda rng: seconds
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high)
+        if kind == "normal":
+            mean, stddev = values
+            return lambda rng: max(0.0, rng.gauss(mean, stddev))
+        if kind == "lognormal":
+            median, sigma = values
+            return lambda rng: rng.lognormvariate(math.log(median), sigma)
+        if kind == "exponential":
+            (mean,) = values
+            return lambda rng: rng.expovariate(1 / mean)
+        if not args:
+            seconds = float(kind)
+            return lambda rng: seconds
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+class ServiceProfile(NamedTuple):
+    latency: Distribution
+    tail_rate: float = 0.0
+    tail_latency: Optional[Distribution] = None
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout: float = 30.0
+
+def build_profile(settings: dict, default_latency: str) -> ServiceProfile:
+    return ServiceProfile(
+        latency=parse_latency(settings.get("latency", default_latency)),
+        tail_rate=float(settings.get("tail_rate", 0.0)),
+        tail_latency=parse_latency(settings["tail_latency"]) if settings.get("tail_latency") else None,
+        error_rate=float(settings.get("error_rate", 0.0)),
+        timeout_rate=float(settings.get("timeout_rate", 0.0)),
+        timeout=float(settings.get("timeout", 30.0)),
+    )
+
+class UpstreamSimulator:
+    """Injects per-service latency and failures into the mock external services"""
+
+    def __init__(self, profiles: Optional[Dict[str, dict]] = None, default_latency: str = DEFAULT_LATENCY, seed: Optional[int] = None):
+        profiles = profiles or {}
+        self.seed = seed
+        self.default_latency = default_latency
+        self._defaults = profiles.get("*", {})
+        self._settings = profiles
+        self._profiles: Dict[str, ServiceProfile] = {}
+        self._rngs: Dict[str, random.Random] = {}
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.timeouts: Dict[str, int] = {}
+        # Fail on bad specs at startup rather than on the first call
+        for service in ("*", *profiles):
+            self.profile(service)
+
+    @classmethod
+    def from_env(cls):
+        profile = os.environ.get('MOCK_UPSTREAM_PROFILE', '')
+        if profile and not profile.lstrip().startswith("{"):
+            with open(profile) as f:
+                profile = f.read()
+        seed = os.environ.get('MOCK_UPSTREAM_SEED')
+        return cls(
+            json.loads(profile) if profile else {},
+            os.environ.get('MOCK_UPSTREAM_LATENCY', DEFAULT_LATENCY),
+            int(seed) if seed else None,
+        )
+
+    def profile(self, service: str) -> ServiceProfile:
+        profile = self._profiles.get(service)
+        if profile is None:
+            settings = {**self._defaults, **self._settings.get(service, {})}
+            profile = self._profiles[service] = build_profile(settings, self.default_latency)
+        return profile
+
+    def _rng(self, service: str) -> random.Random:
+        rng = self._rngs.get(service)
+        if rng is None:
+            rng = self._rngs[service] = random.Random(f"{self.seed}:{service}" if self.seed is not None else None)
+        return rng
+
+    def plan(self, service: str):
+        """Draw the next (delay seconds, failure or None) for a service"""
+        profile = self.profile(service)
+        rng = self._rng(service)
+        # Always draw the same number of values per call so sequences stay aligned
+        outcome, tail = rng.random(), rng.random()
+        if outcome < profile.timeout_rate:
+            return profile.timeout, "timeout"
+        distribution = profile.tail_latency if profile.tail_latency and tail < profile.tail_rate else profile.latency
+        delay = distribution(rng)
+        if outcome < profile.timeout_rate + profile.error_rate:
+            return delay, "error"
+        return delay, None
+
+    async def call(self, service: str):
+        self.calls[service] = self.calls.get(service, 0) + 1
+        delay, failure = self.plan(service)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if failure == "timeout":
+            self.timeouts[service] = self.timeouts.get(service, 0) + 1
+            raise UpstreamError(service, f"timed out after {delay:g}s (injected)")
+        if failure == "error":
+            self.errors[service] = self.errors.get(service, 0) + 1
+            raise UpstreamError(service, "HTTP 503 (injected)")
+
+    def stats(self) -> dict:
+        return {
+            service: {
+                "calls": calls,
+                "errors": self.errors.get(service, 0),
+                "timeouts": self.timeouts.get(service, 0),
+            }
+            for service, calls in sorted(self.calls.items())
+        }
@@ -0,0 +1,114 @@
+"""Parametric flight-delay cover driven by a flight-status event feed.
+
+Policies registered for parametric cover are kept in an in-memory reverse
+index from each covered segment's (flight number, departure date) to the
+policy numbers holding it, so a status event costs one dict lookup however
+many policies there are. Registering or removing a policy only touches that
+policy's entries. A segment leaves the index when its delay triggers, which
+keeps repeated events for the same delayed flight from claiming twice.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from itinerary import SEGMENT_TIME_FORMAT, segment_key
+
+SegmentKey = Tuple[str, str]
+
+class FlightDelayEvent(NamedTuple):
+    flight_number: str
+    date: str
+    status: str
+    delay_minutes: int
+    delay_reason: Optional[str]
+
+    @property
+    def key(self) -> SegmentKey:
+        return self.flight_number, self.date
+
+def parse_flight_event(event) -> FlightDelayEvent:
+    """Event in the flight-status API's shape, plus the flight's departure date.
+
+    The date is the event's ``date`` (e.g. "16 Oct 2026") or the date part of
+    ``flight.scheduled_departure``; the flight-status API alone does not say
+    which day's flight it reports on.
+    """
+    try:
+        flight = event["flight"]
+        flight_number = flight["ident"]
+        date = event.get("date") or (flight.get("scheduled_departure") or "").split(",")[0]
+        delay_minutes = int(flight.get("delay_minutes") or 0)
+    except (KeyError, TypeError, AttributeError, ValueError) as e:
+        raise ValueError(f"Invalid flight status event: {e!r}")
+    if not date:
+        raise ValueError("Flight status event has no departure date")
+    return FlightDelayEvent(flight_number, date, flight.get("status", "Delayed"), delay_minutes, flight.get("delay_reason"))
+
+class SegmentIndex:
+    """Reverse index from (flight number, date) to the policy numbers covering it"""
+
+    def __init__(self):
+        self._policies: Dict[SegmentKey, Set[str]] = {}
+        self._segments: Dict[str, Set[SegmentKey]] = {}
+
+    def __len__(self):
+        return len(self._segments)
+
+    def add(self, policy_number: str, keys: Iterable[SegmentKey]):
+        """Index a policy's segments, replacing whatever was indexed for it before"""
+        self.remove(policy_number)
+        keys = set(keys)
+        if not keys:
+            return
+        self._segments[policy_number] = keys
+        for key in keys:
+            self._policies.setdefault(key, set()).add(policy_number)
+
+    def remove(self, policy_number: str):
+        for key in self._segments.pop(policy_number, ()):
+            policies = self._policies[key]
+            policies.discard(policy_number)
+            if not policies:
+                del self._policies[key]
+
+    def take(self, key: SegmentKey) -> Set[str]:
+        """Remove a segment and return every policy that covered it"""
+        policies = self._policies.pop(key, set())
+        for policy_number in policies:
+            segments = self._segments[policy_number]
+            segments.discard(key)
+            if not segments:
+                del self._segments[policy_number]
+        return policies
+
+    def restore(self, key: SegmentKey, policy_numbers: Iterable[str]):
+        """Put back segments taken for claims that could not be created"""
+        for policy_number in policy_numbers:
+            self._segments.setdefault(policy_number, set()).add(key)
+            self._policies.setdefault(key, set()).add(policy_number)
+
+    def stats(self) -> dict:
+        return {"policies": len(self._segments), "segments": len(self._policies)}
+
+def policy_segment_keys(policy: dict) -> Set[SegmentKey]:
+    """Segments of a policy that have not triggered a claim yet"""
+    triggered = {tuple(key) for key in policy.get("triggered") or ()}
+    return {segment_key(segment) for segment in policy["flight_segments"]} - triggered
+
+def apply_flight_delay(segments: List[dict], event: FlightDelayEvent) -> List[dict]:
+    """Copy of the itinerary with the event's delay recorded on the delayed segment"""
+    delay = timedelta(minutes=event.delay_minutes)
+    updated = []
+    for segment in segments:
+        if segment_key(segment) == event.key:
+            departure = datetime.strptime(segment["scheduled_departure"], SEGMENT_TIME_FORMAT) + delay
+            arrival = datetime.strptime(segment["scheduled_arrival"], SEGMENT_TIME_FORMAT) + delay
+            segment = {
+                **segment,
+                "status": event.status,
+                "delay_hours": event.delay_minutes // 60,
+                "delay_reason": event.delay_reason or segment.get("delay_reason"),
+                "actual_departure": departure.strftime(SEGMENT_TIME_FORMAT),
+                "actual_arrival": arrival.strftime(SEGMENT_TIME_FORMAT),
+            }
+        updated.append(segment)
+    return updated
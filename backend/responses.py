@@ -0,0 +1,47 @@
+"""Fast JSON responses for the API routes.
+
+With no ``response_model`` FastAPI still runs every returned dict through
+``jsonable_encoder`` before ``json.dumps``, walking each nested value in
+Python. Claim documents read from MongoDB (with ``_id`` projected out) are
+already plain JSON types, so ``ORJSONRoute`` hands the endpoint's result
+straight to orjson instead. Anything orjson cannot serialize natively, such
+as a Pydantic model, falls back to ``jsonable_encoder`` for that value only.
+"""
+import asyncio
+import functools
+from typing import Any, Callable
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from starlette.responses import JSONResponse, Response
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=jsonable_encoder, option=ORJSON_OPTIONS)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class ORJSONRoute(APIRoute):
+    """Route returning the endpoint's result as an ``ORJSONResponse``, skipping FastAPI's
+    response validation and ``jsonable_encoder`` pass"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # Sync endpoints keep running in the threadpool; including a router re-creates
+        # its routes from the already wrapped endpoints
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "orjson_response", False):
+            endpoint = orjson_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+def orjson_endpoint(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    async def respond(*args, **kwargs):
+        content = await endpoint(*args, **kwargs)
+        if isinstance(content, Response):
+            return content
+        return ORJSONResponse(content)
+    respond.orjson_response = True
+    return respond
@@ -1,29 +1,75 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import json
+import base64
+import functools
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from zoneinfo import ZoneInfo
+from pydantic import BaseModel, Field, ConfigDict, ValidationError, field_validator
+from typing import Annotated, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 import uuid
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-import random
+from urllib.parse import parse_qs
+
+import pandas as pd
+
+from admission import AdmissionController, AdmissionMiddleware, Lane, TenantLimiter, route
+from batching import MicroBatcher
+from cache import TTLCache
+from claim_logs import ClaimLogWriter, claim_log_update, unflushed_tail
+
+from compensation import compensation_for, parse_rate, settle_claims, terms_for_policy
+from export import EXPORT_FORMATS, default_watermark, export_query, stream_export
+from fraud import claim_duplicate_key, score_claims
+from itinerary import SEGMENT_TIME_FORMAT, attribute_delays, fetch_segment_statuses, journey_summary, segment_key
+from jobs import JobQueue, RetryLater, WorkerPool
+from metrics import CommandMetrics, observe_claim_paid, observe_step, record_transition, render_latest, timed_call
+from migrations import archive_claims, migrate
+from mock_upstream import UpstreamSimulator
+from parametric import SegmentIndex, apply_flight_delay, parse_flight_event, policy_segment_keys
+from responses import ORJSONResponse, ORJSONRoute, dumps as orjson_dumps
+from tracing import (
+    CommandTracing, claim_span, current_trace_id, known_claim_trace, remember_claim_trace, span_trace_context, traced_call,
+    shutdown as shutdown_tracing,
+)
+from upstream import UpstreamClient, UpstreamError
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[CommandMetrics(), CommandTracing()])
 db = client[os.environ['DB_NAME']]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background work before serving and drain it on shutdown (see APP LIFECYCLE)"""
+    await start_background_work()
+    try:
+        yield
+    finally:
+        await stop_background_work()
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Claim endpoints return documents read from MongoDB; ORJSONRoute serializes them as-is
+api_router = APIRouter(prefix="/api", route_class=ORJSONRoute)
+
+# Mock external services, mounted under /api and served standalone by mock_upstream_app
+external_router = APIRouter(prefix="/external")
 
 # Configure logging
 logging.basicConfig(
@@ -40,6 +86,8 @@ class PolicyHolder(BaseModel):
     membership_type: str = "Premium Member"
     email: str = "jolene.chua@email.com"
     phone: str = "+65 9123 4567"
+    bank: str = "DBS Bank"
+    bank_account: Optional[str] = None
 
 class FlightSegment(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -57,6 +105,17 @@ class FlightSegment(BaseModel):
     delay_hours: int = 0
     delay_reason: Optional[str] = None
 
+    @field_validator("scheduled_departure", "scheduled_arrival", "actual_departure", "actual_arrival")
+    @classmethod
+    def check_segment_time(cls, value: Optional[str]) -> Optional[str]:
+        # Delay attribution parses these, so reject what it cannot read when the claim comes in
+        if value is not None:
+            try:
+                datetime.strptime(value, SEGMENT_TIME_FORMAT)
+            except ValueError:
+                raise ValueError(f"must be a time like '16 Oct 2026, 14:30', not {value!r}")
+        return value
+
 class PolicyDetails(BaseModel):
     model_config = ConfigDict(extra="ignore")
     policy_number: str = "TRV-2026-0014879"
@@ -68,8 +127,19 @@ class PolicyDetails(BaseModel):
     trip_cancellation: str = "$5,000"
     medical_coverage: str = "$100,000"
     baggage_loss: str = "$2,500"
+    currency: str = "SGD"
     status: str = "Active"
 
+    @field_validator("flight_delay_coverage")
+    @classmethod
+    def check_flight_delay_coverage(cls, value: str) -> str:
+        # Compensation is computed from this, so reject terms it cannot parse when the claim comes in
+        try:
+            parse_rate(value)
+        except ValueError:
+            raise ValueError(f"must be a rate like '$100 per 6 hours', not {value!r}")
+        return value
+
 class ValidationStep(BaseModel):
     model_config = ConfigDict(extra="ignore")
     step_number: int
@@ -94,6 +164,7 @@ class AgentLog(BaseModel):
     agent: str
     message: str
     log_type: str = "info"  # info, success, warning, error, api_call
+    trace_id: Optional[str] = None
 
 class ClaimWorkflow(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -103,81 +174,37 @@ class ClaimWorkflow(BaseModel):
     flight_segments: List[FlightSegment]
     validation_steps: List[ValidationStep]
     claim_details: Optional[ClaimDetails] = None
-    agent_logs: List[AgentLog] = []
+    journey: Optional[dict] = None  # delay attribution confirmed by step 2
+    agent_logs: List[AgentLog] = []  # most recent CLAIM_LOG_TAIL entries, full history in claim_logs
+    log_count: int = 0
     current_step: int = 0
     status: str = "initialized"  # initialized, processing, approved, paid, rejected
+    version: int = 1  # bumped by every mutation, served as the ETag
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class ClaimWorkflowCreate(BaseModel):
     pass  # No input needed, we use predefined scenario
 
+class ClaimIntake(BaseModel):
+    """A single claim submitted through bulk intake"""
+    model_config = ConfigDict(extra="ignore")
+    policy_holder: PolicyHolder
+    policy_details: PolicyDetails
+    flight_segments: List[FlightSegment] = Field(min_length=1)
+
 # ==================== HELPER FUNCTIONS ====================
 
+SINGAPORE_TZ = ZoneInfo("Asia/Singapore")
+
 def get_dynamic_journey_datetime():
     """Get journey date/time as current Singapore time + 6 hours"""
-    from zoneinfo import ZoneInfo
-    singapore_tz = ZoneInfo("Asia/Singapore")
-    now = datetime.now(singapore_tz)
+    now = datetime.now(SINGAPORE_TZ)
     journey_time = now + timedelta(hours=6)
     return journey_time
 
-def create_scenario():
-    """Create the predefined travel claim scenario"""
-    journey_time = get_dynamic_journey_datetime()
-
-    # Calculate flight times
-    sin_hak_departure = journey_time
-    sin_hak_arrival = sin_hak_departure + timedelta(hours=4, minutes=30)
-
-    # Delayed by 6 hours
-    sin_hak_actual_departure = sin_hak_departure + timedelta(hours=6)
-    sin_hak_actual_arrival = sin_hak_arrival + timedelta(hours=6)
-
-    # Connecting flight
-    hak_nrt_departure = sin_hak_arrival + timedelta(hours=2)  # 2 hour layover originally
-    hak_nrt_arrival = hak_nrt_departure + timedelta(hours=4)
-
-    # Due to delay, connecting flight also pushed
-    hak_nrt_actual_departure = hak_nrt_departure + timedelta(hours=6)
-    hak_nrt_actual_arrival = hak_nrt_arrival + timedelta(hours=6)
-
-    coverage_start = (journey_time - timedelta(days=1)).strftime("%d %B %Y")
-    coverage_end = (journey_time + timedelta(days=14)).strftime("%d %B %Y")
-
-    flight_segments = [
-        FlightSegment(
-            flight_number="SQ656",
-            airline="Singapore Airlines",
-            departure_airport="Singapore Changi Airport",
-            departure_code="SIN",
-            arrival_airport="Haikou Meilan International Airport",
-            arrival_code="HAK",
-            scheduled_departure=sin_hak_departure.strftime("%d %b %Y, %H:%M"),
-            scheduled_arrival=sin_hak_arrival.strftime("%d %b %Y, %H:%M"),
-            actual_departure=sin_hak_actual_departure.strftime("%d %b %Y, %H:%M"),
-            actual_arrival=sin_hak_actual_arrival.strftime("%d %b %Y, %H:%M"),
-            status="Delayed",
-            delay_hours=6,
-            delay_reason="Adverse Weather Conditions - Tropical Storm"
-        ),
-        FlightSegment(
-            flight_number="CA168",
-            airline="Air China",
-            departure_airport="Haikou Meilan International Airport",
-            departure_code="HAK",
-            arrival_airport="Narita International Airport",
-            arrival_code="NRT",
-            scheduled_departure=hak_nrt_departure.strftime("%d %b %Y, %H:%M"),
-            scheduled_arrival=hak_nrt_arrival.strftime("%d %b %Y, %H:%M"),
-            actual_departure=hak_nrt_actual_departure.strftime("%d %b %Y, %H:%M"),
-            actual_arrival=hak_nrt_actual_arrival.strftime("%d %b %Y, %H:%M"),
-            status="Rescheduled",
-            delay_hours=0,
-            delay_reason=None
-        )
-    ]
-
-    validation_steps = [
+def default_validation_steps():
+    """Fresh list of the six pending validation steps"""
+    return [
         ValidationStep(step_number=1, name="Policy Verification", status="pending"),
         ValidationStep(step_number=2, name="Flight Delay Confirmation", status="pending"),
         ValidationStep(step_number=3, name="Delay Duration Validation", status="pending"),
@@ -186,25 +213,154 @@ def create_scenario():
         ValidationStep(step_number=6, name="Security Screening", status="pending"),
     ]
 
-    policy_holder = PolicyHolder()
-    policy_details = PolicyDetails(
-        coverage_start=coverage_start,
-        coverage_end=coverage_end
-    )
+# ==================== SCENARIO TEMPLATES ====================
+
+# Predefined itinerary: times are offsets from the journey start. SQ656 is
+# delayed 6 hours by weather and the CA168 connection is pushed back with it.
+SCENARIO_ITINERARY = [
+    {
+        "segment": {
+            "flight_number": "SQ656",
+            "airline": "Singapore Airlines",
+            "departure_airport": "Singapore Changi Airport",
+            "departure_code": "SIN",
+            "arrival_airport": "Haikou Meilan International Airport",
+            "arrival_code": "HAK",
+            "status": "Delayed",
+            "delay_hours": 6,
+            "delay_reason": "Adverse Weather Conditions - Tropical Storm"
+        },
+        "departure": timedelta(0),
+        "duration": timedelta(hours=4, minutes=30),
+        "slip": timedelta(hours=6)
+    },
+    {
+        "segment": {
+            "flight_number": "CA168",
+            "airline": "Air China",
+            "departure_airport": "Haikou Meilan International Airport",
+            "departure_code": "HAK",
+            "arrival_airport": "Narita International Airport",
+            "arrival_code": "NRT",
+            "status": "Rescheduled",
+            "delay_hours": 0,
+            "delay_reason": None
+        },
+        # 2 hour layover originally
+        "departure": timedelta(hours=6, minutes=30),
+        "duration": timedelta(hours=4),
+        "slip": timedelta(hours=6)
+    }
+]
+
+COVERAGE_DATE_FORMAT = "%d %B %Y"
+
+class ScenarioTemplate:
+    """Pre-validated claim skeleton that only fills in time-dependent fields per render.
+
+    The static parts go through the Pydantic models once, when the template is
+    built. Scheduled times have minute precision, so the time-dependent parts
+    (and a pre-serialized JSON body) are recomputed only when the journey
+    minute changes; a render is otherwise dict copies, a uuid and a timestamp.
+    """
+
+    def __init__(self, itinerary: List[dict]):
+        reference = get_dynamic_journey_datetime()
+        placeholder_time = reference.strftime(SEGMENT_TIME_FORMAT)
+        validated = ClaimWorkflow(
+            policy_holder=PolicyHolder(),
+            policy_details=PolicyDetails(
+                coverage_start=reference.strftime(COVERAGE_DATE_FORMAT),
+                coverage_end=reference.strftime(COVERAGE_DATE_FORMAT)
+            ),
+            flight_segments=[
+                FlightSegment(**leg["segment"], scheduled_departure=placeholder_time, scheduled_arrival=placeholder_time)
+                for leg in itinerary
+            ],
+            validation_steps=default_validation_steps()
+        ).model_dump()
+        self.skeleton = {
+            key: value for key, value in validated.items()
+            if key not in ("id", "created_at", "policy_holder", "policy_details", "flight_segments", "validation_steps")
+        }
+        self.policy_holder = validated["policy_holder"]
+        self.policy_details = validated["policy_details"]
+        self.validation_steps = validated["validation_steps"]
+        self.legs = [
+            (segment, leg["departure"], leg["departure"] + leg["duration"], leg["slip"])
+            for segment, leg in zip(validated["flight_segments"], itinerary)
+        ]
+        self._minute = None
+        self._timed = None
+        self._json_body = None
+
+    def _timed_parts(self, journey_time: datetime) -> dict:
+        minute = journey_time.replace(second=0, microsecond=0)
+        if minute != self._minute:
+            timed = {
+                "policy_details": {
+                    **self.policy_details,
+                    "coverage_start": (journey_time - timedelta(days=1)).strftime(COVERAGE_DATE_FORMAT),
+                    "coverage_end": (journey_time + timedelta(days=14)).strftime(COVERAGE_DATE_FORMAT)
+                },
+                "flight_segments": [
+                    {
+                        **segment,
+                        "scheduled_departure": (journey_time + departure).strftime(SEGMENT_TIME_FORMAT),
+                        "scheduled_arrival": (journey_time + arrival).strftime(SEGMENT_TIME_FORMAT),
+                        "actual_departure": (journey_time + departure + slip).strftime(SEGMENT_TIME_FORMAT),
+                        "actual_arrival": (journey_time + arrival + slip).strftime(SEGMENT_TIME_FORMAT)
+                    }
+                    for segment, departure, arrival, slip in self.legs
+                ]
+            }
+            # Everything but id and created_at, serialized once per minute
+            self._json_body = json.dumps({
+                "policy_holder": self.policy_holder,
+                **timed,
+                "validation_steps": self.validation_steps,
+                **self.skeleton
+            })[1:-1]
+            self._timed = timed
+            self._minute = minute
+        return self._timed
+
+    def render(self, journey_time: Optional[datetime] = None) -> dict:
+        """Claim document for a journey starting at ``journey_time`` (default: now + 6h)"""
+        timed = self._timed_parts(journey_time or get_dynamic_journey_datetime())
+        return {
+            "id": str(uuid.uuid4()),
+            "policy_holder": dict(self.policy_holder),
+            "policy_details": dict(timed["policy_details"]),
+            "flight_segments": [dict(segment) for segment in timed["flight_segments"]],
+            "validation_steps": [dict(step) for step in self.validation_steps],
+            **self.skeleton,
+            "agent_logs": [],
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
 
-    return ClaimWorkflow(
-        policy_holder=policy_holder,
-        policy_details=policy_details,
-        flight_segments=flight_segments,
-        validation_steps=validation_steps
-    )
+    def render_json(self) -> bytes:
+        """The rendered claim as JSON bytes, without building the document"""
+        self._timed_parts(get_dynamic_journey_datetime())
+        created_at = datetime.now(timezone.utc).isoformat()
+        return f'{{"id": "{uuid.uuid4()}", {self._json_body}, "created_at": "{created_at}"}}'.encode()
+
+scenario_template = ScenarioTemplate(SCENARIO_ITINERARY)
+
+def render_scenario() -> dict:
+    """The predefined scenario as a plain claim document (fast path)"""
+    return scenario_template.render()
+
+def create_scenario():
+    """Create the predefined travel claim scenario"""
+    return ClaimWorkflow.model_validate(render_scenario())
 
 # ==================== MOCK EXTERNAL API ENDPOINTS ====================
 
-@api_router.get("/external/flight-status/{flight_number}")
+@external_router.get("/flight-status/{flight_number}")
 async def get_flight_status(flight_number: str):
     """Mock FlightAware API - Simulates real flight status check"""
-    await simulate_api_delay()
+    await simulate_api_delay("flight")
 
     if flight_number == "SQ656":
         return {
@@ -237,10 +393,10 @@ async def get_flight_status(flight_number: str):
         }
     return {"error": "Flight not found"}
 
-@api_router.get("/external/weather/{location_code}")
+@external_router.get("/weather/{location_code}")
 async def get_weather(location_code: str):
     """Mock WeatherAPI - Simulates weather verification"""
-    await simulate_api_delay()
+    await simulate_api_delay("weather")
 
     weather_data = {
         "SIN": {
@@ -266,10 +422,10 @@ async def get_weather(location_code: str):
     }
     return weather_data.get(location_code, {"error": "Location not found"})
 
-@api_router.get("/external/policy-verify/{policy_number}")
+@external_router.get("/policy-verify/{policy_number}")
 async def verify_policy(policy_number: str):
     """Mock Policy Verification API"""
-    await simulate_api_delay()
+    await simulate_api_delay("policy")
 
     if policy_number == "TRV-2026-0014879":
         return {
@@ -292,10 +448,10 @@ async def verify_policy(policy_number: str):
         }
     return {"error": "Policy not found", "verification": "FAILED"}
 
-@api_router.get("/external/eligibility-check")
+@external_router.get("/eligibility-check")
 async def check_eligibility(policy_number: str, claim_type: str, delay_hours: int):
     """Mock Eligibility Check API"""
-    await simulate_api_delay()
+    await simulate_api_delay("eligibility")
 
     return {
         "api": "Income Claims Eligibility Engine",
@@ -311,10 +467,10 @@ async def check_eligibility(policy_number: str, claim_type: str, delay_hours: in
         }
     }
 
-@api_router.get("/external/security-screening")
+@external_router.get("/security-screening")
 async def security_screening(policy_number: str, claim_amount: float):
     """Mock Fraud Detection API"""
-    await simulate_api_delay()
+    await simulate_api_delay("screening")
 
     return {
         "api": "Income Fraud Detection System",
@@ -330,12 +486,17 @@ async def security_screening(policy_number: str, claim_amount: float):
         }
     }
 
-@api_router.post("/external/payment-process")
-async def process_payment(policy_number: str, amount: float, holder_name: str):
-    """Mock Payment Processing API"""
-    await simulate_api_delay()
+# Payments already made by the mock gateway, by payment reference
+mock_payments: Dict[str, dict] = {}
 
-    return {
+@external_router.post("/payment-process")
+async def process_payment(policy_number: str, amount: float, holder_name: str, reference: Optional[str] = None):
+    """Mock Payment Processing API - a repeated reference returns the original payment"""
+    await simulate_api_delay("payment")
+
+    if reference in mock_payments:
+        return mock_payments[reference]
+    payment = {
         "api": "Income Payment Gateway",
         "request_id": f"PAY-{uuid.uuid4().hex[:8].upper()}",
         "payment": {
@@ -348,60 +509,292 @@ async def process_payment(policy_number: str, amount: float, holder_name: str):
             "bank": "DBS Bank",
             "account_ending": "****7890",
             "status": "COMPLETED",
-            "estimated_arrival": "1-2 business days"
+            "estimated_arrival": "1-2 business days",
+            "reference": reference
         }
     }
+    if reference:
+        mock_payments[reference] = payment
+    return payment
+
+class BulkPayment(BaseModel):
+    reference: str
+    policy_number: str
+    amount: float
+    holder_name: str
+
+class BulkPaymentRequest(BaseModel):
+    currency: str
+    bank: str
+    payments: List[BulkPayment] = Field(min_length=1)
+
+@external_router.post("/payment-batch")
+async def process_payment_batch(batch: BulkPaymentRequest):
+    """Mock bulk Payment API - one settlement batch, one result per payment in order"""
+    await simulate_api_delay("payment")
+
+    results = []
+    for item in batch.payments:
+        if item.reference not in mock_payments:
+            mock_payments[item.reference] = {
+                "api": "Income Payment Gateway",
+                "request_id": f"PAY-{uuid.uuid4().hex[:8].upper()}",
+                "payment": {
+                    "transaction_id": f"TXN-{uuid.uuid4().hex[:12].upper()}",
+                    "policy_number": item.policy_number,
+                    "beneficiary": item.holder_name,
+                    "amount": item.amount,
+                    "currency": batch.currency,
+                    "method": "Bank Transfer",
+                    "bank": batch.bank,
+                    "account_ending": "****7890",
+                    "status": "COMPLETED",
+                    "estimated_arrival": "1-2 business days",
+                    "reference": item.reference
+                }
+            }
+        results.append(mock_payments[item.reference]["payment"])
+    return {
+        "api": "Income Payment Gateway",
+        "batch_id": f"BATCH-{uuid.uuid4().hex[:10].upper()}",
+        "results": results
+    }
 
-async def simulate_api_delay():
-    """Simulate network latency for realistic API calls"""
-    import asyncio
-    await asyncio.sleep(random.uniform(0.3, 0.8))
-
-# ==================== MAIN API ENDPOINTS ====================
-
-@api_router.get("/")
-async def root():
-    return {"message": "Income Insurance - Smart Travel Claims API"}
-
-@api_router.get("/scenario")
-async def get_scenario():
-    """Get the current claim scenario with dynamic date/time"""
-    scenario = create_scenario()
-    return scenario.model_dump()
-
-@api_router.post("/claim/start", response_model=dict)
-async def start_claim():
-    """Start a new claim workflow"""
-    workflow = create_scenario()
-    workflow.status = "processing"
+# Latency and failures of the mock services, configured by MOCK_UPSTREAM_* (see mock_upstream.py)
+upstream_simulator = UpstreamSimulator.from_env()
+
+async def simulate_api_delay(service: str):
+    """Simulate the latency (and injected failures) of a call to ``service``"""
+    await upstream_simulator.call(service)
+
+# ==================== INSTRUMENTATION ====================
+
+def external_call(call: str):
+    """Latency metrics and a tracing span around an external service call"""
+    def decorator(fn):
+        return timed_call(call)(traced_call(call)(fn))
+    return decorator
+
+async def claim_trace_context(claim_id: str, claim: Optional[dict] = None) -> Optional[dict]:
+    """Trace context stored when the claim was started, remembered in-process.
+
+    A caller that has already read the claim (with its ``trace``) passes it
+    as ``claim`` so a cold instance does not read the claim again.
+    """
+    trace_context = known_claim_trace(claim_id)
+    if trace_context is None:
+        if claim is None:
+            claim = await db.claims.find_one({"id": claim_id}, {"_id": 0, "trace": 1})
+        trace_context = (claim or {}).get("trace")
+        remember_claim_trace(claim_id, trace_context)
+    return trace_context
+
+def claim_traced(name: str):
+    """Run a claim endpoint in a span of the claim's trace"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(claim_id: str, *args, **kwargs):
+            with claim_span(name, claim_id, await claim_trace_context(claim_id)):
+                return await fn(claim_id, *args, **kwargs)
+        return wrapper
+    return decorator
+
+# ==================== EXTERNAL SERVICE CLIENTS ====================
+
+EXTERNAL_SERVICES = ("policy", "flight", "weather", "eligibility", "screening", "payment")
+
+FLIGHT_STATUS_CACHE_TTL = float(os.environ.get('FLIGHT_STATUS_CACHE_TTL', '60'))
+WEATHER_CACHE_TTL = float(os.environ.get('WEATHER_CACHE_TTL', '300'))
+LOOKUP_CACHE_MAX_ENTRIES = int(os.environ.get('LOOKUP_CACHE_MAX_ENTRIES', '10000'))
+
+def build_upstream_client(name: str, transport=None) -> Optional[UpstreamClient]:
+    """Client for one upstream configured from <NAME>_API_* (or EXTERNAL_API_URL)"""
+    prefix = f"{name.upper()}_API"
+    base_url = os.environ.get(f"{prefix}_URL") or os.environ.get("EXTERNAL_API_URL")
+    if not base_url and transport is None:
+        return None
+    return UpstreamClient(
+        name,
+        base_url or "http://upstream",
+        timeout=float(os.environ.get(f"{prefix}_TIMEOUT", '5')),
+        max_concurrency=int(os.environ.get(f"{prefix}_MAX_CONCURRENCY", '50')),
+        retries=int(os.environ.get(f"{prefix}_RETRIES", '2')),
+        transport=transport
+    )
 
-    # Store in MongoDB
-    doc = workflow.model_dump()
-    await db.claims.insert_one(doc)
+class ExternalServices:
+    """Calls each external service over HTTP when configured, otherwise the in-process mock.
+
+    Flight status and weather lookups are shared by every claim on the same
+    flight or airport, so they go through TTL caches with single-flight loading.
+    """
+
+    def __init__(self, clients: Dict[str, UpstreamClient]):
+        self.clients = clients
+        self.flight_status_cache = TTLCache(FLIGHT_STATUS_CACHE_TTL, LOOKUP_CACHE_MAX_ENTRIES)
+        self.weather_cache = TTLCache(WEATHER_CACHE_TTL, LOOKUP_CACHE_MAX_ENTRIES)
+
+    @classmethod
+    def from_env(cls, transport=None):
+        """Build clients from the environment; a ``transport`` forces HTTP for every service"""
+        clients = {name: build_upstream_client(name, transport) for name in EXTERNAL_SERVICES}
+        return cls({name: client for name, client in clients.items() if client})
+
+    async def aclose(self):
+        for client in self.clients.values():
+            await client.aclose()
+
+    @external_call("verify_policy")
+    async def verify_policy(self, policy_number: str):
+        if "policy" not in self.clients:
+            return await verify_policy(policy_number)
+        return await self.clients["policy"].get(f"/api/external/policy-verify/{policy_number}")
+
+    async def get_flight_status(self, flight_number: str, flight_date: Optional[str] = None):
+        """Flight status, cached per flight number and departure date"""
+        return await self.flight_status_cache.get_or_load(
+            (flight_number, flight_date),
+            lambda: self._fetch_flight_status(flight_number)
+        )
 
-    return {"id": workflow.id, "status": "started"}
+    @external_call("get_flight_status")
+    async def _fetch_flight_status(self, flight_number: str):
+        if "flight" not in self.clients:
+            return await get_flight_status(flight_number)
+        return await self.clients["flight"].get(f"/api/external/flight-status/{flight_number}")
+
+    async def get_weather(self, location_code: str):
+        """Weather report, cached per airport code"""
+        return await self.weather_cache.get_or_load(location_code, lambda: self._fetch_weather(location_code))
+
+    @external_call("get_weather")
+    async def _fetch_weather(self, location_code: str):
+        if "weather" not in self.clients:
+            return await get_weather(location_code)
+        return await self.clients["weather"].get(f"/api/external/weather/{location_code}")
+
+    def cache_stats(self) -> dict:
+        return {"flight_status": self.flight_status_cache.stats(), "weather": self.weather_cache.stats()}
+
+    @external_call("check_eligibility")
+    async def check_eligibility(self, policy_number: str, claim_type: str, delay_hours: int):
+        if "eligibility" not in self.clients:
+            return await check_eligibility(policy_number, claim_type, delay_hours)
+        return await self.clients["eligibility"].get(
+            "/api/external/eligibility-check",
+            {"policy_number": policy_number, "claim_type": claim_type, "delay_hours": delay_hours}
+        )
 
-@api_router.get("/claim/{claim_id}")
-async def get_claim(claim_id: str):
-    """Get claim workflow status"""
-    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0})
-    if not claim:
-        raise HTTPException(status_code=404, detail="Claim not found")
-    return claim
+    @external_call("security_screening")
+    async def security_screening(self, policy_number: str, claim_amount: float):
+        if "screening" not in self.clients:
+            return await security_screening(policy_number, claim_amount)
+        return await self.clients["screening"].get(
+            "/api/external/security-screening",
+            {"policy_number": policy_number, "claim_amount": claim_amount}
+        )
 
-@api_router.post("/claim/{claim_id}/process-step")
-async def process_step(claim_id: str, step_number: int):
-    """Process a specific validation step"""
-    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0})
-    if not claim:
-        raise HTTPException(status_code=404, detail="Claim not found")
+    @external_call("process_payment")
+    async def process_payment(self, policy_number: str, amount: float, holder_name: str, reference: Optional[str] = None):
+        if "payment" not in self.clients:
+            return await process_payment(policy_number, amount, holder_name, reference)
+        params = {"policy_number": policy_number, "amount": amount, "holder_name": holder_name}
+        if reference:
+            params["reference"] = reference
+        return await self.clients["payment"].post("/api/external/payment-process", params)
+
+    @external_call("process_payment_batch")
+    async def process_payment_batch(self, currency: str, bank: str, payments: List[dict]):
+        batch = {"currency": currency, "bank": bank, "payments": payments}
+        if "payment" not in self.clients:
+            return await process_payment_batch(BulkPaymentRequest.model_validate(batch))
+        return await self.clients["payment"].post("/api/external/payment-batch", json=batch)
+
+external_services = ExternalServices.from_env()
+
+# ==================== VALIDATION STEP ENGINE ====================
+
+# Steps each validation step must wait for. Policy and flight status checks
+# are independent; the weather check validates the leg the flight status
+# check attributed the delay to, and eligibility needs the verified policy
+# and the confirmed delay but not the weather, so the two run together. The
+# payment calculation needs eligibility and screening needs the calculated
+# compensation.
+STEP_DEPENDENCIES = {
+    1: (),
+    2: (),
+    3: (2,),
+    4: (1, 2),
+    5: (4,),
+    6: (5,),
+}
+
+def claim_journey(claim: dict, completed: Optional[dict] = None) -> dict:
+    """Journey delay confirmed by step 2, in this pass or an earlier one.
+
+    Before step 2 has run it is attributed from the itinerary alone, without
+    the flight status feed.
+    """
+    if completed and 2 in completed:
+        return completed[2]["itinerary"]
+    return claim.get("journey") or journey_summary(attribute_delays(claim["flight_segments"]))
+
+def journey_delay_hours(journey: dict) -> int:
+    """Whole hours the traveller reaches the final destination late"""
+    return int(journey["effective_delay_hours"])
+
+def primary_segment(claim: dict, journey: dict) -> dict:
+    """Segment the journey delay is attributed to, defaulting to the first leg"""
+    return next(
+        (segment for segment in claim["flight_segments"] if segment["flight_number"] == journey["primary_cause"]),
+        claim["flight_segments"][0]
+    )
 
+def calculate_compensation(delay_hours: int, policy_details: dict):
+    """Tiered payout under the policy's flight delay coverage, capped at its maximum"""
+    amount = compensation_for(delay_hours, terms_for_policy(policy_details), policy_details.get("status", "Active"))
+    return int(amount) if amount.is_integer() else amount
+
+def claim_compensation(claim: dict):
+    """Calculated compensation of a claim, or what it would be from its itinerary"""
+    compensation = (claim.get("claim_details") or {}).get("compensation_amount")
+    if compensation is None:
+        compensation = calculate_compensation(
+            journey_delay_hours(claim_journey(claim)), claim["policy_details"]
+        )
+    return compensation
+
+def validation_waves():
+    """Group steps into waves whose members only depend on earlier waves"""
+    waves = []
+    done = set()
+    remaining = dict(STEP_DEPENDENCIES)
+    while remaining:
+        wave = sorted(step for step, deps in remaining.items() if done.issuperset(deps))
+        if not wave:
+            raise ValueError("Cyclic validation step dependencies")
+        waves.append(wave)
+        done.update(wave)
+        for step in wave:
+            del remaining[step]
+    return waves
+
+async def execute_validation_step(claim: dict, step_number: int, completed: Optional[dict] = None):
+    """Run a single validation step for a claim without touching the database.
+
+    Returns ``(step_result, logs, claim_updates)`` where ``claim_updates`` are
+    extra claim fields to ``$set``. ``completed`` maps step numbers already run
+    in the same pass to their results so dependents can reuse them.
+    """
+    started = time.perf_counter()
+    completed = completed or {}
     timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
     logs = []
     step_result = None
+    claim_updates = {}
 
     if step_number == 1:  # Policy Verification
-        api_response = await verify_policy(claim["policy_details"]["policy_number"])
+        api_response = await external_services.verify_policy(claim["policy_details"]["policy_number"])
         step_result = {
             "status": "completed",
             "details": f"Policy {claim['policy_details']['policy_number']} verified - Status: Active",
@@ -416,24 +809,41 @@ async def process_step(claim_id: str, step_number: int):
         ]
 
     elif step_number == 2:  # Flight Delay Confirmation
-        flight = claim["flight_segments"][0]
-        api_response = await get_flight_status(flight["flight_number"])
+        segments = claim["flight_segments"]
+        statuses = await fetch_segment_statuses(segments, external_services.get_flight_status)
+        journey = attribute_delays(segments, statuses)
+        summary = journey_summary(journey)
+        flight = primary_segment(claim, summary)
+        delay_hours = journey_delay_hours(summary)
+        details = f"Flight {flight['flight_number']} confirmed delayed by {flight['delay_hours']} hours"
+        if len(segments) > 1:
+            details += f" - arrival at {segments[-1]['arrival_code']} delayed by {delay_hours} hours"
         step_result = {
             "status": "completed",
-            "details": f"Flight {flight['flight_number']} confirmed delayed by {flight['delay_hours']} hours",
+            "details": details,
             "api_called": "/api/external/flight-status",
-            "api_response": api_response,
+            "api_response": statuses[segment_key(flight)],
+            "itinerary": summary,
             "timestamp": timestamp
         }
         logs = [
             AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="Flight Delay Confirmation - Processing...", log_type="info"),
-            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Calling FlightAware API: /api/external/flight-status/{flight['flight_number']}", log_type="api_call"),
-            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Flight Status Retrieved: {flight['status']} - {flight['delay_hours']}h delay confirmed", log_type="success"),
+            *(
+                AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Calling FlightAware API: /api/external/flight-status/{segment['flight_number']}", log_type="api_call")
+                for segment in segments
+            ),
+            *(
+                AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Missed connection: {leg.flight_number} rebooked, {leg.knock_on_hours:g}h knock-on delay", log_type="warning")
+                for leg in journey.legs if leg.missed_connection
+            ),
+            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Flight Status Retrieved: {flight['status']} - {delay_hours}h journey delay confirmed", log_type="success"),
         ]
+        # Later steps, including ones run by separate requests, use this attribution
+        claim_updates["journey"] = summary
 
     elif step_number == 3:  # Delay Duration Validation
-        flight = claim["flight_segments"][0]
-        weather_response = await get_weather(flight["departure_code"])
+        flight = primary_segment(claim, claim_journey(claim, completed))
+        weather_response = await external_services.get_weather(flight["departure_code"])
         step_result = {
             "status": "completed",
             "details": f"Delay of {flight['delay_hours']} hours validated - Reason: {flight['delay_reason']}",
@@ -448,15 +858,15 @@ async def process_step(claim_id: str, step_number: int):
         ]
 
     elif step_number == 4:  # Eligibility Assessment
-        flight = claim["flight_segments"][0]
-        eligibility = await check_eligibility(
+        delay_hours = journey_delay_hours(claim_journey(claim, completed))
+        eligibility = await external_services.check_eligibility(
             claim["policy_details"]["policy_number"],
             "Flight Delay",
-            flight["delay_hours"]
+            delay_hours
         )
         step_result = {
             "status": "completed",
-            "details": f"Claim eligible - Delay of {flight['delay_hours']}h meets 6h minimum requirement",
+            "details": f"Claim eligible - Delay of {delay_hours}h meets 6h minimum requirement",
             "api_called": "/api/external/eligibility-check",
             "api_response": eligibility,
             "timestamp": timestamp
@@ -468,150 +878,1522 @@ async def process_step(claim_id: str, step_number: int):
         ]
 
     elif step_number == 5:  # Claim Payment Calculation
-        flight = claim["flight_segments"][0]
-        # $100 per 6 hours
-        compensation = (flight["delay_hours"] // 6) * 100
+        delay_hours = journey_delay_hours(claim_journey(claim, completed))
+        terms = terms_for_policy(claim["policy_details"])
+        compensation = calculate_compensation(delay_hours, claim["policy_details"])
+        formula = f"({delay_hours}h ÷ {terms.period_hours:g}h) × ${terms.amount_per_period:g}"
         step_result = {
             "status": "completed",
-            "details": f"Claim Payment calculated: ${compensation} ({flight['delay_hours']}h ÷ 6h × $100)",
+            "details": f"Claim Payment calculated: ${compensation} ({delay_hours}h ÷ {terms.period_hours:g}h × ${terms.amount_per_period:g})",
             "api_called": None,
             "compensation": compensation,
             "timestamp": timestamp
         }
         logs = [
             AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="Claim Payment Calculation - Processing...", log_type="info"),
-            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Calculating: {flight['delay_hours']} hours delay", log_type="info"),
-            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Formula: ({flight['delay_hours']}h ÷ 6h) × $100 = ${compensation}", log_type="info"),
+            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Calculating: {delay_hours} hours delay", log_type="info"),
+            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Formula: {formula} = ${compensation}", log_type="info"),
             AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Claim Payment Amount: ${compensation}", log_type="success"),
         ]
+        if compensation == terms.cap:
+            logs.insert(3, AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message=f"Capped at policy maximum of ${terms.cap:g}", log_type="info"))
 
         # Update claim with claim payment details
-        await db.claims.update_one(
-            {"id": claim_id},
-            {"$set": {
-                "claim_details": {
-                    "claim_id": f"CLM-TRV-2026-008431",
-                    "claim_type": "Flight Delay Claim Payment",
-                    "delay_duration": flight["delay_hours"],
-                    "compensation_amount": compensation,
-                    "filing_date": datetime.now(timezone.utc).strftime("%d %B %Y"),
-                    "status": "Processing"
-                }
-            }}
-        )
+        claim_updates["claim_details"] = {
+            "claim_id": "CLM-TRV-2026-008431",
+            "claim_type": "Flight Delay Claim Payment",
+            "delay_duration": delay_hours,
+            "compensation_amount": compensation,
+            "filing_date": datetime.now(timezone.utc).strftime("%d %B %Y"),
+            "status": "Processing"
+        }
 
     elif step_number == 6:  # Security Screening
-        flight = claim["flight_segments"][0]
-        compensation = (flight["delay_hours"] // 6) * 100
-        security = await security_screening(claim["policy_details"]["policy_number"], compensation)
+        compensation = completed[5]["compensation"] if 5 in completed else claim_compensation(claim)
+        # The in-house score is batched with the claims being screened concurrently
+        security, screening = await asyncio.gather(
+            external_services.security_screening(claim["policy_details"]["policy_number"], compensation),
+            fraud_batcher.submit(None, (claim, compensation))
+        )
+        passed = screening["recommendation"] == "APPROVE"
+        if passed:
+            details = f"Security screening passed - {screening['risk_level']} risk, auto-approval recommended"
+        else:
+            details = f"Security screening flagged for review - {screening['risk_level']} risk"
+            if screening["flags"]:
+                details += f": {', '.join(screening['flags'])}"
         step_result = {
             "status": "completed",
-            "details": "Security screening passed - Low risk, auto-approval recommended",
+            "details": details,
             "api_called": "/api/external/security-screening",
             "api_response": security,
+            "screening": screening,
             "timestamp": timestamp
         }
         logs = [
             AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="Security Screening - Processing...", log_type="info"),
             AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="Calling Fraud Detection: /api/external/security-screening", log_type="api_call"),
-            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="Security Check: PASSED - Risk Score: 12 (Low)", log_type="success"),
-            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="All 6 validations completed successfully!", log_type="success"),
+            AgentLog(
+                timestamp=timestamp, agent="Claim Processing Agent",
+                message=f"Security Check: {'PASSED' if passed else 'REVIEW'} - Risk Score: {screening['risk_score']} ({screening['risk_level']})",
+                log_type="success" if passed else "warning"
+            ),
+            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="All 6 validations completed successfully!", log_type="success")
+            if passed else
+            AgentLog(timestamp=timestamp, agent="Claim Processing Agent", message="All 6 validations completed - claim held for manual review", log_type="warning"),
         ]
+        claim_updates["fraud_screening"] = screening
 
-    # Update the step in database
     if step_result:
-        await db.claims.update_one(
-            {"id": claim_id, "validation_steps.step_number": step_number},
-            {"$set": {
-                f"validation_steps.$.status": step_result["status"],
-                f"validation_steps.$.details": step_result["details"],
-                f"validation_steps.$.api_called": step_result.get("api_called"),
-                f"validation_steps.$.timestamp": step_result["timestamp"]
-            }}
-        )
+        observe_step(step_number, time.perf_counter() - started)
+    trace_id = current_trace_id()
+    for log in logs:
+        log.trace_id = trace_id
+    return step_result, logs, claim_updates
+
+def step_update_fields(validation_steps: list, step_number: int, step_result: dict) -> dict:
+    """``$set`` fields recording a step result at its index in ``validation_steps``"""
+    index = next(i for i, step in enumerate(validation_steps) if step["step_number"] == step_number)
+    return {
+        f"validation_steps.{index}.status": step_result["status"],
+        f"validation_steps.{index}.details": step_result["details"],
+        f"validation_steps.{index}.api_called": step_result.get("api_called"),
+        f"validation_steps.{index}.timestamp": step_result["timestamp"]
+    }
 
-        # Add logs
-        log_dicts = [log.model_dump() for log in logs]
-        await db.claims.update_one(
-            {"id": claim_id},
-            {"$push": {"agent_logs": {"$each": log_dicts}}}
-        )
+# ==================== BULK INTAKE ====================
 
-    return {"step": step_number, "result": step_result, "logs": [log.model_dump() for log in logs]}
+BULK_INSERT_CHUNK_SIZE = int(os.environ.get('BULK_INSERT_CHUNK_SIZE', '1000'))
+DUPLICATE_KEY_ERROR = 11000
+DUPLICATE_CLAIM_DETAIL = "A claim for this policy, flight and date already exists"
 
-@api_router.post("/claim/{claim_id}/approve")
-async def approve_claim(claim_id: str):
-    """Approve the claim after all validations"""
-    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0})
+def build_intake_claim(item) -> ClaimWorkflow:
+    """Validate a raw intake item and turn it into a processing claim"""
+    intake = ClaimIntake.model_validate(item)
+    return ClaimWorkflow(
+        policy_holder=intake.policy_holder,
+        policy_details=intake.policy_details,
+        flight_segments=intake.flight_segments,
+        validation_steps=default_validation_steps(),
+        status="processing"
+    )
+
+async def insert_claim_chunk(chunk: List[Tuple[int, dict]]) -> List[dict]:
+    """Unordered ``insert_many`` of one chunk, mapping write errors back to item indexes"""
+    write_errors = {}
+    try:
+        await db.claims.insert_many([doc for _, doc in chunk], ordered=False)
+    except BulkWriteError as e:
+        write_errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+    record_transition("processing", len(chunk) - len(write_errors))
+
+    results = []
+    for position, (index, doc) in enumerate(chunk):
+        if position in write_errors:
+            error = write_errors[position]
+            if error.get("code") == DUPLICATE_KEY_ERROR and "duplicate_key" in error.get("errmsg", ""):
+                results.append({"index": index, "status": "duplicate", "errors": [DUPLICATE_CLAIM_DETAIL]})
+            else:
+                results.append({"index": index, "status": "failed", "errors": [error.get("errmsg", "Write failed")]})
+        else:
+            results.append({"index": index, "status": "created", "id": doc["id"]})
+    return results
+
+async def ingest_claims(items: AsyncIterator[Tuple[int, object]], chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> dict:
+    """Validate and persist claims in chunks as they arrive.
+
+    ``items`` yields ``(index, raw_item)`` pairs; a raw item that is an
+    exception (e.g. an undecodable NDJSON line) is reported as an error.
+    Only one chunk of documents is held in memory at a time.
+    """
+    results = []
+    chunk = []
+    async for index, item in items:
+        if isinstance(item, Exception):
+            results.append({"index": index, "status": "failed", "errors": [str(item)]})
+            continue
+        try:
+            workflow = build_intake_claim(item)
+        except ValidationError as e:
+            results.append({
+                "index": index,
+                "status": "failed",
+                "errors": [f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+            })
+            continue
+        doc = workflow.model_dump()
+        doc["duplicate_key"] = claim_duplicate_key(doc)
+        chunk.append((index, doc))
+        if len(chunk) >= chunk_size:
+            results.extend(await insert_claim_chunk(chunk))
+            chunk = []
+    if chunk:
+        results.extend(await insert_claim_chunk(chunk))
+
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    duplicates = sum(1 for result in results if result["status"] == "duplicate")
+    return {
+        "received": len(results),
+        "created": created,
+        "duplicates": duplicates,
+        "failed": len(results) - created - duplicates,
+        "results": results
+    }
+
+async def iter_json_items(items: Iterable) -> AsyncIterator[Tuple[int, object]]:
+    for index, item in enumerate(items):
+        yield index, item
+
+async def iter_ndjson_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Decode an NDJSON byte stream line by line, skipping blank lines"""
+    index = 0
+    buffer = b""
+    async for data in chunks:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, ValueError(f"Invalid JSON: {e}")
+            index += 1
+    if buffer.strip():
+        try:
+            yield index, json.loads(buffer)
+        except ValueError as e:
+            yield index, ValueError(f"Invalid JSON: {e}")
+
+async def read_request_items(request: Request, noun: str) -> AsyncIterator[Tuple[int, object]]:
+    """``(index, item)`` pairs from a JSON array body or an NDJSON stream"""
+    if "ndjson" in request.headers.get("content-type", ""):
+        return iter_ndjson_items(request.stream())
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Request body must be a JSON array of {noun}")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail=f"Request body must be a JSON array of {noun}")
+    return iter_json_items(payload)
+
+# ==================== CLAIM EVENTS ====================
+
+CLAIM_EVENT_QUEUE_SIZE = 256
+SSE_HEARTBEAT_SECONDS = 15
+TERMINAL_CLAIM_STATUSES = {"paid", "rejected"}
+
+class ClaimEventBus:
+    """In-process pub/sub of claim events, one bounded queue per subscriber.
+
+    Publishing never blocks: a subscriber that falls behind loses its oldest
+    queued events rather than slowing down claim processing.
+    """
+
+    def __init__(self, queue_size: int = CLAIM_EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, claim_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(claim_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, claim_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(claim_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[claim_id]
+
+    def publish(self, claim_id: str, event: str, data: dict):
+        for queue in self._subscribers.get(claim_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def publish_logs(self, claim_id: str, logs: List[dict]):
+        for log in logs:
+            self.publish(claim_id, "log", log)
+
+claim_events = ClaimEventBus()
+
+def publish_step(claim_id: str, step_number: int, status: str, step_result: Optional[dict] = None):
+    data = {"step_number": step_number, "status": status}
+    if step_result:
+        data.update({key: step_result.get(key) for key in ("details", "api_called", "timestamp")})
+    claim_events.publish(claim_id, "step", data)
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_claim_events(request: Request, claim_id: str, queue: asyncio.Queue, snapshot: dict):
+    """Yield SSE frames until the claim reaches a terminal status or the client leaves"""
+    try:
+        yield format_sse("snapshot", snapshot)
+        if snapshot.get("status") in TERMINAL_CLAIM_STATUSES:
+            return
+        while not await request.is_disconnected():
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event, data)
+            if event == "status" and data.get("status") in TERMINAL_CLAIM_STATUSES:
+                return
+    finally:
+        claim_events.unsubscribe(claim_id, queue)
+
+# ==================== BACKGROUND JOBS ====================
+
+CLAIM_WORKER_CONCURRENCY = int(os.environ.get('CLAIM_WORKER_CONCURRENCY', '4'))
+
+claim_jobs = JobQueue(
+    db.claim_jobs,
+    visibility_timeout=float(os.environ.get('CLAIM_JOB_VISIBILITY_TIMEOUT', '60')),
+    max_attempts=int(os.environ.get('CLAIM_JOB_MAX_ATTEMPTS', '5')),
+)
+
+async def process_claim_job(job: dict):
+    """Validate, approve and pay a claim, resuming from wherever a previous attempt stopped"""
+    claim_id = job["payload"]["claim_id"]
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0, "status": 1, "validation_steps": 1, "trace": 1})
+    if not claim:
+        raise LookupError(f"Claim {claim_id} not found")
+    # Every span below continues the claim's trace without reading it again
+    trace_context = await claim_trace_context(claim_id, claim)
+
+    if claim["status"] not in ("approved", "paying", "paid"):
+        if any(step["status"] != "completed" for step in claim["validation_steps"]):
+            await validate_claim(claim_id)
+        try:
+            await approve_claim(claim_id)
+        except HTTPException as e:
+            # Flagged claims wait for a person; retrying would not change the screening
+            if e.detail == FRAUD_REVIEW_DETAIL:
+                logger.info("Claim %s held for manual review after fraud screening", claim_id)
+                return
+            raise
+    if claim["status"] != "paid":
+        with claim_span("pay_claim", claim_id, trace_context):
+            try:
+                if PAYOUT_BATCH_SIZE > 1:
+                    outcome = await submit_payout(claim_id)
+                    if outcome["status"] != "paid":
+                        raise RuntimeError(f"Payout failed: {outcome['detail']}")
+                else:
+                    await pay_claim_idempotently(claim_id)
+            except HTTPException as e:
+                # Another worker (perhaps one that crashed) holds the payment lease;
+                # come back once it has run out rather than failing the job
+                if e.detail == PAYMENT_IN_PROGRESS_DETAIL:
+                    raise RetryLater(await payment_lease_remaining(claim_id), e.detail)
+                raise
+
+async def validate_claim_job(job: dict):
+    """Run the validation steps of a claim that has not completed them yet"""
+    claim_id = job["payload"]["claim_id"]
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0, "status": 1, "validation_steps": 1, "trace": 1})
     if not claim:
+        raise LookupError(f"Claim {claim_id} not found")
+    if claim["status"] in PAYMENT_STARTED_STATUSES:
+        return
+    if any(step["status"] != "completed" for step in claim["validation_steps"]):
+        await claim_trace_context(claim_id, claim)
+        await validate_claim(claim_id)
+
+claim_workers = WorkerPool(
+    claim_jobs,
+    {"process_claim": process_claim_job, "validate_claim": validate_claim_job},
+    concurrency=CLAIM_WORKER_CONCURRENCY,
+)
+
+# ==================== CLAIM LOGS ====================
+
+# Agent logs live in the append-only claim_logs collection, one document per
+# entry keyed by (claim_id, seq). The claim document only keeps a bounded tail
+# and the running log_count, which also allocates sequence numbers. History
+# rows are buffered and written in batches, off the request path (see
+# claim_logs.py); until then the claim's tail stands in for them.
+CLAIM_LOG_PAGE_LIMIT = 500
+CLAIM_LOG_BATCH_SIZE = int(os.environ.get('CLAIM_LOG_BATCH_SIZE', '1000'))
+CLAIM_LOG_FLUSH_LINGER = float(os.environ.get('CLAIM_LOG_FLUSH_LINGER', '0.05'))
+
+claim_log_writer = ClaimLogWriter(
+    lambda rows: db.claim_logs.insert_many(rows, ordered=False),
+    max_batch_size=CLAIM_LOG_BATCH_SIZE,
+    linger=CLAIM_LOG_FLUSH_LINGER,
+)
+
+# ==================== CLAIM VERSIONS ====================
+
+# Every claim mutation bumps the claim's version. Claim reads send it as the
+# ETag and answer a matching If-None-Match from claim_versions, the latest
+# version this instance has written or read, without a database read. Writes
+# with If-Match only apply to that version. Versions changed by another
+# instance are picked up once the cached entry expires.
+CLAIM_VERSION_CACHE_TTL = float(os.environ.get('CLAIM_VERSION_CACHE_TTL', '10'))
+CLAIM_VERSION_CACHE_MAX_ENTRIES = int(os.environ.get('CLAIM_VERSION_CACHE_MAX_ENTRIES', '100000'))
+
+claim_versions = TTLCache(CLAIM_VERSION_CACHE_TTL, CLAIM_VERSION_CACHE_MAX_ENTRIES)
+
+def versioned(update: dict) -> dict:
+    """``update`` that also bumps the claim's version"""
+    return {**update, "$inc": {**update.get("$inc", {}), "version": 1}}
+
+def claim_etag(version: int) -> str:
+    return f'"{version}"'
+
+def etag_matches(if_none_match: str, version: int) -> bool:
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or claim_etag(version) in tags or f"W/{claim_etag(version)}" in tags
+
+def expected_version(if_match: Optional[str]) -> Optional[int]:
+    """Version an If-Match header requires, None when there is no precondition"""
+    if not if_match or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a claim ETag")
+
+def version_filter(expected: Optional[int]) -> dict:
+    return {} if expected is None else {"version": expected}
+
+def check_claim_version(claim: dict, expected: Optional[int]):
+    if expected is not None and claim.get("version", 0) != expected:
+        raise HTTPException(status_code=412, detail=f"Claim has changed: version is {claim.get('version', 0)}, not {expected}")
+
+def remember_claim_version(claim: dict):
+    claim_versions.put(claim["id"], claim.get("version", 0))
+
+def forget_claim_versions(claim_ids: List[str]):
+    """Drop cached versions of claims that no longer exist"""
+    for claim_id in claim_ids:
+        claim_versions.discard(claim_id)
+
+# ==================== CLAIM LISTING ====================
+
+CLAIM_LIST_DEFAULT_LIMIT = 50
+CLAIM_LIST_MAX_LIMIT = 500
+CLAIM_LIST_HEAVY_FIELDS = ("agent_logs", "payment_response")
+
+def encode_list_cursor(claim: dict) -> str:
+    raw = json.dumps([claim["created_at"], claim["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_list_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, claim_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, claim_id
+
+def normalize_created_at(value: str, name: str) -> str:
+    """Parse an ISO date/datetime filter into the UTC isoformat stored in created_at"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 date or datetime")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+def claim_list_query(
+    status: Optional[str],
+    policy_number: Optional[str],
+    flight_number: Optional[str],
+    created_from: Optional[str],
+    created_to: Optional[str],
+    cursor: Optional[str] = None,
+) -> dict:
+    conditions = []
+    if status:
+        conditions.append({"status": status})
+    if policy_number:
+        conditions.append({"policy_details.policy_number": policy_number})
+    if flight_number:
+        conditions.append({"flight_segments.flight_number": flight_number})
+    if created_from:
+        conditions.append({"created_at": {"$gte": normalize_created_at(created_from, "created_from")}})
+    if created_to:
+        conditions.append({"created_at": {"$lt": normalize_created_at(created_to, "created_to")}})
+    if cursor:
+        # Keyset on (created_at, id) descending: strictly after the last claim of the previous page
+        created_at, claim_id = decode_list_cursor(cursor)
+        conditions.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": claim_id}}
+        ]})
+    if not conditions:
+        return {}
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def claim_list_projection(fields: Optional[str]) -> dict:
+    if not fields:
+        return {"_id": 0, **{field: 0 for field in CLAIM_LIST_HEAVY_FIELDS}}
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    # id and created_at are always returned so the cursor can be built
+    return {"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in requested}}
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '10000'))
+EXPORT_WATERMARK_LAG_SECONDS = float(os.environ.get('EXPORT_WATERMARK_LAG_SECONDS', '5'))
+
+async def stream_claim_list(query: dict, projection: dict) -> AsyncIterator[bytes]:
+    cursor = db.claims.find(query, projection).sort([("created_at", -1), ("id", -1)]).batch_size(CLAIM_LIST_MAX_LIMIT)
+    async for claim in cursor:
+        yield orjson_dumps(claim) + b"\n"
+
+# ==================== PAYMENTS ====================
+
+# A claim is paid at most once. approved -> paying is a conditional update only
+# one caller can win, and the gateway request carries a per-claim reference so
+# a payment retried after a crash or timeout is deduplicated upstream. Claims
+# stuck in paying longer than the lease can be picked up again for that reason.
+PAYMENT_LEASE_SECONDS = int(os.environ.get('PAYMENT_LEASE_SECONDS', '300'))
+PAYMENT_BATCH_CONCURRENCY = int(os.environ.get('PAYMENT_BATCH_CONCURRENCY', '16'))
+PAYMENT_BATCH_MAX_CLAIMS = 1000
+# Payouts outside the interactive pay endpoint are grouped per (currency, bank)
+# into bulk gateway calls; a batch size of 1 pays each claim individually
+PAYOUT_BATCH_SIZE = int(os.environ.get('PAYOUT_BATCH_SIZE', '100'))
+PAYOUT_BATCH_LINGER = float(os.environ.get('PAYOUT_BATCH_LINGER', '0.05'))
+
+class PaymentBatch(BaseModel):
+    claim_ids: List[str] = Field(min_length=1, max_length=PAYMENT_BATCH_MAX_CLAIMS)
+
+PAYMENT_IN_PROGRESS_DETAIL = "Payment already in progress"
+# Once payment has started the claim's steps, status and logs belong to the payment
+PAYMENT_STARTED_STATUSES = ["paying", "paid"]
+PAYMENT_STARTED_DETAIL = "Claim payment has already started"
+# Only claims fraud screening recommends for auto-approval can be approved
+FRAUD_CLEARED = "APPROVE"
+FRAUD_NOT_SCREENED_DETAIL = "Claim must pass fraud screening before it can be approved"
+FRAUD_REVIEW_DETAIL = "Claim was flagged by fraud screening and needs manual review"
+
+def check_payment_not_started(claim: dict):
+    if claim["status"] in PAYMENT_STARTED_STATUSES:
+        raise HTTPException(status_code=409, detail=PAYMENT_STARTED_DETAIL)
+
+async def claim_update_conflict(claim_id: str, detail: str) -> HTTPException:
+    """Error for a step update that matched no claim: payment started meanwhile, or a newer version"""
+    current = await db.claims.find_one({"id": claim_id}, {"_id": 0, "status": 1})
+    if current and current["status"] in PAYMENT_STARTED_STATUSES:
+        return HTTPException(status_code=409, detail=PAYMENT_STARTED_DETAIL)
+    return HTTPException(status_code=412, detail=detail)
+
+async def payment_lease_remaining(claim_id: str) -> float:
+    """Seconds until the payment lease of a paying claim lapses (at least one)"""
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0, "payment_started_at": 1})
+    started = (claim or {}).get("payment_started_at")
+    if started is None:
+        return 1.0
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    lease_end = started + timedelta(seconds=PAYMENT_LEASE_SECONDS)
+    return max(1.0, (lease_end - datetime.now(timezone.utc)).total_seconds())
+
+def payment_reference(claim_id: str) -> str:
+    return f"CLAIM-{claim_id}"
+
+def payment_logs(
+    timestamp: str,
+    compensation,
+    payment: dict,
+    holder_name: str,
+    endpoint: str = "/api/external/payment-process",
+    trace_id: Optional[str] = None,
+) -> List[dict]:
+    logs = [
+        {"timestamp": timestamp, "agent": "Payment Agent", "message": "Initiating claim payment transfer...", "log_type": "info"},
+        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Calling Payment Gateway: {endpoint}", "log_type": "api_call"},
+        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Payment Processed: ${compensation}", "log_type": "success"},
+        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Transaction ID: {payment['transaction_id']}", "log_type": "success"},
+        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Funds transferred to {holder_name}", "log_type": "success"},
+    ]
+    trace_id = trace_id or current_trace_id()
+    for log in logs:
+        log["trace_id"] = trace_id
+    return logs
+
+async def begin_payment(claim_id: str, expected: Optional[int] = None) -> dict:
+    """Move an approved claim (or one whose payment lease lapsed) to paying, or raise"""
+    now = datetime.now(timezone.utc)
+    claim = await db.claims.find_one_and_update(
+        {
+            "id": claim_id,
+            **version_filter(expected),
+            "$or": [
+                {"status": "approved"},
+                {"status": "paying", "payment_started_at": {"$lt": now - timedelta(seconds=PAYMENT_LEASE_SECONDS)}},
+            ]
+        },
+        versioned({"$set": {"status": "paying", "payment_started_at": now}}),
+        projection={"_id": 0, "agent_logs": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if claim:
+        remember_claim_version(claim)
+        record_transition("paying")
+        return claim
+
+    current = await db.claims.find_one({"id": claim_id}, {"_id": 0, "status": 1, "version": 1})
+    if not current:
         raise HTTPException(status_code=404, detail="Claim not found")
+    check_claim_version(current, expected)
+    if current["status"] == "paying":
+        raise HTTPException(status_code=409, detail=PAYMENT_IN_PROGRESS_DETAIL)
+    if current["status"] == "paid":
+        raise HTTPException(status_code=409, detail="Claim already paid")
+    raise HTTPException(status_code=400, detail="Claim must be approved before payment")
+
+async def execute_payment(claim_id: str, expected: Optional[int] = None) -> dict:
+    """Pay an approved claim exactly once and record the result"""
+    claim = await begin_payment(claim_id, expected)
+    timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
+    compensation = claim.get("claim_details", {}).get("compensation_amount", 100)
+
+    try:
+        payment_response = await external_services.process_payment(
+            claim["policy_details"]["policy_number"],
+            compensation,
+            claim["policy_holder"]["name"],
+            payment_reference(claim_id)
+        )
+    except Exception:
+        # Safe to retry: the gateway deduplicates on the payment reference
+        await db.claims.update_one(
+            {"id": claim_id, "status": "paying"},
+            versioned({"$set": {"status": "approved"}, "$unset": {"payment_started_at": ""}})
+        )
+        claim_versions.discard(claim_id)
+        record_transition("approved")
+        raise
+
+    logs = payment_logs(timestamp, compensation, payment_response["payment"], claim["policy_holder"]["name"])
+
+    updated_claim = await db.claims.find_one_and_update(
+        {"id": claim_id, "status": "paying"},
+        versioned({
+            "$set": {"status": "paid", "claim_details.status": "Paid", "payment_response": payment_response},
+            **claim_log_update(logs)
+        }),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_claim:
+        raise HTTPException(status_code=409, detail="Claim already paid")
+    remember_claim_version(updated_claim)
+    record_transition("paid")
+    observe_claim_paid(claim.get("created_at"))
+    claim_log_writer.append(updated_claim, logs)
+
+    claim_events.publish_logs(claim_id, logs)
+    claim_events.publish(claim_id, "status", {"status": "paid"})
+
+    return {"status": "paid", "payment": payment_response, "logs": logs, "claim": updated_claim}
+
+async def reserve_idempotency_key(key: str, claim_id: str) -> Optional[dict]:
+    """Record a new idempotency key, or return the existing record for a reused one.
+
+    A key still pending after the payment lease has lapsed belongs to a
+    request that died mid-payment; the caller takes it over as if it were new.
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            await db.payment_requests.insert_one(
+                {"key": key, "claim_id": claim_id, "status": "pending", "created_at": now, "started_at": now}
+            )
+            return None
+        except DuplicateKeyError:
+            lapsed = now - timedelta(seconds=PAYMENT_LEASE_SECONDS)
+            taken_over = await db.payment_requests.find_one_and_update(
+                {
+                    "key": key,
+                    "claim_id": claim_id,
+                    "status": "pending",
+                    "$or": [
+                        {"started_at": {"$lt": lapsed}},
+                        # Keys reserved before started_at was recorded
+                        {"started_at": {"$exists": False}, "created_at": {"$lt": lapsed}},
+                    ],
+                },
+                {"$set": {"started_at": now}},
+                projection={"_id": 0, "key": 1}
+            )
+            if taken_over:
+                return None
+            existing = await db.payment_requests.find_one({"key": key}, {"_id": 0})
+            if existing:
+                return existing
+
+async def pay_claim_idempotently(claim_id: str, idempotency_key: Optional[str] = None, expected: Optional[int] = None) -> dict:
+    """Pay a claim, replaying the stored response for a repeated idempotency key"""
+    if idempotency_key:
+        existing = await reserve_idempotency_key(idempotency_key, claim_id)
+        if existing:
+            if existing["claim_id"] != claim_id:
+                raise HTTPException(status_code=422, detail="Idempotency key was used for another claim")
+            if existing["status"] == "completed":
+                return existing["response"]
+            raise HTTPException(status_code=409, detail="A request with this idempotency key is in progress")
+
+    try:
+        response = await execute_payment(claim_id, expected)
+    except Exception:
+        if idempotency_key:
+            await db.payment_requests.delete_one({"key": idempotency_key, "status": "pending"})
+        raise
+    if idempotency_key:
+        await db.payment_requests.update_one(
+            {"key": idempotency_key},
+            {"$set": {"status": "completed", "response": response}}
+        )
+    return response
+
+def payout_group(claim: dict) -> Tuple[str, str]:
+    return claim["policy_details"].get("currency", "SGD"), claim["policy_holder"].get("bank", "DBS Bank")
+
+async def settle_payout_batch(group: Tuple[str, str], claims: List[dict]) -> List[dict]:
+    """Pay a batch of paying claims with one gateway call and record all results with one bulk_write"""
+    currency, bank = group
+    ids = [claim["id"] for claim in claims]
+    try:
+        response = await external_services.process_payment_batch(currency, bank, [
+            {
+                "reference": payment_reference(claim["id"]),
+                "policy_number": claim["policy_details"]["policy_number"],
+                "amount": claim.get("claim_details", {}).get("compensation_amount", 100),
+                "holder_name": claim["policy_holder"]["name"],
+            }
+            for claim in claims
+        ])
+    except Exception:
+        # Safe to retry: the gateway deduplicates on the payment reference
+        await db.claims.update_many(
+            {"id": {"$in": ids}, "status": "paying"},
+            versioned({"$set": {"status": "approved"}, "$unset": {"payment_started_at": ""}})
+        )
+        for claim_id in ids:
+            claim_versions.discard(claim_id)
+        record_transition("approved", len(ids))
+        raise
 
     timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
+    operations, log_rows, outcomes = [], [], []
+    for claim, payment in zip(claims, response["results"]):
+        if payment.get("status") != "COMPLETED":
+            operations.append(UpdateOne(
+                {"id": claim["id"], "status": "paying"},
+                versioned({"$set": {"status": "approved"}, "$unset": {"payment_started_at": ""}})
+            ))
+            outcomes.append((claim, [], {
+                "claim_id": claim["id"], "status": "error", "status_code": 502,
+                "detail": f"Payment {payment.get('status', 'failed')}"
+            }))
+            continue
+        logs = payment_logs(
+            timestamp, payment["amount"], payment, claim["policy_holder"]["name"], "/api/external/payment-batch",
+            (claim.get("trace") or {}).get("trace_id")
+        )
+        payment_response = {"api": response.get("api"), "batch_id": response.get("batch_id"), "payment": payment}
+        operations.append(UpdateOne(
+            {"id": claim["id"], "status": "paying"},
+            versioned({
+                "$set": {"status": "paid", "claim_details.status": "Paid", "payment_response": payment_response},
+                **claim_log_update(logs)
+            })
+        ))
+        # Steps and approval are refused once a claim is paying, so its log count is stable
+        log_rows.append(({"id": claim["id"], "log_count": claim.get("log_count", 0) + len(logs)}, logs))
+        outcomes.append((claim, logs, {"claim_id": claim["id"], "status": "paid", "transaction_id": payment["transaction_id"]}))
+
+    await db.claims.bulk_write(operations, ordered=False)
+    for claim in claims:
+        claim_versions.discard(claim["id"])
+    # Buffered and written after the payment is recorded; a failed log write is only logged
+    for logged_claim, logs in log_rows:
+        claim_log_writer.append(logged_claim, logs)
+    for claim, logs, outcome in outcomes:
+        record_transition("paid" if logs else "approved")
+        if logs:
+            observe_claim_paid(claim.get("created_at"))
+            claim_events.publish_logs(claim["id"], logs)
+            claim_events.publish(claim["id"], "status", {"status": "paid"})
+    return [outcome for _, _, outcome in outcomes]
+
+payout_batcher = MicroBatcher(settle_payout_batch, max_batch_size=PAYOUT_BATCH_SIZE, linger=PAYOUT_BATCH_LINGER)
+
+async def submit_payout(claim_id: str) -> dict:
+    """Pay a claim through the payout batcher, returning its outcome"""
+    claim = await begin_payment(claim_id)
+    return await payout_batcher.submit(payout_group(claim), claim)
+
+async def pay_claims(claim_ids: List[str]) -> List[dict]:
+    """Pay many claims concurrently, reporting an outcome per claim"""
+    slots = asyncio.Semaphore(PAYMENT_BATCH_CONCURRENCY)
+
+    async def pay_one(claim_id: str) -> dict:
+        try:
+            if PAYOUT_BATCH_SIZE > 1:
+                return await submit_payout(claim_id)
+            async with slots:
+                response = await execute_payment(claim_id)
+        except HTTPException as e:
+            return {"claim_id": claim_id, "status": "error", "status_code": e.status_code, "detail": e.detail}
+        except UpstreamError as e:
+            return {"claim_id": claim_id, "status": "error", "status_code": 503, "detail": str(e)}
+        return {
+            "claim_id": claim_id,
+            "status": "paid",
+            "transaction_id": response["payment"]["payment"]["transaction_id"]
+        }
 
-    await db.claims.update_one(
-        {"id": claim_id},
+    return await asyncio.gather(*(pay_one(claim_id) for claim_id in dict.fromkeys(claim_ids)))
+
+# ==================== FRAUD SCREENING ====================
+
+# Claims are scored in batches (see fraud.py). Velocity and shared bank
+# accounts are counted over the stored claims of the last
+# FRAUD_SCREENING_WINDOW_DAYS, with one aggregation each per batch.
+FRAUD_SCREENING_WINDOW_DAYS = int(os.environ.get('FRAUD_SCREENING_WINDOW_DAYS', '30'))
+FRAUD_SCREENING_BATCH_SIZE = int(os.environ.get('FRAUD_SCREENING_BATCH_SIZE', '200'))
+FRAUD_SCREENING_BATCH_LINGER = float(os.environ.get('FRAUD_SCREENING_BATCH_LINGER', '0.02'))
+
+class ScreeningBatch(BaseModel):
+    claim_ids: List[str] = Field(min_length=1, max_length=PAYMENT_BATCH_MAX_CLAIMS)
+
+async def screening_history(policy_numbers: List[str], accounts: List[str]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Recent claims per policy and distinct policies per bank account"""
+    since = (datetime.now(timezone.utc) - timedelta(days=FRAUD_SCREENING_WINDOW_DAYS)).isoformat()
+    policy_claims = {
+        row["_id"]: row["count"]
+        async for row in db.claims.aggregate([
+            {"$match": {"policy_details.policy_number": {"$in": policy_numbers}, "created_at": {"$gte": since}}},
+            {"$group": {"_id": "$policy_details.policy_number", "count": {"$sum": 1}}}
+        ])
+    }
+    account_policies = {}
+    if accounts:
+        account_policies = {
+            row["_id"]: len(row["policies"])
+            async for row in db.claims.aggregate([
+                {"$match": {"policy_holder.bank_account": {"$in": accounts}, "created_at": {"$gte": since}}},
+                {"$group": {"_id": "$policy_holder.bank_account", "policies": {"$addToSet": "$policy_details.policy_number"}}}
+            ])
+        }
+    return policy_claims, account_policies
+
+async def screen_claims(items: List[Tuple[dict, float]]) -> List[dict]:
+    """Risk screening for ``(claim, compensation)`` pairs in one vectorized pass"""
+    frame = pd.DataFrame({
+        "policy_number": [claim["policy_details"]["policy_number"] for claim, _ in items],
+        "bank_account": [claim["policy_holder"].get("bank_account") for claim, _ in items],
+        "compensation_amount": [compensation for _, compensation in items],
+        "max_delay_coverage": [claim["policy_details"].get("max_delay_coverage", "") for claim, _ in items],
+    })
+    policy_claims, account_policies = await screening_history(
+        frame["policy_number"].unique().tolist(), frame["bank_account"].dropna().unique().tolist()
+    )
+    # Claims are screened after they are stored, so they count towards their own history
+    frame["policy_claims"] = frame["policy_number"].map(policy_claims).fillna(1).clip(lower=1)
+    frame["account_policies"] = frame["bank_account"].map(account_policies)
+    scores = score_claims(frame)
+    return [
         {
-            "$set": {"status": "approved", "claim_details.status": "Approved"},
-            "$push": {"agent_logs": {
-                "timestamp": timestamp,
-                "agent": "Orchestrator Agent",
-                "message": "Claim APPROVED - Transferring to Payment Agent",
-                "log_type": "success"
-            }}
+            "risk_score": row["risk_score"],
+            "risk_level": row["risk_level"],
+            "recommendation": row["recommendation"],
+            "flags": row["flags"],
+            "features": {
+                "policy_claims": row["policy_claims"],
+                "amount_ratio": round(row["amount_ratio"], 4),
+                "account_policies": row["account_policies"],
+            },
         }
+        for row in scores.to_dict("records")
+    ]
+
+fraud_batcher = MicroBatcher(
+    lambda _, items: screen_claims(items), max_batch_size=FRAUD_SCREENING_BATCH_SIZE, linger=FRAUD_SCREENING_BATCH_LINGER
+)
+
+# ==================== PARAMETRIC COVER ====================
+
+# Registered policies are indexed in memory by covered segment (see parametric.py).
+# A flight-status event delayed past the threshold takes the segment out of the
+# index and creates a claim for every policy that covered it; the claims are
+# validated by the worker pool and each policy records the segments it triggered.
+PARAMETRIC_DELAY_THRESHOLD_HOURS = float(os.environ.get('PARAMETRIC_DELAY_THRESHOLD_HOURS', '6'))
+FLIGHT_EVENT_CHUNK_SIZE = int(os.environ.get('FLIGHT_EVENT_CHUNK_SIZE', '1000'))
+PARAMETRIC_INDEX_PROJECTION = {
+    "_id": 0, "policy_number": 1, "triggered": 1,
+    "flight_segments.flight_number": 1, "flight_segments.scheduled_departure": 1
+}
+
+parametric_index = SegmentIndex()
+
+async def index_parametric_policies(query: dict) -> int:
+    """(Re)index the stored policies matching ``query``"""
+    indexed = 0
+    async for policy in db.parametric_policies.find(query, PARAMETRIC_INDEX_PROJECTION):
+        parametric_index.add(policy["policy_number"], policy_segment_keys(policy))
+        indexed += 1
+    return indexed
+
+async def register_parametric_policies(items: AsyncIterator[Tuple[int, object]], chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> dict:
+    """Upsert policies for parametric cover by policy number and index their segments"""
+    registered = 0
+    failed = []
+    chunk = {}
+
+    async def flush():
+        now = datetime.now(timezone.utc)
+        await db.parametric_policies.bulk_write([
+            UpdateOne(
+                {"policy_number": number},
+                {"$set": {**policy, "updated_at": now}, "$setOnInsert": {"triggered": [], "created_at": now}},
+                upsert=True
+            )
+            for number, policy in chunk.items()
+        ], ordered=False)
+        # Re-read so segments that already triggered stay out of the index
+        return await index_parametric_policies({"policy_number": {"$in": list(chunk)}})
+
+    async for index, item in items:
+        if isinstance(item, Exception):
+            failed.append({"index": index, "errors": [str(item)]})
+            continue
+        try:
+            intake = ClaimIntake.model_validate(item)
+        except ValidationError as e:
+            failed.append({
+                "index": index,
+                "errors": [f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+            })
+            continue
+        policy = intake.model_dump()
+        chunk[policy["policy_details"]["policy_number"]] = {"policy_number": policy["policy_details"]["policy_number"], **policy}
+        if len(chunk) >= chunk_size:
+            registered += await flush()
+            chunk = {}
+    if chunk:
+        registered += await flush()
+
+    return {"registered": registered, "failed": len(failed), "errors": failed, "index": parametric_index.stats()}
+
+def build_parametric_claim(policy: dict, event) -> dict:
+    doc = ClaimWorkflow(
+        policy_holder=policy["policy_holder"],
+        policy_details=policy["policy_details"],
+        flight_segments=apply_flight_delay(policy["flight_segments"], event),
+        validation_steps=default_validation_steps(),
+        status="processing"
+    ).model_dump()
+    doc["parametric_trigger"] = {**event._asdict(), "policy_number": policy["policy_number"]}
+    doc["duplicate_key"] = claim_duplicate_key(doc)
+    return doc
+
+async def trigger_parametric_claims(triggered: list) -> int:
+    """Create, record and queue validation of claims for ``(event, policy_numbers)`` pairs"""
+    numbers = list({number for _, policy_numbers in triggered for number in policy_numbers})
+    policies = {
+        policy["policy_number"]: policy
+        async for policy in db.parametric_policies.find({"policy_number": {"$in": numbers}}, {"_id": 0})
+    }
+    claims = [
+        (event, number, build_parametric_claim(policies[number], event))
+        for event, policy_numbers in triggered for number in policy_numbers if number in policies
+    ]
+    if not claims:
+        return 0
+
+    results = await insert_claim_chunk([(position, doc) for position, (_, _, doc) in enumerate(claims)])
+    created = []
+    for (event, number, doc), result in zip(claims, results):
+        if result["status"] == "created":
+            created.append((event, number, doc))
+        elif result["status"] == "failed":
+            logger.warning("Parametric claim for %s on %s failed: %s", number, event.key, result["errors"])
+            parametric_index.restore(event.key, [number])
+
+    # A journey that already has a claim counts as triggered too
+    recorded = [(event, number) for (event, number, _), result in zip(claims, results) if result["status"] != "failed"]
+    if recorded:
+        await db.parametric_policies.bulk_write([
+            UpdateOne({"policy_number": number}, {"$addToSet": {"triggered": list(event.key)}})
+            for event, number in recorded
+        ], ordered=False)
+    if created:
+        await claim_jobs.enqueue_many("validate_claim", [{"claim_id": doc["id"]} for _, _, doc in created])
+    return len(created)
+
+async def ingest_flight_events(items: AsyncIterator[Tuple[int, object]], chunk_size: int = FLIGHT_EVENT_CHUNK_SIZE) -> dict:
+    """Match flight-status events against the index and trigger claims in chunks.
+
+    Events below the delay threshold or for flights no policy covers cost a
+    dict lookup; claims are only created for the segments that trigger.
+    """
+    threshold_minutes = PARAMETRIC_DELAY_THRESHOLD_HOURS * 60
+    summary = {"received": 0, "invalid": 0, "delayed": 0, "triggered_segments": 0, "claims_created": 0, "errors": []}
+    triggered = []
+    pending = 0
+    async for index, item in items:
+        summary["received"] += 1
+        try:
+            if isinstance(item, Exception):
+                raise item
+            event = parse_flight_event(item)
+        except ValueError as e:
+            summary["invalid"] += 1
+            summary["errors"].append({"index": index, "errors": [str(e)]})
+            continue
+        if event.delay_minutes < threshold_minutes:
+            continue
+        summary["delayed"] += 1
+        policy_numbers = parametric_index.take(event.key)
+        if not policy_numbers:
+            continue
+        summary["triggered_segments"] += 1
+        triggered.append((event, policy_numbers))
+        pending += len(policy_numbers)
+        if pending >= chunk_size:
+            summary["claims_created"] += await trigger_parametric_claims(triggered)
+            triggered, pending = [], 0
+    if triggered:
+        summary["claims_created"] += await trigger_parametric_claims(triggered)
+    return summary
+
+# ==================== ADMISSION CONTROL ====================
+
+# Claim endpoints are admitted by AdmissionMiddleware: at most
+# ADMISSION_MAX_IN_FLIGHT run at once, the rest wait in a bounded queue per
+# lane, and new intake is limited per policy number or X-Client-Id. Payments
+# get freed capacity first. ADMISSION_MAX_IN_FLIGHT=0 turns it off.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '128'))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_SECONDS', '1'))
+ADMISSION_PAYMENT_QUEUE_SIZE = int(os.environ.get('ADMISSION_PAYMENT_QUEUE_SIZE', '512'))
+ADMISSION_PROCESSING_QUEUE_SIZE = int(os.environ.get('ADMISSION_PROCESSING_QUEUE_SIZE', '256'))
+ADMISSION_INTAKE_QUEUE_SIZE = int(os.environ.get('ADMISSION_INTAKE_QUEUE_SIZE', '128'))
+ADMISSION_TENANT_RATE = float(os.environ.get('ADMISSION_TENANT_RATE', '5'))
+ADMISSION_TENANT_BURST = float(os.environ.get('ADMISSION_TENANT_BURST', '10'))
+
+PAYMENT_LANE = Lane("payment", 0, ADMISSION_PAYMENT_QUEUE_SIZE, rate_limited=False)
+PROCESSING_LANE = Lane("processing", 1, ADMISSION_PROCESSING_QUEUE_SIZE)
+INTAKE_LANE = Lane("intake", 2, ADMISSION_INTAKE_QUEUE_SIZE)
+
+ADMISSION_ROUTES = [
+    route("POST", "/api/claim/{claim_id}/pay", PAYMENT_LANE),
+    route("POST", "/api/claims/pay", PAYMENT_LANE),
+    route("POST", "/api/claim/{claim_id}/process-step", PROCESSING_LANE),
+    route("POST", "/api/claim/{claim_id}/validate", PROCESSING_LANE),
+    route("POST", "/api/claim/{claim_id}/approve", PROCESSING_LANE),
+    route("POST", "/api/claim/start", INTAKE_LANE),
+    route("POST", "/api/claims/bulk", INTAKE_LANE),
+]
+
+admission = AdmissionController(max(ADMISSION_MAX_IN_FLIGHT, 1), ADMISSION_QUEUE_TIMEOUT_SECONDS)
+tenant_limiter = TenantLimiter(ADMISSION_TENANT_RATE, ADMISSION_TENANT_BURST)
+
+def admission_tenant(scope) -> Optional[str]:
+    """Policy number of a request, else its X-Client-Id; None when it names neither"""
+    query = scope["query_string"]
+    if b"policy_number=" in query:
+        policy_number = parse_qs(query.decode("latin-1")).get("policy_number")
+        if policy_number:
+            return f"policy:{policy_number[0]}"
+    for name, value in scope["headers"]:
+        if name == b"x-client-id":
+            return f"client:{value.decode('latin-1')}"
+    return None
+
+@api_router.get("/admission/stats")
+async def get_admission_stats():
+    return {**admission.stats(), "tenants": len(tenant_limiter)}
+
+# ==================== MAIN API ENDPOINTS ====================
+
+@api_router.get("/")
+async def root():
+    return {"message": "Income Insurance - Smart Travel Claims API"}
+
+@api_router.get("/scenario")
+async def get_scenario():
+    """Get the current claim scenario with dynamic date/time"""
+    return Response(content=scenario_template.render_json(), media_type="application/json")
+
+@api_router.post("/claim/start", response_model=dict)
+async def start_claim(background: bool = False, policy_number: Optional[str] = None):
+    """Start a new claim workflow, optionally processed end to end by the worker pool.
+
+    ``policy_number`` files the predefined scenario under another policy. A
+    second claim for the same policy, flight and date is rejected with 409;
+    the response names the claim already filed.
+    """
+    doc = render_scenario()
+    doc["status"] = "processing"
+    if policy_number:
+        doc["policy_details"]["policy_number"] = policy_number
+    doc["duplicate_key"] = claim_duplicate_key(doc)
+
+    # The claim's trace starts here; later requests continue it from doc["trace"]
+    with claim_span("start_claim", doc["id"]) as span:
+        doc["trace"] = span_trace_context(span)
+        # Store in MongoDB; the unique duplicate_key index rejects repeated claims
+        try:
+            await db.claims.insert_one(doc)
+        except DuplicateKeyError:
+            existing = await db.claims.find_one({"duplicate_key": doc["duplicate_key"]}, {"_id": 0, "id": 1})
+            raise HTTPException(
+                status_code=409,
+                detail={"message": DUPLICATE_CLAIM_DETAIL, "claim_id": (existing or {}).get("id")}
+            )
+        record_transition("processing")
+
+        if background:
+            job = await claim_jobs.enqueue("process_claim", {"claim_id": doc["id"]})
+            return {"id": doc["id"], "status": "queued", "job_id": job["id"]}
+
+    return {"id": doc["id"], "status": "started"}
+
+@api_router.get("/cache/stats")
+async def cache_stats():
+    """Hit, miss and coalesced counts for the flight status and weather caches"""
+    return external_services.cache_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+@api_router.get("/payouts/stats")
+async def payout_stats():
+    """Payout batching counters"""
+    return payout_batcher.stats()
+
+@api_router.get("/jobs/stats")
+async def job_stats():
+    """Queue depth by job status and per-worker throughput"""
+    return {"queue": await claim_jobs.depth(), "workers": claim_workers.worker_stats()}
+
+@api_router.post("/claims/bulk")
+async def bulk_start_claims(request: Request):
+    """Start many claims at once from a JSON array or an NDJSON stream"""
+    return await ingest_claims(await read_request_items(request, "claims"))
+
+@api_router.post("/parametric/policies")
+async def register_policies(request: Request):
+    """Register (or update) policies for parametric cover from a JSON array or an NDJSON stream"""
+    return await register_parametric_policies(await read_request_items(request, "policies"))
+
+@api_router.delete("/parametric/policies/{policy_number}")
+async def remove_policy(policy_number: str):
+    """Stop parametric cover for a policy"""
+    result = await db.parametric_policies.delete_one({"policy_number": policy_number})
+    if not result.deleted_count:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    parametric_index.remove(policy_number)
+    return {"policy_number": policy_number, "status": "removed"}
+
+@api_router.post("/parametric/events")
+async def flight_events(request: Request):
+    """Ingest flight-status events, creating and validating claims for delays past the threshold"""
+    return await ingest_flight_events(await read_request_items(request, "flight status events"))
+
+@api_router.get("/parametric/stats")
+async def parametric_stats():
+    """Policies and segments currently indexed for parametric cover"""
+    return parametric_index.stats()
+
+@api_router.get("/claims")
+async def list_claims(
+    status: Optional[str] = None,
+    policy_number: Optional[str] = None,
+    flight_number: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = CLAIM_LIST_DEFAULT_LIMIT,
+    fields: Optional[str] = None,
+    stream: bool = False,
+):
+    """List claims newest first with keyset pagination.
+
+    ``agent_logs`` and ``payment_response`` are left out unless ``fields``
+    names the fields to return. With ``stream=true`` every matching claim
+    is streamed as NDJSON straight from the database cursor.
+    """
+    query = claim_list_query(status, policy_number, flight_number, created_from, created_to, cursor)
+    projection = claim_list_projection(fields)
+    if stream:
+        return StreamingResponse(stream_claim_list(query, projection), media_type="application/x-ndjson")
+
+    limit = max(1, min(limit, CLAIM_LIST_MAX_LIMIT))
+    claims = await db.claims.find(query, projection).sort([("created_at", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_list_cursor(claims[limit - 1]) if len(claims) > limit else None
+    return {"claims": claims[:limit], "next_cursor": next_cursor}
+
+@api_router.get("/claims/export")
+async def export_claims(
+    export_format: str = Query("csv", alias="format"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Stream claims flattened to CSV or Parquet for reconciliation (see export.py).
+
+    Covers claims created after ``since`` up to ``until``; the
+    ``X-Export-Watermark`` response header is the ``since`` of the next
+    incremental export.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    since = normalize_created_at(since, "since") if since else None
+    until = normalize_created_at(until, "until") if until else default_watermark(EXPORT_WATERMARK_LAG_SECONDS)
+    filename = f"claims-{until[:19].replace(':', '')}.{export_format}"
+    return StreamingResponse(
+        stream_export(db.claims, export_query(since, until, status), export_format, EXPORT_CHUNK_SIZE),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Export-Watermark": until}
     )
 
-    return {"status": "approved", "timestamp": timestamp}
+@api_router.get("/flights/{flight_number}/settlement")
+async def flight_settlement(flight_number: str, delay_hours: Optional[float] = None):
+    """Eligibility and compensation for every open claim on a flight in one vectorized pass.
+
+    ``delay_hours`` overrides each claim's recorded delay for the flight,
+    e.g. to settle a cancellation for everyone at once.
+    """
+    claims = await db.claims.find(
+        {"flight_segments.flight_number": flight_number, "status": {"$nin": ["paid", "rejected"]}},
+        {"_id": 0, "id": 1, "policy_details": 1, "flight_segments": 1}
+    ).to_list(None)
+    if not claims:
+        return {"flight_number": flight_number, "claims": [], "total_compensation": 0.0}
+
+    frame = pd.DataFrame({
+        "claim_id": [claim["id"] for claim in claims],
+        "delay_hours": [
+            delay_hours if delay_hours is not None else next(
+                segment["delay_hours"] for segment in claim["flight_segments"]
+                if segment["flight_number"] == flight_number
+            )
+            for claim in claims
+        ],
+        "flight_delay_coverage": [claim["policy_details"]["flight_delay_coverage"] for claim in claims],
+        "max_delay_coverage": [claim["policy_details"].get("max_delay_coverage", "") for claim in claims],
+        "policy_status": [claim["policy_details"].get("status", "Active") for claim in claims],
+    })
+    settlement = settle_claims(frame)
+
+    return {
+        "flight_number": flight_number,
+        "claims": [
+            {"claim_id": claim_id, "eligible": bool(eligible), "compensation": float(compensation)}
+            for claim_id, eligible, compensation in zip(frame["claim_id"], settlement["eligible"], settlement["compensation"])
+        ],
+        "total_compensation": float(settlement["compensation"].sum())
+    }
+
+@api_router.get("/claim/{claim_id}")
+async def get_claim(claim_id: str, if_none_match: Annotated[Optional[str], Header()] = None):
+    """Get claim workflow status; 304 when If-None-Match has the current version's ETag"""
+    if if_none_match:
+        version = claim_versions.get(claim_id)
+        if version is not None and etag_matches(if_none_match, version):
+            return Response(status_code=304, headers={"ETag": claim_etag(version)})
 
-@api_router.post("/claim/{claim_id}/pay")
-async def pay_claim(claim_id: str):
-    """Process payment for the approved claim"""
     claim = await db.claims.find_one({"id": claim_id}, {"_id": 0})
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
+    remember_claim_version(claim)
+    # Steps requested after the claim is opened continue its trace without a lookup
+    remember_claim_trace(claim_id, claim.get("trace"))
+    etag = claim_etag(claim.get("version", 0))
+    if if_none_match and etag_matches(if_none_match, claim.get("version", 0)):
+        return Response(status_code=304, headers={"ETag": etag})
+    return ORJSONResponse(claim, headers={"ETag": etag})
+
+@api_router.get("/claim/{claim_id}/itinerary")
+async def get_claim_itinerary(claim_id: str):
+    """Journey delay attribution across all of the claim's flight segments"""
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0, "flight_segments": 1})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    statuses = await fetch_segment_statuses(claim["flight_segments"], external_services.get_flight_status)
+    return journey_summary(attribute_delays(claim["flight_segments"], statuses))
+
+@api_router.get("/claim/{claim_id}/logs")
+async def get_claim_logs(claim_id: str, after: int = 0, limit: int = CLAIM_LOG_PAGE_LIMIT):
+    """Agent logs with a sequence number greater than ``after``, oldest first.
+
+    A page can stop short of the claim's newest entries: beyond the limit,
+    or while their history rows are still buffered and the claim's tail no
+    longer reaches back to them. ``pending`` counts the entries after
+    ``next_after`` not returned yet; poll again from ``next_after`` until it
+    is 0.
+    """
+    limit = max(1, min(limit, CLAIM_LOG_PAGE_LIMIT))
+    logs = await db.claim_logs.find(
+        {"claim_id": claim_id, "seq": {"$gt": after}},
+        {"_id": 0, "claim_id": 0}
+    ).sort("seq", 1).limit(limit).to_list(limit)
+    # Read after the history so log_count covers every row returned
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0, "agent_logs": 1, "log_count": 1})
+    if not claim:
+        if not logs:
+            raise HTTPException(status_code=404, detail="Claim not found")
+        claim = {"log_count": logs[-1]["seq"]}
+    if len(logs) < limit:
+        # The newest rows may still be buffered; the claim's tail has them
+        logs += unflushed_tail(claim, logs[-1]["seq"] if logs else after)[:limit - len(logs)]
+    next_after = logs[-1]["seq"] if logs else after
+    return {"logs": logs, "next_after": next_after, "pending": max(0, claim.get("log_count", 0) - next_after)}
+
+@api_router.get("/claim/{claim_id}/events")
+async def claim_event_stream(claim_id: str, request: Request):
+    """Server-sent events for step transitions, agent logs and status changes"""
+    # Subscribe before reading the snapshot so no event falls in between
+    queue = claim_events.subscribe(claim_id)
+    snapshot = await db.claims.find_one(
+        {"id": claim_id},
+        {"_id": 0, "id": 1, "status": 1, "current_step": 1, "validation_steps": 1}
+    )
+    if not snapshot:
+        claim_events.unsubscribe(claim_id, queue)
+        raise HTTPException(status_code=404, detail="Claim not found")
 
-    if claim.get("status") != "approved":
-        raise HTTPException(status_code=400, detail="Claim must be approved before payment")
+    return StreamingResponse(
+        stream_claim_events(request, claim_id, queue, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
+@api_router.post("/claim/{claim_id}/process-step")
+@claim_traced("process_step")
+async def process_step(claim_id: str, step_number: int, if_match: Annotated[Optional[str], Header()] = None):
+    """Process a specific validation step; with If-Match only if the claim is still at that version"""
+    expected = expected_version(if_match)
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    check_claim_version(claim, expected)
+    check_payment_not_started(claim)
+
+    if step_number in STEP_DEPENDENCIES:
+        publish_step(claim_id, step_number, "in_progress")
+    step_result, logs, claim_updates = await execute_validation_step(claim, step_number)
+    if not step_result:
+        return {"step": step_number, "result": None, "logs": [], "claim": claim}
+
+    # Step status, claim details and logs are applied in a single round trip
+    log_dicts = [log.model_dump() for log in logs]
+    updated_claim = await db.claims.find_one_and_update(
+        {"id": claim_id, "status": {"$nin": PAYMENT_STARTED_STATUSES}, **version_filter(expected)},
+        versioned({
+            "$set": {**claim_updates, **step_update_fields(claim["validation_steps"], step_number, step_result)},
+            **claim_log_update(log_dicts)
+        }),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_claim:
+        raise await claim_update_conflict(claim_id, "Claim changed while the step was running")
+    remember_claim_version(updated_claim)
+    claim_log_writer.append(updated_claim, log_dicts)
 
-    # Get compensation amount
-    compensation = claim.get("claim_details", {}).get("compensation_amount", 100)
+    publish_step(claim_id, step_number, step_result["status"], step_result)
+    claim_events.publish_logs(claim_id, log_dicts)
 
-    # Process payment
-    payment_response = await process_payment(
-        claim["policy_details"]["policy_number"],
-        compensation,
-        claim["policy_holder"]["name"]
+    return {"step": step_number, "result": step_result, "logs": log_dicts, "claim": updated_claim}
+
+@api_router.post("/claim/{claim_id}/validate")
+@claim_traced("validate_claim")
+async def validate_claim(claim_id: str, if_match: Annotated[Optional[str], Header()] = None):
+    """Run the validation steps not completed yet, executing independent steps concurrently"""
+    expected = expected_version(if_match)
+    claim = await db.claims.find_one({"id": claim_id}, {"_id": 0})
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    check_claim_version(claim, expected)
+    check_payment_not_started(claim)
+
+    # Re-running validation only runs what is left, so it never repeats a step or its logs
+    already_completed = {step["step_number"] for step in claim["validation_steps"] if step["status"] == "completed"}
+    completed = {}
+    step_logs = {}
+    updates = {}
+    for wave in validation_waves():
+        wave = [step_number for step_number in wave if step_number not in already_completed]
+        if not wave:
+            continue
+        for step_number in wave:
+            publish_step(claim_id, step_number, "in_progress")
+        outcomes = await asyncio.gather(
+            *(execute_validation_step(claim, step_number, completed) for step_number in wave)
+        )
+        for step_number, (step_result, logs, claim_updates) in zip(wave, outcomes):
+            completed[step_number] = step_result
+            step_logs[step_number] = [log.model_dump() for log in logs]
+            updates.update(claim_updates)
+            updates.update(step_update_fields(claim["validation_steps"], step_number, step_result))
+            publish_step(claim_id, step_number, step_result["status"], step_result)
+            claim_events.publish_logs(claim_id, step_logs[step_number])
+
+    if not completed:
+        return {"steps": [], "logs": [], "claim": claim}
+
+    # Logs are appended in step order regardless of completion order
+    log_dicts = [log for step_number in sorted(step_logs) for log in step_logs[step_number]]
+    updated_claim = await db.claims.find_one_and_update(
+        {"id": claim_id, "status": {"$nin": PAYMENT_STARTED_STATUSES}, **version_filter(expected)},
+        versioned({
+            "$set": updates,
+            **claim_log_update(log_dicts)
+        }),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
+    if not updated_claim:
+        raise await claim_update_conflict(claim_id, "Claim changed while it was being validated")
+    remember_claim_version(updated_claim)
+    claim_log_writer.append(updated_claim, log_dicts)
 
-    logs = [
-        {"timestamp": timestamp, "agent": "Payment Agent", "message": "Initiating claim payment transfer...", "log_type": "info"},
-        {"timestamp": timestamp, "agent": "Payment Agent", "message": "Calling Payment Gateway: /api/external/payment-process", "log_type": "api_call"},
-        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Payment Processed: ${compensation}", "log_type": "success"},
-        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Transaction ID: {payment_response['payment']['transaction_id']}", "log_type": "success"},
-        {"timestamp": timestamp, "agent": "Payment Agent", "message": f"Funds transferred to {claim['policy_holder']['name']}", "log_type": "success"},
-    ]
+    return {
+        "steps": [
+            {"step": step_number, "result": completed[step_number], "logs": step_logs[step_number]}
+            for step_number in sorted(completed)
+        ],
+        "logs": log_dicts,
+        "claim": updated_claim
+    }
 
-    await db.claims.update_one(
-        {"id": claim_id},
+@api_router.post("/claim/{claim_id}/approve")
+@claim_traced("approve_claim")
+async def approve_claim(claim_id: str, if_match: Annotated[Optional[str], Header()] = None):
+    """Approve the claim after all validations"""
+    expected = expected_version(if_match)
+    timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
+    log = {
+        "timestamp": timestamp,
+        "agent": "Orchestrator Agent",
+        "message": "Claim APPROVED - Transferring to Payment Agent",
+        "log_type": "success",
+        "trace_id": current_trace_id()
+    }
+
+    # Claims being paid or already paid must never go back to approved, and
+    # claims fraud screening has not cleared are left for manual review
+    claim = await db.claims.find_one_and_update(
         {
-            "$set": {"status": "paid", "claim_details.status": "Paid", "payment_response": payment_response},
-            "$push": {"agent_logs": {"$each": logs}}
-        }
+            "id": claim_id,
+            "status": {"$nin": PAYMENT_STARTED_STATUSES},
+            "fraud_screening.recommendation": FRAUD_CLEARED,
+            **version_filter(expected),
+        },
+        versioned({
+            "$set": {"status": "approved", "claim_details.status": "Approved"},
+            **claim_log_update([log])
+        }),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
+    if not claim:
+        current = await db.claims.find_one({"id": claim_id}, {"_id": 0, "version": 1, "status": 1, "fraud_screening": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Claim not found")
+        check_claim_version(current, expected)
+        check_payment_not_started(current)
+        if not current.get("fraud_screening"):
+            raise HTTPException(status_code=409, detail=FRAUD_NOT_SCREENED_DETAIL)
+        raise HTTPException(status_code=409, detail=FRAUD_REVIEW_DETAIL)
+    remember_claim_version(claim)
+    record_transition("approved")
+    claim_log_writer.append(claim, [log])
+
+    claim_events.publish(claim_id, "status", {"status": "approved"})
+    claim_events.publish_logs(claim_id, [log])
+
+    return {"status": "approved", "timestamp": timestamp, "claim": claim}
 
-    return {"status": "paid", "payment": payment_response, "logs": logs}
+@api_router.post("/claim/{claim_id}/pay")
+@claim_traced("pay_claim")
+async def pay_claim(
+    claim_id: str,
+    idempotency_key: Optional[str] = Header(None),
+    if_match: Annotated[Optional[str], Header()] = None,
+):
+    """Process payment for the approved claim; retries with the same Idempotency-Key replay the result"""
+    return await pay_claim_idempotently(claim_id, idempotency_key, expected_version(if_match))
+
+@api_router.post("/claims/pay")
+async def pay_claim_batch(batch: PaymentBatch):
+    """Pay many approved claims concurrently"""
+    results = await pay_claims(batch.claim_ids)
+    return {"paid": sum(result["status"] == "paid" for result in results), "results": results}
+
+@api_router.post("/claims/screen")
+async def screen_claim_batch(batch: ScreeningBatch):
+    """Fraud-screen many stored claims in one batch and record each result on its claim"""
+    claims = await db.claims.find(
+        {"id": {"$in": batch.claim_ids}},
+        {"_id": 0, "id": 1, "policy_details": 1, "policy_holder": 1, "flight_segments": 1, "claim_details": 1}
+    ).to_list(None)
+    if not claims:
+        raise HTTPException(status_code=404, detail="Claims not found")
+    screenings = await screen_claims([(claim, claim_compensation(claim)) for claim in claims])
+    await db.claims.bulk_write([
+        UpdateOne({"id": claim["id"]}, versioned({"$set": {"fraud_screening": screening}}))
+        for claim, screening in zip(claims, screenings)
+    ], ordered=False)
+    for claim in claims:
+        claim_versions.discard(claim["id"])
+    results = [{"claim_id": claim["id"], **screening} for claim, screening in zip(claims, screenings)]
+    return {
+        "screened": len(results),
+        "flagged": sum(result["recommendation"] != "APPROVE" for result in results),
+        "missing": sorted(set(batch.claim_ids) - {claim["id"] for claim in claims}),
+        "results": results
+    }
 
 @api_router.delete("/claims")
 async def clear_claims():
     """Clear all claims (for testing)"""
+    await claim_log_writer.flush()
     await db.claims.delete_many({})
+    await db.claim_logs.delete_many({})
+    await db.payment_requests.delete_many({})
+    claim_versions.clear()
     return {"message": "All claims cleared"}
 
 # Include the router in the main app
+api_router.include_router(external_router)
 app.include_router(api_router)
 
+# Standalone app serving only the mock external services, e.g. as a local upstream in tests
+mock_upstream_app = FastAPI(title="Mock external services")
+mock_upstream_app.include_router(external_router, prefix="/api")
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    return JSONResponse(status_code=503, content={"detail": f"Upstream service unavailable: {exc}"})
+
+mock_upstream_app.add_exception_handler(UpstreamError, upstream_error_handler)
+
+if ADMISSION_MAX_IN_FLIGHT > 0:
+    app.add_middleware(
+        AdmissionMiddleware,
+        routes=ADMISSION_ROUTES,
+        controller=admission,
+        limiter=tenant_limiter,
+        tenant=admission_tenant,
+    )
+
+# Added last so it is outermost and admission rejections carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -620,6 +2402,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+CLAIM_ARCHIVE_AFTER_DAYS = int(os.environ.get('CLAIM_ARCHIVE_AFTER_DAYS', '0'))
+CLAIM_ARCHIVE_INTERVAL_HOURS = float(os.environ.get('CLAIM_ARCHIVE_INTERVAL_HOURS', '24'))
+
+async def archive_claims_periodically():
+    while True:
+        try:
+            archived = await archive_claims(db, CLAIM_ARCHIVE_AFTER_DAYS, on_archived=forget_claim_versions)
+            logger.info("Archived %d claims older than %d days", archived, CLAIM_ARCHIVE_AFTER_DAYS)
+        except Exception:
+            logger.exception("Claim archival failed")
+        await asyncio.sleep(CLAIM_ARCHIVE_INTERVAL_HOURS * 3600)
+
+# ==================== APP LIFECYCLE ====================
+
+async def start_background_work():
+    """Migrate the database, then start everything that runs alongside requests"""
+    applied = await migrate(db)
+    if applied:
+        logger.info("Applied schema migrations %s", applied)
+    if CLAIM_ARCHIVE_AFTER_DAYS > 0:
+        app.state.archive_task = asyncio.create_task(archive_claims_periodically())
+
+    indexed = await index_parametric_policies({})
+    if indexed:
+        logger.info("Indexed %d parametric policies", indexed)
+
+    if CLAIM_WORKER_CONCURRENCY > 0:
+        await claim_jobs.ensure_indexes()
+        claim_workers.start()
+
+async def stop_background_work():
+    """Finish in-flight jobs and flush every buffer before closing connections"""
+    archive_task = getattr(app.state, "archive_task", None)
+    if archive_task is not None:
+        archive_task.cancel()
+    await claim_workers.stop()
+    await payout_batcher.flush_all()
+    await fraud_batcher.flush_all()
+    await claim_log_writer.flush()
+    await external_services.aclose()
+    shutdown_tracing()
     client.close()
@@ -0,0 +1,163 @@
+"""OpenTelemetry tracing for the claim workflow.
+
+Each claim gets one trace. ``start_claim`` opens the root span and its
+context is stored on the claim (and remembered in-process), so later
+requests for the claim - process_step, validate, approve, pay - open their
+spans as children of it. External calls and MongoDB commands become child
+spans of whatever span is current; Motor copies the caller's context onto
+its worker threads, so a pymongo command listener sees the request's span.
+
+Configured from the environment:
+
+- ``TRACE_EXPORTER``: ``none`` (default), ``console`` or ``memory``; the
+  in-memory exporter is what tests read spans from.
+- ``TRACE_SAMPLE_RATIO``: fraction of claims traced (default 1.0). The
+  decision is made once per claim and inherited by all of its spans.
+"""
+import functools
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ParentBased, TraceIdRatioBased
+from opentelemetry.trace import NonRecordingSpan, SpanContext, SpanKind, Status, StatusCode, TraceFlags
+from pymongo import monitoring
+
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'none')
+TRACE_SAMPLE_RATIO = float(os.environ.get('TRACE_SAMPLE_RATIO', '1.0'))
+TRACE_CONTEXT_CACHE_SIZE = 100_000
+
+memory_exporter = InMemorySpanExporter()
+
+def build_tracer_provider(exporter: str = TRACE_EXPORTER, sample_ratio: float = TRACE_SAMPLE_RATIO) -> TracerProvider:
+    # Without an exporter spans are never sampled, but trace ids are still assigned
+    sampler = ParentBased(TraceIdRatioBased(sample_ratio) if exporter != "none" else ALWAYS_OFF)
+    provider = TracerProvider(sampler=sampler)
+    if exporter == "memory":
+        provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+    elif exporter == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    elif exporter != "none":
+        raise ValueError(f"Unknown TRACE_EXPORTER: {exporter!r}")
+    return provider
+
+tracer_provider = build_tracer_provider()
+tracer = tracer_provider.get_tracer("claims")
+
+def configure(exporter: str, sample_ratio: float = 1.0):
+    """Swap the tracer provider, e.g. to the in-memory exporter in tests and benchmarks"""
+    global tracer_provider, tracer, memory_exporter
+    tracer_provider.shutdown()
+    # Shutting the provider down also stops its exporters
+    memory_exporter = InMemorySpanExporter()
+    tracer_provider = build_tracer_provider(exporter, sample_ratio)
+    tracer = tracer_provider.get_tracer("claims")
+
+# ---- claim trace contexts ----
+
+_claim_contexts: "OrderedDict[str, dict]" = OrderedDict()
+
+def span_trace_context(span) -> dict:
+    """Serializable trace context of ``span``, stored on the claim"""
+    context = span.get_span_context()
+    return {
+        "trace_id": trace.format_trace_id(context.trace_id),
+        "span_id": trace.format_span_id(context.span_id),
+        "sampled": context.trace_flags.sampled,
+    }
+
+def remember_claim_trace(claim_id: str, trace_context: Optional[dict]):
+    if not trace_context:
+        return
+    _claim_contexts[claim_id] = trace_context
+    _claim_contexts.move_to_end(claim_id)
+    while len(_claim_contexts) > TRACE_CONTEXT_CACHE_SIZE:
+        _claim_contexts.popitem(last=False)
+
+def known_claim_trace(claim_id: str) -> Optional[dict]:
+    return _claim_contexts.get(claim_id)
+
+def _parent_context(trace_context: Optional[dict]):
+    if not trace_context:
+        return None
+    parent = SpanContext(
+        trace_id=int(trace_context["trace_id"], 16),
+        span_id=int(trace_context["span_id"], 16),
+        is_remote=True,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED if trace_context.get("sampled") else TraceFlags.DEFAULT),
+    )
+    return trace.set_span_in_context(NonRecordingSpan(parent))
+
+@contextmanager
+def claim_span(name: str, claim_id: str, trace_context: Optional[dict] = None, **attributes):
+    """Span in the claim's trace; without a stored context it starts the claim's trace"""
+    trace_context = trace_context or known_claim_trace(claim_id)
+    parent = _parent_context(trace_context) or otel_context.Context()
+    with tracer.start_as_current_span(
+        name, context=parent, kind=SpanKind.SERVER, attributes={"claim.id": claim_id, **attributes}
+    ) as span:
+        if trace_context is None:
+            remember_claim_trace(claim_id, span_trace_context(span))
+        yield span
+
+def current_trace_id() -> Optional[str]:
+    context = trace.get_current_span().get_span_context()
+    return trace.format_trace_id(context.trace_id) if context.is_valid else None
+
+# ---- child spans ----
+
+def traced_call(call: str):
+    """Decorator running an external service call in a client span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not trace.get_current_span().is_recording():
+                return await fn(*args, **kwargs)
+            with tracer.start_as_current_span(f"external.{call}", kind=SpanKind.CLIENT, attributes={"external.call": call}):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class CommandTracing(monitoring.CommandListener):
+    """pymongo command listener recording each MongoDB command as a child span"""
+
+    def __init__(self):
+        self._spans: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if not trace.get_current_span().is_recording():
+            return
+        collection = event.command.get(event.command_name)
+        span = tracer.start_span(f"mongodb.{event.command_name}", kind=SpanKind.CLIENT, attributes={
+            "db.system": "mongodb",
+            "db.operation": event.command_name,
+            "db.mongodb.collection": collection if isinstance(collection, str) else "",
+        })
+        with self._lock:
+            self._spans[(event.connection_id, event.request_id)] = span
+
+    def _finish(self, event, error: bool):
+        with self._lock:
+            span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is None:
+            return
+        if error:
+            span.set_status(Status(StatusCode.ERROR, str(event.failure.get("errmsg", ""))))
+        span.end()
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+def shutdown():
+    tracer_provider.shutdown()
@@ -0,0 +1,154 @@
+"""Pooled HTTP clients for the external services the claim workflow calls.
+
+Each upstream gets one shared ``httpx.AsyncClient`` (and so one connection
+pool), a per-call timeout, a cap on in-flight calls, retries with jittered
+backoff and a circuit breaker. A slow upstream therefore fails fast instead
+of piling up coroutines and sockets. Only failed calls to the upstream
+count towards its breaker; calls that time out waiting for a slot do not.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class UpstreamError(Exception):
+    """An upstream call failed after retries, timed out or was rejected"""
+
+    def __init__(self, upstream: str, message: str, retryable: bool = True):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+        self.retryable = retryable
+
+class CircuitOpenError(UpstreamError):
+    """The upstream's circuit breaker is open and calls are short-circuited"""
+
+class UpstreamBusyError(UpstreamError):
+    """Every call slot stayed taken for the call's timeout, so it was never sent.
+
+    This is local congestion, not a sign the upstream is failing: it does not
+    count towards the circuit breaker and is not retried straight away.
+    """
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Opens after ``failure_threshold`` failures in a row, rejects calls for
+    ``reset_timeout`` seconds, then lets a single trial call through
+    (half-open) and restarts the open window; the trial's outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open":
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class UpstreamClient:
+    """Resilient JSON client for a single upstream service"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float = 5.0,
+        max_concurrency: int = 50,
+        retries: int = 2,
+        backoff_base: float = 0.1,
+        backoff_max: float = 2.0,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _retry_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, json: Optional[dict] = None) -> dict:
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.name, "circuit open")
+            try:
+                return await self._send(method, path, params, json)
+            except UpstreamBusyError:
+                raise
+            except UpstreamError as e:
+                if not e.retryable:
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                logger.warning("Upstream %s attempt %d failed: %s", self.name, attempt + 1, e)
+                await asyncio.sleep(self._retry_delay(attempt))
+
+    async def _send(self, method: str, path: str, params: Optional[dict], json: Optional[dict] = None) -> dict:
+        # Waiting for a slot counts against the call's timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamBusyError(self.name, "too many calls in flight")
+        try:
+            response = await self._client.request(method, path, params=params, json=json)
+        except httpx.HTTPError as e:
+            raise UpstreamError(self.name, f"{type(e).__name__}: {e}")
+        finally:
+            self._slots.release()
+
+        if response.status_code >= 500:
+            raise UpstreamError(self.name, f"HTTP {response.status_code}")
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise UpstreamError(self.name, f"HTTP {response.status_code}", retryable=False)
+        return response.json()
+
+    async def get(self, path: str, params: Optional[dict] = None) -> dict:
+        return await self.request("GET", path, params)
+
+    async def post(self, path: str, params: Optional[dict] = None, json: Optional[dict] = None) -> dict:
+        return await self.request("POST", path, params, json)
@@ -403,6 +403,19 @@ function App() {
 
   const delay = (ms) => new Promise(resolve => setTimeout(resolve, ms));
 
+  // Show a stored claim as it stands, e.g. the one a repeated submission duplicates
+  const openClaim = async (existingClaimId) => {
+    const response = await axios.get(`${API}/claim/${existingClaimId}`);
+    const claim = response.data;
+    setClaimId(claim.id);
+    setValidationSteps(claim.validation_steps);
+    setCurrentStep(claim.validation_steps.filter(s => s.status === 'completed').length);
+    setLogs(claim.agent_logs);
+    setClaimDetails(claim.claim_details);
+    addLog(new Date().toLocaleTimeString('en-GB', { hour12: false }), 'Orchestrator Agent', 'A claim for this policy and flight already exists - showing it instead', 'warning');
+    setWorkflowStatus('completed');
+  };
+
   const startWorkflow = useCallback(async () => {
     setWorkflowStatus('running');
     setLogs([]);
@@ -414,7 +427,16 @@ function App() {
 
     // Start claim
     try {
-      const startResponse = await axios.post(`${API}/claim/start`);
+      let startResponse;
+      try {
+        startResponse = await axios.post(`${API}/claim/start`);
+      } catch (e) {
+        // A repeated submission is rejected with the id of the claim already filed
+        const existingClaimId = e.response?.status === 409 && e.response.data.detail?.claim_id;
+        if (!existingClaimId) throw e;
+        await openClaim(existingClaimId);
+        return;
+      }
       const newClaimId = startResponse.data.id;
       setClaimId(newClaimId);
 
@@ -458,13 +480,9 @@ function App() {
             } : s
           ));
 
-          // Get claim details if step 5
-          if (step === 5 && stepResponse.data.result?.compensation) {
-            // Fetch updated claim to get claim details
-            const claimResponse = await axios.get(`${API}/claim/${newClaimId}`);
-            if (claimResponse.data.claim_details) {
-              setClaimDetails(claimResponse.data.claim_details);
-            }
+          // Get claim details if step 5 (the response carries the updated claim)
+          if (step === 5 && stepResponse.data.claim?.claim_details) {
+            setClaimDetails(stepResponse.data.claim.claim_details);
           }
 
         } catch (e) {
@@ -480,8 +498,16 @@ function App() {
       addLog(approveTimestamp, 'Orchestrator Agent', 'All 6 validations passed successfully', 'success');
       await delay(2000);
 
-      // Approve claim
-      await axios.post(`${API}/claim/${newClaimId}/approve`);
+      // Approve claim; claims flagged by fraud screening are left for manual review
+      try {
+        await axios.post(`${API}/claim/${newClaimId}/approve`);
+      } catch (e) {
+        if (e.response?.status !== 409) throw e;
+        addLog(approveTimestamp, 'Orchestrator Agent', `Claim not approved: ${e.response.data.detail}`, 'warning');
+        setWorkflowStatus('completed');
+        setActiveAgent(null);
+        return;
+      }
       addLog(approveTimestamp, 'Orchestrator Agent', 'Claim APPROVED - Transferring to Payment Agent', 'success');
       await delay(30000);
 
@@ -489,8 +515,10 @@ function App() {
       setActiveAgent('payment');
       const paymentTimestamp = new Date().toLocaleTimeString('en-GB', { hour12: false });
 
-      // Process payment
-      const paymentResponse = await axios.post(`${API}/claim/${newClaimId}/pay`);
+      // Process payment (the idempotency key makes retries and double submits safe)
+      const paymentResponse = await axios.post(`${API}/claim/${newClaimId}/pay`, null, {
+        headers: { 'Idempotency-Key': `pay-${newClaimId}` }
+      });
 
       // Add payment logs
       paymentResponse.data.logs.forEach(log => {
@@ -498,8 +526,7 @@ function App() {
       });
 
       // Update claim details with final status
-      const finalClaim = await axios.get(`${API}/claim/${newClaimId}`);
-      setClaimDetails(finalClaim.data.claim_details);
+      setClaimDetails(paymentResponse.data.claim.claim_details);
 
       await delay(2000);
       addLog(paymentTimestamp, 'Orchestrator Agent', 'Workflow completed successfully! No-touch claim processed.', 'success');
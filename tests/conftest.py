@@ -0,0 +1,39 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules, as they do when server.py is run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# server.py reads these at import time; tests never reach a real MongoDB
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "claims_test")
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def mock_db(monkeypatch):
+    """Point the server at a fresh in-memory database with instant mock upstreams"""
+    import server
+    from cache import TTLCache
+    from migrations import migrate
+    from mock_database import mock_client
+    from mock_upstream import UpstreamSimulator
+
+    client = mock_client()
+    db = client[os.environ["DB_NAME"]]
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.claim_jobs, "collection", db.claim_jobs)
+    monkeypatch.setattr(server, "upstream_simulator", UpstreamSimulator(default_latency="zero"))
+    # Lookups cached by an earlier test would skip the external calls a test counts or traces
+    for name in ("flight_status_cache", "weather_cache"):
+        cache = getattr(server.external_services, name)
+        monkeypatch.setattr(server.external_services, name, TTLCache(cache.ttl, cache.max_entries))
+    await migrate(db)
+    yield db
+    await server.claim_log_writer.flush()
@@ -0,0 +1,164 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import server
+from admission import AdmissionController, AdmissionMiddleware, Lane, Rejected, TenantLimiter, route
+from metrics import REGISTRY
+
+pytestmark = pytest.mark.anyio
+
+PAYMENT = Lane("payment", 0, 100, rate_limited=False)
+INTAKE = Lane("intake", 2, 8)
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_tenant_limiter_allows_a_burst_then_refills_at_the_rate():
+    clock = Clock()
+    limiter = TenantLimiter(rate=2, burst=3, clock=clock)
+    assert [limiter.take("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.take("a") == pytest.approx(0.5)
+    # Tenants have their own buckets
+    assert limiter.take("b") == 0.0
+    clock.now = 0.5
+    assert limiter.take("a") == 0.0
+    assert limiter.take("a") == pytest.approx(0.5)
+
+def test_tenant_limiter_forgets_the_least_recently_seen_tenant():
+    limiter = TenantLimiter(rate=1, burst=1, max_tenants=2, clock=Clock())
+    limiter.take("a")
+    limiter.take("b")
+    limiter.take("c")
+    assert len(limiter) == 2
+    # "a" was evicted and comes back with a full bucket; "b" has none left
+    assert limiter.take("a") == 0.0
+    assert limiter.take("c") > 0
+
+async def test_freed_slots_go_to_the_highest_priority_lane_first():
+    controller = AdmissionController(max_in_flight=1, queue_timeout=5)
+    await controller.acquire(INTAKE)
+    admitted = []
+
+    async def wait(lane, name):
+        await controller.acquire(lane)
+        admitted.append(name)
+
+    intake = asyncio.ensure_future(wait(INTAKE, "intake"))
+    await asyncio.sleep(0)
+    payment = asyncio.ensure_future(wait(PAYMENT, "payment"))
+    await asyncio.sleep(0)
+    assert controller.waiting() == 2
+
+    controller.release()
+    await payment
+    assert admitted == ["payment"]
+    controller.release()
+    await intake
+    assert admitted == ["payment", "intake"]
+    controller.release()
+    assert controller.in_flight == 0
+
+async def test_full_lane_queue_is_rejected_without_waiting():
+    controller = AdmissionController(max_in_flight=1, queue_timeout=5)
+    await controller.acquire(INTAKE)
+    lane = Lane("intake", 2, 1)
+    waiter = asyncio.ensure_future(controller.acquire(lane))
+    await asyncio.sleep(0)
+    with pytest.raises(Rejected) as rejected:
+        await controller.acquire(lane)
+    assert rejected.value.status_code == 503
+    assert rejected.value.retry_after > 0
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert controller.waiting() == 0
+
+async def test_queued_request_times_out_with_503():
+    controller = AdmissionController(max_in_flight=1, queue_timeout=0.01)
+    await controller.acquire(INTAKE)
+    with pytest.raises(Rejected) as rejected:
+        await controller.acquire(INTAKE)
+    assert rejected.value.status_code == 503
+    assert controller.waiting() == 0
+    assert controller.in_flight == 1
+
+def admitted_app(controller, limiter, hold: float = 0.02):
+    """Tiny app behind admission whose endpoints record peak concurrency"""
+    state = {"running": 0, "peak": 0}
+
+    async def work(request):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(hold)
+        state["running"] -= 1
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/pay", work, methods=["POST"]), Route("/start", work, methods=["POST"])])
+    app.add_middleware(
+        AdmissionMiddleware,
+        routes=[route("POST", "/pay", PAYMENT), route("POST", "/start", INTAKE)],
+        controller=controller,
+        limiter=limiter,
+        tenant=lambda scope: dict(scope["headers"]).get(b"x-client-id"),
+    )
+    return app, state
+
+async def test_overload_is_shed_with_503_and_admitted_requests_stay_within_the_cap():
+    controller = AdmissionController(max_in_flight=4, queue_timeout=5)
+    app, state = admitted_app(controller, TenantLimiter(rate=1000, burst=1000))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        responses = await asyncio.gather(*(http.post("/start") for _ in range(40)))
+
+    codes = [response.status_code for response in responses]
+    # Four run at once and eight more fit in the intake queue
+    assert codes.count(200) == 12
+    assert codes.count(503) == 28
+    assert state["peak"] == 4
+    assert all(int(response.headers["retry-after"]) >= 1 for response in responses if response.status_code == 503)
+    assert controller.in_flight == 0 and controller.waiting() == 0
+
+async def test_payments_are_admitted_during_an_intake_surge():
+    controller = AdmissionController(max_in_flight=2, queue_timeout=5)
+    app, _ = admitted_app(controller, TenantLimiter(rate=1000, burst=1000))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        surge = [asyncio.ensure_future(http.post("/start")) for _ in range(30)]
+        await asyncio.sleep(0.005)
+        payments = await asyncio.gather(*(http.post("/pay") for _ in range(5)))
+        await asyncio.gather(*surge)
+    assert [response.status_code for response in payments] == [200] * 5
+
+async def test_tenant_over_its_burst_gets_429_with_retry_after():
+    controller = AdmissionController(max_in_flight=4)
+    app, _ = admitted_app(controller, TenantLimiter(rate=1, burst=2), hold=0)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        codes = [(await http.post("/start", headers={"X-Client-Id": "busy"})).status_code for _ in range(3)]
+        limited = await http.post("/start", headers={"X-Client-Id": "busy"})
+        other = await http.post("/start", headers={"X-Client-Id": "quiet"})
+        # Payments are not rate limited
+        payment = await http.post("/pay", headers={"X-Client-Id": "busy"})
+    assert codes == [200, 200, 429]
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert other.status_code == 200
+    assert payment.status_code == 200
+
+async def test_server_rate_limits_claim_starts_per_policy(mock_db):
+    labels = {"lane": "intake", "outcome": "rate_limited"}
+    before = REGISTRY.get_sample_value("admission_decisions_total", labels) or 0.0
+    burst = int(server.ADMISSION_TENANT_BURST)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+        codes = [
+            (await http.post("/api/claim/start", params={"policy_number": "ADMISSION-0001"})).status_code
+            for _ in range(burst + 1)
+        ]
+    # One claim is created, repeats are duplicates until the policy's burst is used up
+    assert codes == [200] + [409] * (burst - 1) + [429]
+    assert REGISTRY.get_sample_value("admission_decisions_total", labels) == before + 1
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+import server
+from jobs import JOB_DONE, WorkerPool
+from parametric import SegmentIndex
+
+pytestmark = pytest.mark.anyio
+
+async def test_lifespan_starts_background_work_and_drains_it_on_shutdown(mock_db, monkeypatch):
+    workers = WorkerPool(server.claim_jobs, server.claim_workers.handlers, concurrency=1, poll_interval=0.01)
+    monkeypatch.setattr(server, "claim_workers", workers)
+    monkeypatch.setattr(server, "parametric_index", SegmentIndex())
+    tracing_shut_down = []
+    monkeypatch.setattr(server, "shutdown_tracing", lambda: tracing_shut_down.append(True))
+    scenario = server.render_scenario()
+    await mock_db.parametric_policies.insert_one({
+        "policy_number": "LIFESPAN-0001", "flight_segments": scenario["flight_segments"], "triggered": []
+    })
+    started = await server.start_claim(policy_number="LIFESPAN-0002")
+
+    async with server.app.router.lifespan_context(server.app):
+        assert server.parametric_index.stats() == {"policies": 1, "segments": 2}
+        job = await server.claim_jobs.enqueue("validate_claim", {"claim_id": started["id"]})
+        for _ in range(200):
+            if (await mock_db.claim_jobs.find_one({"id": job["id"]}))["status"] == JOB_DONE:
+                break
+            await asyncio.sleep(0.01)
+
+    claim = await mock_db.claims.find_one({"id": started["id"]})
+    assert [step["status"] for step in claim["validation_steps"]] == ["completed"] * 6
+    # Shutdown stopped the workers and flushed the buffered log rows
+    assert workers._tasks == []
+    assert await mock_db.claim_logs.count_documents({"claim_id": started["id"]}) == claim["log_count"]
+    assert tracing_shut_down == [True]
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def counting_loader(calls: list, value, release: asyncio.Event = None):
+    async def load():
+        calls.append(value)
+        if release is not None:
+            await release.wait()
+        return value
+    return load
+
+async def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    calls = []
+    release = asyncio.Event()
+    loads = [asyncio.create_task(cache.get_or_load("BA117", counting_loader(calls, "delayed", release))) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*loads) == ["delayed"] * 5
+    assert calls == ["delayed"]
+    assert (cache.misses, cache.coalesced) == (1, 4)
+    assert await cache.get_or_load("BA117", counting_loader(calls, "other")) == "delayed"
+    assert cache.hits == 1
+
+async def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    cache = TTLCache(ttl=60)
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ConnectionError("upstream down")
+
+    loads = [asyncio.create_task(cache.get_or_load("BA117", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    outcomes = await asyncio.gather(*loads, return_exceptions=True)
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+
+    calls = []
+    assert await cache.get_or_load("BA117", counting_loader(calls, "delayed")) == "delayed"
+    assert calls == ["delayed"]
+
+async def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    calls = []
+    await cache.get_or_load("LHR", counting_loader(calls, "fog"))
+    clock.now = 9.9
+    assert await cache.get_or_load("LHR", counting_loader(calls, "clear")) == "fog"
+    clock.now = 10
+    assert cache.get("LHR") is None
+    assert await cache.get_or_load("LHR", counting_loader(calls, "clear")) == "clear"
+    assert calls == ["fog", "clear"]
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+async def test_waiter_takes_over_a_load_whose_caller_was_cancelled():
+    cache = TTLCache(ttl=60)
+    calls = []
+    first_release = asyncio.Event()
+    second_release = asyncio.Event()
+
+    first = asyncio.create_task(cache.get_or_load("BA117", counting_loader(calls, "first", first_release)))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(cache.get_or_load("BA117", counting_loader(calls, "takeover", second_release)))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    # Let the waiters see the abandoned load and one of them start its own
+    for _ in range(3):
+        await asyncio.sleep(0)
+    second_release.set()
+
+    assert await asyncio.gather(*waiters) == ["takeover"] * 3
+    assert calls == ["first", "takeover"]
+    assert cache.get("BA117") == "takeover"
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+def parse_sse(body: str) -> list:
+    """(event, data) of every frame, skipping keep-alive comments"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+async def subscribed(claim_id: str):
+    for _ in range(200):
+        if server.claim_events._subscribers.get(claim_id):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("the event stream never subscribed")
+
+@pytest.fixture
+async def http(mock_db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        yield client
+
+async def test_stream_follows_the_claim_until_it_is_paid(http):
+    started = await server.start_claim(policy_number="EVENTS-0001")
+    stream = asyncio.create_task(http.get(f"/api/claim/{started['id']}/events"))
+    await subscribed(started["id"])
+
+    await server.validate_claim(started["id"])
+    await server.approve_claim(started["id"])
+    await server.pay_claim(started["id"], idempotency_key=None)
+    response = await asyncio.wait_for(stream, timeout=5)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert events[0][0] == "snapshot"
+    assert events[0][1]["status"] == "processing"
+
+    steps = [(data["step_number"], data["status"]) for event, data in events if event == "step"]
+    for step_number in range(1, 7):
+        assert steps.index((step_number, "in_progress")) < steps.index((step_number, "completed"))
+    assert [data["status"] for event, data in events if event == "status"] == ["approved", "paid"]
+    assert events[-1] == ("status", {"status": "paid"})
+
+    claim = await server.db.claims.find_one({"id": started["id"]})
+    assert len([event for event, _ in events if event == "log"]) == claim["log_count"]
+    assert not server.claim_events._subscribers.get(started["id"])
+
+async def test_stream_of_a_finished_claim_is_only_its_snapshot(http, mock_db):
+    started = await server.start_claim(policy_number="EVENTS-0002")
+    await mock_db.claims.update_one({"id": started["id"]}, {"$set": {"status": "paid"}})
+
+    response = await http.get(f"/api/claim/{started['id']}/events")
+    [(event, data)] = parse_sse(response.text)
+    assert (event, data["id"], data["status"]) == ("snapshot", started["id"], "paid")
+    assert not server.claim_events._subscribers.get(started["id"])
+
+async def test_stream_of_an_unknown_claim_is_not_found(http):
+    response = await http.get("/api/claim/no-such-claim/events")
+    assert response.status_code == 404
+    assert not server.claim_events._subscribers.get("no-such-claim")
+
+def test_slow_subscriber_loses_its_oldest_events():
+    bus = server.ClaimEventBus(queue_size=2)
+    queue = bus.subscribe("claim-1")
+    for n in range(3):
+        bus.publish("claim-1", "log", {"n": n})
+    bus.publish("claim-2", "log", {"n": 9})
+
+    assert [queue.get_nowait()[1]["n"] for _ in range(queue.qsize())] == [1, 2]
+    bus.unsubscribe("claim-1", queue)
+    bus.publish("claim-1", "log", {"n": 3})
+    assert queue.empty()
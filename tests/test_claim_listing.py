@@ -0,0 +1,80 @@
+import json
+
+import httpx
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+def listed_claim(n: int, created_at: str, status: str = "processing", policy_number: str = "TRV-LIST-1") -> dict:
+    claim = server.render_scenario()
+    claim.update({"id": f"list-{n:02d}", "created_at": created_at, "status": status})
+    claim["policy_details"]["policy_number"] = policy_number
+    return claim
+
+@pytest.fixture
+async def http(mock_db):
+    claims = [
+        listed_claim(1, "2026-10-01T08:00:00+00:00", "paid"),
+        # Claims 2-4 share a created_at; pages break the tie on id
+        listed_claim(2, "2026-10-02T08:00:00+00:00"),
+        listed_claim(3, "2026-10-02T08:00:00+00:00", "paid"),
+        listed_claim(4, "2026-10-02T08:00:00+00:00"),
+        listed_claim(5, "2026-10-03T08:00:00+00:00", policy_number="TRV-LIST-2"),
+        listed_claim(6, "2026-10-04T08:00:00+00:00", "paid"),
+        listed_claim(7, "2026-10-05T08:00:00+00:00"),
+    ]
+    claims[4]["flight_segments"][0]["flight_number"] = "BA12"
+    claims[5]["payment_response"] = {"payment": {"transaction_id": "TXN-6"}}
+    await mock_db.claims.insert_many(claims)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        yield client
+
+async def listed(http, **params) -> dict:
+    response = await http.get("/api/claims", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def ids(page: dict) -> list:
+    return [claim["id"] for claim in page["claims"]]
+
+async def test_pages_cover_every_claim_once_newest_first(http):
+    pages, cursor = [], None
+    while True:
+        page = await listed(http, limit=2, **({"cursor": cursor} if cursor else {}))
+        pages.append(ids(page))
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert pages == [["list-07", "list-06"], ["list-05", "list-04"], ["list-03", "list-02"], ["list-01"]]
+
+async def test_filters_combine(http):
+    assert ids(await listed(http, status="paid")) == ["list-06", "list-03", "list-01"]
+    assert ids(await listed(http, policy_number="TRV-LIST-2")) == ["list-05"]
+    assert ids(await listed(http, flight_number="BA12")) == ["list-05"]
+    # Any segment matches, not only the first
+    connection = server.render_scenario()["flight_segments"][1]["flight_number"]
+    assert len(ids(await listed(http, flight_number=connection))) == 7
+    assert ids(await listed(http, created_from="2026-10-02", created_to="2026-10-04")) == ["list-05", "list-04", "list-03", "list-02"]
+    assert ids(await listed(http, status="paid", created_from="2026-10-02T00:00:00+00:00")) == ["list-06", "list-03"]
+
+async def test_heavy_fields_are_left_out_unless_requested(http):
+    claim = (await listed(http, limit=2))["claims"][1]
+    assert "agent_logs" not in claim and "payment_response" not in claim
+    assert "policy_details" in claim
+
+    [claim] = (await listed(http, status="paid", limit=1, fields="status,payment_response"))["claims"]
+    assert claim == {
+        "id": "list-06", "created_at": "2026-10-04T08:00:00+00:00", "status": "paid",
+        "payment_response": {"payment": {"transaction_id": "TXN-6"}},
+    }
+
+async def test_stream_returns_every_match_as_ndjson(http):
+    response = await http.get("/api/claims", params={"status": "paid", "fields": "status", "stream": "true"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == ["list-06", "list-03", "list-01"]
+
+async def test_invalid_cursor_and_dates_are_rejected(http):
+    assert (await http.get("/api/claims", params={"cursor": "not-a-cursor"})).status_code == 400
+    assert (await http.get("/api/claims", params={"created_from": "last week"})).status_code == 400
@@ -0,0 +1,84 @@
+import pytest
+
+import server
+from claim_logs import CLAIM_LOG_TAIL, ClaimLogWriter, claim_log_rows, unflushed_tail
+
+pytestmark = pytest.mark.anyio
+
+def logs(count: int, start: int = 1) -> list:
+    return [{"message": f"log {n}"} for n in range(start, start + count)]
+
+def test_log_rows_end_at_the_updated_log_count():
+    rows = claim_log_rows({"id": "c", "log_count": 7}, logs(3))
+    assert [(row["claim_id"], row["seq"], row["message"]) for row in rows] == [
+        ("c", 5, "log 1"), ("c", 6, "log 2"), ("c", 7, "log 3"),
+    ]
+
+def test_unflushed_tail_only_follows_on_from_the_last_stored_row():
+    claim = {"log_count": 30, "agent_logs": logs(CLAIM_LOG_TAIL, start=11)}
+    assert [row["seq"] for row in unflushed_tail(claim, after=25)] == [26, 27, 28, 29, 30]
+    assert [row["seq"] for row in unflushed_tail(claim, after=10)] == list(range(11, 31))
+    # Rows 6-10 are neither stored nor on the tail, so nothing after them is returned
+    assert unflushed_tail(claim, after=5) == []
+
+@pytest.fixture
+def held_writer(mock_db, monkeypatch):
+    """Claim log writer that only writes when flushed"""
+    writer = ClaimLogWriter(lambda rows: server.db.claim_logs.insert_many(rows, ordered=False), linger=60)
+    monkeypatch.setattr(server, "claim_log_writer", writer)
+    return writer
+
+async def test_buffered_rows_within_the_tail_are_served_from_the_claim(mock_db, held_writer):
+    started = await server.start_claim(policy_number="LOGS-0001")
+    await server.process_step(started["id"], 1)
+
+    page = await server.get_claim_logs(started["id"])
+    assert [row["seq"] for row in page["logs"]] == [1, 2, 3]
+    assert (page["next_after"], page["pending"]) == (3, 0)
+    assert not await mock_db.claim_logs.count_documents({})
+
+async def test_page_reports_entries_it_could_not_return_yet(mock_db, held_writer):
+    started = await server.start_claim(policy_number="LOGS-0002")
+    validated = await server.validate_claim(started["id"])
+    log_count = validated["claim"]["log_count"]
+    assert log_count > CLAIM_LOG_TAIL
+
+    page = await server.get_claim_logs(started["id"])
+    assert (page["logs"], page["next_after"], page["pending"]) == ([], 0, log_count)
+
+    await held_writer.flush()
+    page = await server.get_claim_logs(started["id"])
+    assert [row["seq"] for row in page["logs"]] == list(range(1, log_count + 1))
+    assert (page["next_after"], page["pending"]) == (log_count, 0)
+
+async def test_page_limit_leaves_the_rest_pending(mock_db, held_writer):
+    started = await server.start_claim(policy_number="LOGS-0003")
+    await server.validate_claim(started["id"])
+    await held_writer.flush()
+
+    page = await server.get_claim_logs(started["id"], limit=5)
+    assert [row["seq"] for row in page["logs"]] == [1, 2, 3, 4, 5]
+    rest = await server.get_claim_logs(started["id"], after=page["next_after"])
+    assert page["pending"] == len(rest["logs"])
+    assert rest["pending"] == 0
+
+async def test_logs_of_an_unknown_claim_are_not_found(mock_db):
+    with pytest.raises(server.HTTPException) as missing:
+        await server.get_claim_logs("no-such-claim")
+    assert missing.value.status_code == 404
+
+async def test_writer_skips_rows_already_stored_and_counts_failures(mock_db):
+    await mock_db.claim_logs.insert_one({"claim_id": "c", "seq": 1, "message": "log 1"})
+    writer = ClaimLogWriter(lambda rows: mock_db.claim_logs.insert_many(rows, ordered=False), linger=60)
+    writer.append({"id": "c", "log_count": 2}, logs(2))
+    await writer.flush()
+    assert await mock_db.claim_logs.count_documents({"claim_id": "c"}) == 2
+    assert writer.stats()["failed_rows"] == 0
+
+    async def unavailable(rows):
+        raise ConnectionError("database unavailable")
+
+    failing = ClaimLogWriter(unavailable, linger=60)
+    failing.append({"id": "d", "log_count": 3}, logs(3))
+    await failing.flush()
+    assert failing.stats()["failed_rows"] == 3
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from compensation import compensation_for, parse_coverage, parse_rate, settle_claims
+
+GOLDEN = [
+    # delay hours, flight delay coverage, max delay coverage, policy status, compensation
+    (0, "$100 per 6 hours", "$500", "Active", 0.0),
+    (5.9, "$100 per 6 hours", "$500", "Active", 0.0),
+    (6, "$100 per 6 hours", "$500", "Active", 100.0),
+    (11.9, "$100 per 6 hours", "$500", "Active", 100.0),
+    (12, "$100 per 6 hours", "$500", "Active", 200.0),
+    (30, "$100 per 6 hours", "$500", "Active", 500.0),
+    (72, "$100 per 6 hours", "$500", "Active", 500.0),
+    (24, "$100 per 6 hours", "$500", "Lapsed", 0.0),
+    (9, "$50 per 3 hours", "$300", "Active", 150.0),
+    (16, "$150 per 4 hours", "$1,200", "Active", 600.0),
+    (48, "$1,000 per 12 hours", "", "Active", 4000.0),
+    (7, "$75.50 per 2 hrs", "$1,000", "Active", 226.5),
+    (10, "$100 per 6 hours", "no cap", "Active", 100.0),
+]
+
+@pytest.mark.parametrize("delay_hours, rate, cap, policy_status, expected", GOLDEN)
+def test_compensation_for_golden(delay_hours, rate, cap, policy_status, expected):
+    assert compensation_for(delay_hours, parse_coverage(rate, cap), policy_status) == expected
+
+def test_settle_claims_golden():
+    delay_hours, rates, caps, statuses, expected = zip(*GOLDEN)
+    frame = pd.DataFrame({
+        "delay_hours": delay_hours,
+        "flight_delay_coverage": rates,
+        "max_delay_coverage": caps,
+        "policy_status": statuses,
+    })
+    assert settle_claims(frame)["compensation"].tolist() == list(expected)
+
+def test_settle_claims_matches_per_claim_rules():
+    rng = np.random.default_rng(7)
+    rates = np.array(["$100 per 6 hours", "$50 per 3 hours", "$150 per 4 hours", "$1,000 per 12 hours"])
+    caps = np.array(["$500", "$300", "$1,200", ""])
+    plan = rng.integers(0, len(rates), 10_000)
+    frame = pd.DataFrame({
+        "delay_hours": rng.integers(0, 72, len(plan)),
+        "flight_delay_coverage": rates[plan],
+        "max_delay_coverage": caps[plan],
+        "policy_status": np.where(rng.random(len(plan)) < 0.97, "Active", "Lapsed"),
+    })
+    expected = [
+        compensation_for(row.delay_hours, parse_coverage(row.flight_delay_coverage, row.max_delay_coverage), row.policy_status)
+        for row in frame.itertuples()
+    ]
+    assert settle_claims(frame)["compensation"].tolist() == expected
+
+def test_settle_claims_defaults_to_active_policies():
+    frame = pd.DataFrame({"delay_hours": [12], "flight_delay_coverage": ["$100 per 6 hours"], "max_delay_coverage": [None]})
+    result = settle_claims(frame)
+    assert result["eligible"].tolist() == [True]
+    assert result["tiers"].tolist() == [2]
+    assert result["compensation"].tolist() == [200.0]
+
+@pytest.mark.parametrize("coverage", ["Up to $100", "$100", "", "100 per 6 hours"])
+def test_parse_rate_rejects_unrecognised_coverage(coverage):
+    with pytest.raises(ValueError):
+        parse_rate(coverage)
+
+def test_policy_details_rejects_unrecognised_coverage():
+    from server import PolicyDetails
+
+    with pytest.raises(ValidationError, match="flight_delay_coverage"):
+        PolicyDetails(coverage_start="01 Oct 2026", coverage_end="31 Oct 2026", flight_delay_coverage="Up to $100")
+    policy = PolicyDetails(coverage_start="01 Oct 2026", coverage_end="31 Oct 2026", flight_delay_coverage="$50 per 3 hours")
+    assert policy.flight_delay_coverage == "$50 per 3 hours"
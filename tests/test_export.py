@@ -0,0 +1,82 @@
+import csv
+import io
+
+import httpx
+import pyarrow.parquet as pq
+import pytest
+
+import server
+from export import EXPORT_COLUMN_NAMES, export_query, export_to_file
+
+pytestmark = pytest.mark.anyio
+
+def exported_claim(n: int, paid: bool = True) -> dict:
+    claim = server.render_scenario()
+    claim.update({
+        "id": f"export-{n:03d}",
+        "status": "paid" if paid else "approved",
+        "created_at": f"2026-01-01T00:00:{n:02d}+00:00",
+        "claim_details": {"claim_id": f"CLM-{n}", "delay_duration": 6, "compensation_amount": 100.0 + n, "status": "Paid"},
+    })
+    if paid:
+        claim["payment_response"] = {"batch_id": "BATCH-1", "payment": {
+            "transaction_id": f"TXN-{n:03d}", "reference": f"CLAIM-export-{n:03d}", "amount": 100.0 + n,
+            "currency": "SGD", "status": "COMPLETED", "method": "Bank Transfer",
+        }}
+    return claim
+
+@pytest.fixture
+async def claims(mock_db) -> list:
+    # Inserted out of order; exports are in created_at order
+    claims = [exported_claim(n, paid=n != 3) for n in (4, 1, 3, 5, 2)]
+    await mock_db.claims.insert_many([dict(claim) for claim in claims])
+    return sorted(claims, key=lambda claim: claim["created_at"])
+
+ALL = export_query(None, "2026-12-31T00:00:00+00:00")
+
+async def test_csv_export_has_one_readable_row_per_claim(mock_db, claims, tmp_path):
+    path = tmp_path / "claims.csv"
+    await export_to_file(mock_db.claims, path, ALL, "csv", chunk_size=2)
+
+    with path.open(newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    assert reader.fieldnames == EXPORT_COLUMN_NAMES
+    assert [row["id"] for row in rows] == [claim["id"] for claim in claims]
+    first = rows[0]
+    segments = claims[0]["flight_segments"]
+    assert (first["status"], first["compensation_amount"], first["payment_transaction_id"]) == ("paid", "101.0", "TXN-001")
+    assert first["segment_count"] == str(len(segments))
+    assert first["flight_numbers"] == "|".join(segment["flight_number"] for segment in segments)
+    assert first["route"] == "-".join([segments[0]["departure_code"], *(segment["arrival_code"] for segment in segments)])
+    assert rows[2]["payment_transaction_id"] == ""
+    assert not list(tmp_path.glob("*.partial"))
+
+async def test_parquet_export_has_one_row_group_per_chunk(mock_db, claims, tmp_path):
+    path = tmp_path / "claims.parquet"
+    await export_to_file(mock_db.claims, path, ALL, "parquet", chunk_size=2)
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == EXPORT_COLUMN_NAMES
+    rows = table.to_pylist()
+    assert [row["id"] for row in rows] == [claim["id"] for claim in claims]
+    assert (rows[0]["compensation_amount"], rows[0]["payment_amount"], rows[0]["delay_duration"]) == (101.0, 101.0, 6)
+    assert (rows[2]["status"], rows[2]["payment_transaction_id"], rows[2]["payment_amount"]) == ("approved", None, None)
+
+async def test_export_endpoint_streams_increments_from_its_watermark(mock_db, claims):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+        first = await http.get("/api/claims/export", params={
+            "format": "parquet", "status": "paid", "until": "2026-01-01T00:00:03+00:00"
+        })
+        await mock_db.claims.insert_one(exported_claim(6))
+        second = await http.get("/api/claims/export", params={
+            "format": "csv", "since": first.headers["X-Export-Watermark"], "until": "2026-12-31T00:00:00+00:00"
+        })
+        invalid = await http.get("/api/claims/export", params={"format": "xlsx"})
+
+    assert first.headers["content-type"] == "application/vnd.apache.parquet"
+    assert pq.read_table(io.BytesIO(first.content)).column("id").to_pylist() == ["export-001", "export-002"]
+    assert [row["id"] for row in csv.DictReader(io.StringIO(second.text))] == ["export-004", "export-005", "export-006"]
+    assert invalid.status_code == 400
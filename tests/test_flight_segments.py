@@ -0,0 +1,50 @@
+import pytest
+from pydantic import ValidationError
+
+from itinerary import attribute_delays
+from server import FlightSegment
+
+def segment(**times) -> dict:
+    return {
+        "flight_number": "SQ317",
+        "airline": "Singapore Airlines",
+        "departure_airport": "London Heathrow",
+        "departure_code": "LHR",
+        "arrival_airport": "Singapore Changi",
+        "arrival_code": "SIN",
+        "scheduled_departure": "16 Oct 2026, 09:15",
+        "scheduled_arrival": "16 Oct 2026, 17:40",
+        **times,
+    }
+
+def test_segment_times_in_the_itinerary_format_are_accepted():
+    parsed = FlightSegment(**segment(actual_departure="16 Oct 2026, 15:15", actual_arrival="16 Oct 2026, 23:40"))
+    assert (parsed.scheduled_departure, parsed.actual_arrival) == ("16 Oct 2026, 09:15", "16 Oct 2026, 23:40")
+    assert FlightSegment(**segment()).actual_departure is None
+
+@pytest.mark.parametrize("field, value", [
+    ("scheduled_departure", "2026-10-16T09:15:00"),
+    ("scheduled_arrival", "16 Oct 2026"),
+    ("actual_departure", "16 Oct 2026, 25:00"),
+    ("actual_arrival", "31 Feb 2026, 10:00"),
+    ("scheduled_departure", ""),
+])
+def test_segment_times_that_cannot_be_parsed_are_rejected(field, value):
+    with pytest.raises(ValidationError) as invalid:
+        FlightSegment(**segment(**{field: value}))
+    [error] = invalid.value.errors()
+    assert error["loc"] == (field,)
+    assert "16 Oct 2026, 14:30" in error["msg"]
+
+def test_segment_crossing_midnight_is_accepted_and_its_delay_measured_across_the_day():
+    overnight = segment(
+        scheduled_departure="16 Oct 2026, 22:30",
+        scheduled_arrival="17 Oct 2026, 06:10",
+        actual_departure="17 Oct 2026, 01:30",
+        actual_arrival="17 Oct 2026, 09:10",
+    )
+    FlightSegment(**overnight)
+
+    journey = attribute_delays([overnight])
+    assert (journey.legs[0].departure_delay_hours, journey.legs[0].arrival_delay_hours) == (3.0, 3.0)
+    assert journey.effective_delay_hours == 3.0
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+import server
+from fraud import claim_duplicate_key, score_claims
+
+def frame(**columns) -> pd.DataFrame:
+    rows = len(columns["policy_number"])
+    columns.setdefault("compensation_amount", [100] * rows)
+    columns.setdefault("max_delay_coverage", ["$500"] * rows)
+    return pd.DataFrame(columns)
+
+def test_a_single_modest_claim_is_recommended_for_approval():
+    (row,) = score_claims(frame(policy_number=["P-1"], bank_account=["111"])).to_dict("records")
+    assert row["risk_level"] == "Low"
+    assert row["recommendation"] == "APPROVE"
+    assert row["flags"] == []
+
+def test_repeated_claims_on_a_policy_are_flagged_for_review():
+    scores = score_claims(frame(policy_number=["P-1"] * 3 + ["P-2"]))
+    assert scores["policy_claims"].tolist() == [3, 3, 3, 1]
+    assert scores["flags"].tolist()[:3] == [["HIGH_CLAIM_VELOCITY"]] * 3
+    assert scores["recommendation"].tolist() == ["REVIEW"] * 3 + ["APPROVE"]
+
+def test_payout_at_the_cap_and_shared_accounts_are_flagged():
+    scores = score_claims(frame(
+        policy_number=["P-1", "P-2", "P-3"],
+        bank_account=["999", "999", None],
+        compensation_amount=[100, 100, 500],
+    ))
+    assert scores["flags"].tolist() == [["SHARED_BANK_ACCOUNT"], ["SHARED_BANK_ACCOUNT"], ["AMOUNT_AT_COVERAGE_CAP"]]
+    # Claims without an account on file share nothing
+    assert scores["account_policies"].tolist() == [2, 2, 0]
+
+def test_duplicate_key_depends_on_policy_flight_and_date():
+    claim = server.render_scenario()
+    other_policy = {**claim, "policy_details": {**claim["policy_details"], "policy_number": "OTHER"}}
+    assert claim_duplicate_key(claim) == claim_duplicate_key(server.render_scenario())
+    assert claim_duplicate_key(claim) != claim_duplicate_key(other_policy)
+
+async def store_claim(db, policy_number: str, days_ago: int = 0) -> dict:
+    claim = server.scenario_template.render(server.get_dynamic_journey_datetime() - timedelta(days=days_ago))
+    claim["policy_details"]["policy_number"] = policy_number
+    claim["status"] = "processing"
+    claim["duplicate_key"] = claim_duplicate_key(claim)
+    await db.claims.insert_one(claim)
+    return claim
+
+@pytest.mark.anyio
+async def test_high_velocity_claims_are_held_for_review_and_not_paid(mock_db):
+    # Two earlier journeys on the same policy make the third one high velocity
+    for days_ago in (2, 1):
+        await store_claim(mock_db, "FRAUD-0001", days_ago)
+    claim = await store_claim(mock_db, "FRAUD-0001")
+
+    await server.process_claim_job({"payload": {"claim_id": claim["id"]}})
+
+    stored = await mock_db.claims.find_one({"id": claim["id"]}, {"_id": 0})
+    assert stored["status"] == "processing"
+    assert stored["fraud_screening"]["recommendation"] == "REVIEW"
+    assert "HIGH_CLAIM_VELOCITY" in stored["fraud_screening"]["flags"]
+    assert stored["agent_logs"][-1]["message"] == "All 6 validations completed - claim held for manual review"
+    assert not await mock_db.payment_requests.count_documents({})
+    with pytest.raises(HTTPException) as rejected:
+        await server.approve_claim(claim["id"])
+    assert (rejected.value.status_code, rejected.value.detail) == (409, server.FRAUD_REVIEW_DETAIL)
+
+@pytest.mark.anyio
+async def test_cleared_claims_are_approved_and_paid(mock_db):
+    claim = await store_claim(mock_db, "FRAUD-0002")
+    await server.process_claim_job({"payload": {"claim_id": claim["id"]}})
+    stored = await mock_db.claims.find_one({"id": claim["id"]}, {"_id": 0, "status": 1, "agent_logs": 1})
+    assert stored["status"] == "paid"
+    assert "All 6 validations completed successfully!" in [log["message"] for log in stored["agent_logs"]]
+
+@pytest.mark.anyio
+async def test_unscreened_claims_cannot_be_approved(mock_db):
+    claim = await store_claim(mock_db, "FRAUD-0003")
+    with pytest.raises(HTTPException) as rejected:
+        await server.approve_claim(claim["id"])
+    assert (rejected.value.status_code, rejected.value.detail) == (409, server.FRAUD_NOT_SCREENED_DETAIL)
+
+@pytest.mark.anyio
+async def test_repeated_default_start_names_the_claim_already_filed(mock_db):
+    first = await server.start_claim()
+    with pytest.raises(HTTPException) as rejected:
+        await server.start_claim()
+    assert rejected.value.status_code == 409
+    assert rejected.value.detail == {"message": server.DUPLICATE_CLAIM_DETAIL, "claim_id": first["id"]}
@@ -0,0 +1,93 @@
+import pytest
+
+import server
+from itinerary import attribute_delays, evaluate_itineraries
+
+pytestmark = pytest.mark.anyio
+
+def leg(flight_number: str, departure: str, arrival: str, actual_departure: str = None, actual_arrival: str = None) -> dict:
+    return {
+        "flight_number": flight_number,
+        "scheduled_departure": f"16 Oct 2026, {departure}",
+        "scheduled_arrival": f"16 Oct 2026, {arrival}",
+        "actual_departure": actual_departure and f"16 Oct 2026, {actual_departure}",
+        "actual_arrival": actual_arrival and f"16 Oct 2026, {actual_arrival}",
+    }
+
+def test_late_inbound_leg_causes_the_missed_connection():
+    journey = attribute_delays([
+        leg("SQ656", "10:00", "12:00", "16:00", "18:00"),
+        leg("CA168", "13:30", "15:30", "18:45", "20:45"),
+    ])
+    inbound, connection = journey.legs
+    assert (inbound.own_delay_hours, inbound.missed_connection) == (6.0, False)
+    assert connection.missed_connection and connection.rebooked
+    assert (connection.knock_on_hours, connection.own_delay_hours) == (5.25, 0.0)
+    assert (journey.effective_delay_hours, journey.missed_connections, journey.primary_cause) == (5.25, 1, "SQ656")
+
+def test_connection_adds_its_own_delay_on_top_of_the_knock_on():
+    journey = attribute_delays([
+        leg("SQ656", "10:00", "12:00", "16:00", "18:00"),
+        leg("CA168", "13:30", "15:30", "19:45", "21:45"),
+    ])
+    connection = journey.legs[1]
+    assert (connection.knock_on_hours, connection.own_delay_hours) == (5.25, 1.0)
+    assert (journey.effective_delay_hours, journey.primary_cause) == (6.25, "SQ656")
+
+def test_connection_made_despite_a_late_inbound_leg():
+    journey = attribute_delays([
+        leg("SQ656", "10:00", "12:00", "10:30", "12:30"),
+        leg("CA168", "13:30", "15:30", "13:30", "15:30"),
+    ])
+    assert not journey.legs[1].missed_connection
+    assert journey.legs[1].knock_on_hours == 0.0
+    assert (journey.effective_delay_hours, journey.missed_connections) == (0.0, 0)
+
+def test_delay_falls_back_to_the_status_feed_without_actual_times():
+    segments = [leg("SQ656", "10:00", "12:00"), leg("CA168", "13:30", "15:30")]
+    statuses = {("SQ656", "16 Oct 2026"): {"flight": {"delay_minutes": 240}}}
+    journey = attribute_delays(segments, statuses)
+    assert journey.legs[0].arrival_delay_hours == 4.0
+    assert journey.legs[1].missed_connection
+    assert journey.primary_cause == "SQ656"
+
+async def test_itineraries_share_status_lookups_for_common_flights():
+    lookups = []
+
+    async def fetch_status(flight_number, date):
+        lookups.append((flight_number, date))
+        return {"flight": {"delay_minutes": 0}}
+
+    shared = leg("SQ656", "10:00", "12:00")
+    journeys = await evaluate_itineraries(
+        [[shared, leg("CA168", "13:30", "15:30")], [shared, leg("BA12", "14:00", "22:00")]], fetch_status
+    )
+    assert len(journeys) == 2
+    assert sorted(lookups) == [("BA12", "16 Oct 2026"), ("CA168", "16 Oct 2026"), ("SQ656", "16 Oct 2026")]
+
+@pytest.fixture
+def status_lookups(mock_db, monkeypatch):
+    """Flight status lookups made by the claim workflow, cached or not"""
+    lookups = []
+    get_flight_status = server.external_services.get_flight_status
+
+    async def counted(flight_number, flight_date=None):
+        lookups.append(flight_number)
+        return await get_flight_status(flight_number, flight_date)
+
+    monkeypatch.setattr(server.external_services, "get_flight_status", counted)
+    return lookups
+
+async def test_validation_looks_up_each_segment_once(status_lookups):
+    started = await server.start_claim(policy_number="JOURNEY-0001")
+    validated = await server.validate_claim(started["id"])
+    segments = [segment["flight_number"] for segment in validated["claim"]["flight_segments"]]
+    assert len(segments) > 1
+    assert sorted(status_lookups) == sorted(segments)
+
+async def test_steps_run_separately_reuse_the_journey_from_step_2(status_lookups):
+    started = await server.start_claim(policy_number="JOURNEY-0002")
+    for step_number in range(1, 7):
+        processed = await server.process_step(started["id"], step_number)
+
+    assert sorted(status_lookups) == sorted(segment["flight_number"] for segment in processed["claim"]["flight_segments"])
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from jobs import JOB_DONE, JOB_FAILED, JOB_LEASED, JOB_QUEUED, JobQueue, RetryLater, WorkerPool
+from mock_database import mock_client
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def queue():
+    return JobQueue(mock_client()["jobs_test"].jobs, visibility_timeout=30, max_attempts=3, backoff_base=0)
+
+async def expire_lease(queue: JobQueue, job: dict):
+    """Make the job's lease run out, as if its worker had crashed"""
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await queue.collection.update_one({"id": job["id"]}, {"$set": {"lease_expires_at": past}})
+
+async def stored(queue: JobQueue, job: dict) -> dict:
+    return await queue.collection.find_one({"id": job["id"]}, {"_id": 0})
+
+async def test_leased_job_is_not_leased_again_until_its_lease_expires(queue):
+    job = await queue.enqueue("work", {"n": 1})
+    leased = await queue.lease("worker-a")
+    assert (leased["id"], leased["status"], leased["attempts"]) == (job["id"], JOB_LEASED, 1)
+    assert await queue.lease("worker-b") is None
+
+    await expire_lease(queue, leased)
+    retaken = await queue.lease("worker-b")
+    assert (retaken["id"], retaken["leased_by"], retaken["attempts"]) == (job["id"], "worker-b", 2)
+
+    # The crashed worker no longer holds the job
+    await queue.complete(leased, "worker-a")
+    assert (await stored(queue, job))["status"] == JOB_LEASED
+
+async def test_job_whose_lease_expires_on_its_last_attempt_is_failed(queue):
+    job = await queue.enqueue("work", {"n": 1})
+    for _ in range(queue.max_attempts):
+        await expire_lease(queue, await queue.lease("worker"))
+
+    assert await queue.lease("worker") is None
+    failed = await stored(queue, job)
+    assert (failed["status"], failed["attempts"]) == (JOB_FAILED, queue.max_attempts)
+    assert "Lease expired" in failed["last_error"]
+
+async def test_failed_job_is_retried_until_max_attempts(queue):
+    job = await queue.enqueue("work", {"n": 1})
+    for attempt in range(1, queue.max_attempts + 1):
+        leased = await queue.lease("worker")
+        assert leased["attempts"] == attempt
+        await queue.fail(leased, "worker", "boom")
+
+    assert await queue.lease("worker") is None
+    assert (await stored(queue, job))["status"] == JOB_FAILED
+
+async def test_postponed_job_waits_without_using_an_attempt(queue):
+    job = await queue.enqueue("work", {"n": 1})
+    leased = await queue.lease("worker")
+    await queue.postpone(leased, "worker", 60, "waiting")
+
+    postponed = await stored(queue, job)
+    assert (postponed["status"], postponed["attempts"], postponed["last_error"]) == (JOB_QUEUED, 0, "waiting")
+    assert await queue.lease("worker") is None
+
+    await queue.collection.update_one({"id": job["id"]}, {"$set": {"available_at": datetime.now(timezone.utc)}})
+    assert (await queue.lease("worker"))["attempts"] == 1
+
+async def test_worker_pool_postpones_on_retry_later_and_completes_the_rerun(queue):
+    runs = []
+
+    async def handler(job):
+        runs.append(job["attempts"])
+        if len(runs) < 3:
+            raise RetryLater(0, "not yet")
+
+    pool = WorkerPool(queue, {"work": handler}, concurrency=1, poll_interval=0.01, max_poll_interval=0.01)
+    job = await queue.enqueue("work", {"n": 1})
+    pool.start()
+    try:
+        for _ in range(200):
+            if (await stored(queue, job))["status"] == JOB_DONE:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await pool.stop()
+
+    # Every run was the first attempt, so postponing never brought the job nearer max_attempts
+    assert runs == [1, 1, 1]
+    assert (await stored(queue, job))["status"] == JOB_DONE
+    assert pool.worker_stats()[0]["postponed"] == 2
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import server
+from metrics import REGISTRY, CommandMetrics, observe_claim_paid
+
+pytestmark = pytest.mark.anyio
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def transitions() -> dict:
+    return {
+        status: sample("claim_transitions_total", status=status)
+        for status in ("processing", "approved", "paying", "paid")
+    }
+
+async def test_claim_lifecycle_records_transitions_steps_and_external_calls(mock_db):
+    before = transitions()
+    steps_before = {step: sample("claim_validation_step_seconds_count", step=str(step)) for step in range(1, 7)}
+    policy_calls = sample("external_call_seconds_count", call="verify_policy", outcome="ok")
+    paid_before = sample("claim_end_to_end_seconds_count")
+
+    started = await server.start_claim(policy_number="METRICS-0001")
+    await server.validate_claim(started["id"])
+    await server.approve_claim(started["id"])
+    await server.pay_claim_idempotently(started["id"])
+
+    after = transitions()
+    assert {status: after[status] - before[status] for status in after} == {
+        "processing": 1, "approved": 1, "paying": 1, "paid": 1,
+    }
+    for step in range(1, 7):
+        assert sample("claim_validation_step_seconds_count", step=str(step)) == steps_before[step] + 1
+    assert sample("external_call_seconds_count", call="verify_policy", outcome="ok") == policy_calls + 1
+    assert sample("claim_end_to_end_seconds_count") == paid_before + 1
+
+def test_command_listener_times_mongodb_commands():
+    listener = CommandMetrics()
+    labels = {"collection": "claims", "command": "find", "outcome": "ok"}
+    before = sample("mongodb_operation_seconds_count", **labels)
+
+    listener.started(SimpleNamespace(command={"find": "claims"}, command_name="find", connection_id=("db", 27017), request_id=1))
+    listener.succeeded(SimpleNamespace(command_name="find", connection_id=("db", 27017), request_id=1, duration_micros=2500))
+
+    assert sample("mongodb_operation_seconds_count", **labels) == before + 1
+    assert sample("mongodb_operation_seconds_bucket", le="0.0025", **labels) >= 1
+
+def test_unparseable_creation_time_is_not_observed():
+    before = sample("claim_end_to_end_seconds_count")
+    observe_claim_paid("not a timestamp")
+    observe_claim_paid(None)
+    assert sample("claim_end_to_end_seconds_count") == before
+
+async def test_metrics_endpoint_serves_the_registry():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+        response = await http.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "claim_transitions_total" in response.text
+    assert "claim_validation_step_seconds_bucket" in response.text
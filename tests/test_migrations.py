@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from migrations import MIGRATIONS, archive_claims, migrate
+from mock_database import mock_client
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def fresh_db():
+    return mock_client()["migrations_test"]
+
+def migrations(*versions: int) -> list:
+    return [migration for migration in MIGRATIONS if migration[0] in versions]
+
+async def test_migrations_apply_once_in_version_order(fresh_db):
+    assert await migrate(fresh_db) == sorted(version for version, _, _ in MIGRATIONS)
+    assert await migrate(fresh_db) == []
+    assert "claims_id_unique" in await fresh_db.claims.index_information()
+    assert await fresh_db.schema_migrations.count_documents({}) == len(MIGRATIONS)
+
+async def test_embedded_logs_move_to_the_log_collection(fresh_db):
+    logs = [{"message": f"log {n}"} for n in range(1, 26)]
+    await fresh_db.claims.insert_one({"id": "old", "agent_logs": logs})
+    await fresh_db.claims.insert_one({"id": "empty", "agent_logs": []})
+    await migrate(fresh_db, migrations(5))
+
+    rows = await fresh_db.claim_logs.find({"claim_id": "old"}, {"_id": 0}).sort("seq", 1).to_list(None)
+    assert [(row["seq"], row["message"]) for row in rows] == [(n, f"log {n}") for n in range(1, 26)]
+    old = await fresh_db.claims.find_one({"id": "old"})
+    assert old["log_count"] == 25
+    assert old["agent_logs"] == logs[-20:]
+    assert (await fresh_db.claims.find_one({"id": "empty"}))["log_count"] == 0
+
+async def test_claims_from_before_versioning_start_at_version_0(fresh_db):
+    await fresh_db.claims.insert_many([{"id": "old"}, {"id": "new", "version": 4}])
+    await migrate(fresh_db, migrations(9))
+    versions = {claim["id"]: claim["version"] async for claim in fresh_db.claims.find()}
+    assert versions == {"old": 0, "new": 4}
+
+async def test_archiving_moves_old_finished_claims_and_their_logs(fresh_db):
+    await migrate(fresh_db)
+    old = (datetime.now(timezone.utc) - timedelta(days=40)).isoformat()
+    recent = datetime.now(timezone.utc).isoformat()
+    await fresh_db.claims.insert_many([
+        {"id": "old-paid", "status": "paid", "created_at": old},
+        {"id": "old-rejected", "status": "rejected", "created_at": old},
+        {"id": "old-pending", "status": "pending", "created_at": old},
+        {"id": "recent-paid", "status": "paid", "created_at": recent},
+    ])
+    await fresh_db.claim_logs.insert_many([
+        {"claim_id": claim_id, "seq": 1, "message": "started"}
+        for claim_id in ("old-paid", "old-rejected", "old-pending", "recent-paid")
+    ])
+    archived_ids = []
+
+    assert await archive_claims(fresh_db, 30, batch_size=1, on_archived=archived_ids.extend) == 2
+    assert sorted(archived_ids) == ["old-paid", "old-rejected"]
+    assert sorted([claim["id"] async for claim in fresh_db.claims.find()]) == ["old-pending", "recent-paid"]
+    assert sorted([claim["id"] async for claim in fresh_db.claims_archive.find()]) == ["old-paid", "old-rejected"]
+    assert sorted([row["claim_id"] async for row in fresh_db.claim_logs_archive.find()]) == ["old-paid", "old-rejected"]
+    assert await fresh_db.claim_logs.count_documents({}) == 2
+
+async def remembered_claim(status: str) -> tuple:
+    """A claim whose version this instance has cached, and its ETag"""
+    started = await server.start_claim(policy_number=f"ARCHIVE-{status}")
+    await server.db.claims.update_one(
+        {"id": started["id"]},
+        {"$set": {"status": status, "created_at": (datetime.now(timezone.utc) - timedelta(days=40)).isoformat()}}
+    )
+    response = await server.get_claim(started["id"])
+    return started["id"], response.headers["ETag"]
+
+async def test_archived_claim_is_not_served_from_the_version_cache(mock_db):
+    claim_id, etag = await remembered_claim("paid")
+    assert (await server.get_claim(claim_id, if_none_match=etag)).status_code == 304
+
+    assert await archive_claims(mock_db, 30, on_archived=server.forget_claim_versions) == 1
+    with pytest.raises(server.HTTPException) as missing:
+        await server.get_claim(claim_id, if_none_match=etag)
+    assert missing.value.status_code == 404
+
+async def test_cleared_claims_are_not_served_from_the_version_cache(mock_db):
+    claim_id, etag = await remembered_claim("pending")
+    await server.clear_claims()
+    with pytest.raises(server.HTTPException) as missing:
+        await server.get_claim(claim_id, if_none_match=etag)
+    assert missing.value.status_code == 404
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from mock_upstream import UpstreamSimulator, parse_latency
+from upstream import UpstreamError
+
+pytestmark = pytest.mark.anyio
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("zero", 0.0, 0.0),
+    ("0.25", 0.25, 0.25),
+    ("fixed:1.5", 1.5, 1.5),
+    ("uniform:0.3:0.8", 0.3, 0.8),
+    ("normal:0.01:5", 0.0, float("inf")),
+    ("lognormal:0.2:0.5", 0.0, float("inf")),
+    ("exponential:0.1", 0.0, float("inf")),
+])
+def test_latency_specs_draw_within_their_range(spec, low, high):
+    distribution = parse_latency(spec)
+    rng = random.Random(1)
+    assert all(low <= distribution(rng) <= high for _ in range(200))
+
+@pytest.mark.parametrize("spec", ["uniform:0.3", "gamma:1:2", "slow", "fixed:a"])
+def test_invalid_latency_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_latency(spec)
+
+def test_invalid_profile_is_rejected_when_the_simulator_is_built():
+    with pytest.raises(ValueError):
+        UpstreamSimulator({"flight": {"latency": "uniform:1"}})
+
+def test_seeded_services_draw_the_same_sequence_however_calls_interleave():
+    profiles = {"*": {"latency": "uniform:0.1:0.9", "error_rate": 0.3}}
+    alone = UpstreamSimulator(profiles, seed=7)
+    interleaved = UpstreamSimulator(profiles, seed=7)
+
+    flight_alone = [alone.plan("flight") for _ in range(20)]
+    flight_interleaved = []
+    for _ in range(20):
+        interleaved.plan("weather")
+        flight_interleaved.append(interleaved.plan("flight"))
+
+    assert flight_alone == flight_interleaved
+    assert flight_alone != [UpstreamSimulator(profiles, seed=8).plan("flight") for _ in range(20)]
+
+def test_service_profiles_override_the_defaults_for_every_service():
+    simulator = UpstreamSimulator({"*": {"latency": "fixed:0.5", "error_rate": 1}, "payment": {"error_rate": 0}})
+    assert simulator.plan("payment") == (0.5, None)
+    assert simulator.plan("flight") == (0.5, "error")
+
+def test_tail_latency_is_drawn_at_the_tail_rate():
+    simulator = UpstreamSimulator({
+        "*": {"latency": "fixed:0.1", "tail_latency": "fixed:3"},
+        "flight": {"tail_rate": 1},
+    })
+    assert simulator.plan("flight") == (3.0, None)
+    assert simulator.plan("weather") == (0.1, None)
+
+async def test_injected_errors_and_timeouts_fail_the_call_and_are_counted():
+    simulator = UpstreamSimulator(
+        {"policy": {"error_rate": 1}, "payment": {"timeout_rate": 1, "timeout": 0}}, default_latency="zero"
+    )
+    await simulator.call("flight")
+    with pytest.raises(UpstreamError, match="HTTP 503"):
+        await simulator.call("policy")
+    with pytest.raises(UpstreamError, match="timed out"):
+        await simulator.call("payment")
+
+    assert simulator.stats() == {
+        "flight": {"calls": 1, "errors": 0, "timeouts": 0},
+        "payment": {"calls": 1, "errors": 0, "timeouts": 1},
+        "policy": {"calls": 1, "errors": 1, "timeouts": 0},
+    }
+
+def test_simulator_is_configured_from_the_environment(monkeypatch, tmp_path):
+    profile = tmp_path / "profile.json"
+    profile.write_text('{"weather": {"latency": "fixed:2"}}')
+    monkeypatch.setenv("MOCK_UPSTREAM_PROFILE", str(profile))
+    monkeypatch.setenv("MOCK_UPSTREAM_LATENCY", "fixed:0.2")
+    monkeypatch.setenv("MOCK_UPSTREAM_SEED", "3")
+
+    simulator = UpstreamSimulator.from_env()
+    assert simulator.seed == 3
+    assert (simulator.plan("weather"), simulator.plan("flight")) == ((2.0, None), (0.2, None))
+
+    monkeypatch.setenv("MOCK_UPSTREAM_PROFILE", '{"flight": {"error_rate": 1}}')
+    assert UpstreamSimulator.from_env().plan("flight") == (0.2, "error")
@@ -0,0 +1,110 @@
+import httpx
+import pytest
+
+import server
+from parametric import SegmentIndex, apply_flight_delay, parse_flight_event
+
+pytestmark = pytest.mark.anyio
+
+def policy(policy_number: str, flight_number: str = "SQ656") -> dict:
+    scenario = server.render_scenario()
+    scenario["policy_details"]["policy_number"] = policy_number
+    scenario["flight_segments"] = [{**scenario["flight_segments"][0], "flight_number": flight_number}]
+    return {key: scenario[key] for key in ("policy_holder", "policy_details", "flight_segments")}
+
+def delay_event(registered: dict, delay_minutes: int) -> dict:
+    segment = registered["flight_segments"][0]
+    return {"flight": {
+        "ident": segment["flight_number"],
+        "scheduled_departure": segment["scheduled_departure"],
+        "status": "Delayed",
+        "delay_minutes": delay_minutes,
+        "delay_reason": "Weather",
+    }}
+
+@pytest.fixture
+async def http(mock_db, monkeypatch):
+    monkeypatch.setattr(server, "parametric_index", SegmentIndex())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        yield client
+
+async def post(http, path: str, items: list) -> dict:
+    response = await http.post(path, json=items)
+    assert response.status_code == 200
+    return response.json()
+
+async def parametric_claims(db) -> list:
+    return [
+        claim["parametric_trigger"]["policy_number"]
+        async for claim in db.claims.find({"parametric_trigger": {"$exists": True}})
+    ]
+
+async def test_delay_creates_one_claim_per_covering_policy(mock_db, http):
+    covered = [policy("PAR-0001"), policy("PAR-0002")]
+    registered = await post(http, "/api/parametric/policies", [*covered, policy("PAR-0003", "BA12")])
+    assert (registered["registered"], registered["index"]) == (3, {"policies": 3, "segments": 2})
+
+    summary = await post(http, "/api/parametric/events", [delay_event(covered[0], 420)])
+    assert (summary["triggered_segments"], summary["claims_created"]) == (1, 2)
+    assert sorted(await parametric_claims(mock_db)) == ["PAR-0001", "PAR-0002"]
+    assert await mock_db.claim_jobs.count_documents({"type": "validate_claim"}) == 2
+
+    claim = await mock_db.claims.find_one({"parametric_trigger.policy_number": "PAR-0001"})
+    assert (claim["flight_segments"][0]["delay_hours"], claim["flight_segments"][0]["delay_reason"]) == (7, "Weather")
+
+async def test_repeated_event_does_not_claim_again(mock_db, http):
+    covered = policy("PAR-0001")
+    await post(http, "/api/parametric/policies", [covered])
+    await post(http, "/api/parametric/events", [delay_event(covered, 420)])
+
+    summary = await post(http, "/api/parametric/events", [delay_event(covered, 420), delay_event(covered, 480)])
+    assert (summary["delayed"], summary["claims_created"]) == (2, 0)
+
+    # Re-registering reads back the segments already triggered
+    await post(http, "/api/parametric/policies", [covered])
+    summary = await post(http, "/api/parametric/events", [delay_event(covered, 420)])
+    assert summary["claims_created"] == 0
+    assert await parametric_claims(mock_db) == ["PAR-0001"]
+    assert (await mock_db.parametric_policies.find_one({"policy_number": "PAR-0001"}))["triggered"] == [
+        ["SQ656", covered["flight_segments"][0]["scheduled_departure"].split(",")[0]]
+    ]
+
+async def test_short_delays_and_invalid_events_do_not_claim(mock_db, http):
+    covered = policy("PAR-0001")
+    await post(http, "/api/parametric/policies", [covered])
+
+    summary = await post(http, "/api/parametric/events", [delay_event(covered, 300), {"flight": {}}])
+    assert (summary["received"], summary["invalid"], summary["delayed"], summary["claims_created"]) == (2, 1, 0, 0)
+    assert await parametric_claims(mock_db) == []
+
+async def test_removed_policy_is_not_claimed_for(mock_db, http):
+    covered = policy("PAR-0001")
+    await post(http, "/api/parametric/policies", [covered])
+    assert (await http.delete("/api/parametric/policies/PAR-0001")).status_code == 200
+
+    summary = await post(http, "/api/parametric/events", [delay_event(covered, 420)])
+    assert summary["claims_created"] == 0
+
+def test_taken_segment_leaves_the_index_until_restored():
+    index = SegmentIndex()
+    index.add("P1", [("SQ656", "16 Oct 2026"), ("CA168", "16 Oct 2026")])
+    index.add("P2", [("SQ656", "16 Oct 2026")])
+
+    assert index.take(("SQ656", "16 Oct 2026")) == {"P1", "P2"}
+    assert index.take(("SQ656", "16 Oct 2026")) == set()
+    assert index.stats() == {"policies": 1, "segments": 1}
+
+    index.restore(("SQ656", "16 Oct 2026"), ["P2"])
+    assert index.take(("SQ656", "16 Oct 2026")) == {"P2"}
+
+def test_delay_is_applied_to_the_delayed_segment_only():
+    segments = [
+        {"flight_number": "SQ656", "scheduled_departure": "16 Oct 2026, 22:30", "scheduled_arrival": "17 Oct 2026, 04:00"},
+        {"flight_number": "CA168", "scheduled_departure": "17 Oct 2026, 06:00", "scheduled_arrival": "17 Oct 2026, 09:00"},
+    ]
+    event = parse_flight_event({"date": "16 Oct 2026", "flight": {"ident": "SQ656", "delay_minutes": 390}})
+    delayed, connection = apply_flight_delay(segments, event)
+    assert (delayed["actual_departure"], delayed["actual_arrival"], delayed["delay_hours"]) == (
+        "17 Oct 2026, 05:00", "17 Oct 2026, 10:30", 6
+    )
+    assert connection == segments[1]
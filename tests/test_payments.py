@@ -0,0 +1,166 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+REQUESTS = 100
+
+@pytest.fixture
+def gateway_calls(monkeypatch):
+    """Count calls reaching the payment gateway"""
+    calls = []
+    process_payment = server.external_services.process_payment
+
+    async def counting_process_payment(*args, **kwargs):
+        calls.append(args)
+        return await process_payment(*args, **kwargs)
+
+    monkeypatch.setattr(server.external_services, "process_payment", counting_process_payment)
+    return calls
+
+async def approved_claim(db) -> dict:
+    claim = server.render_scenario()
+    claim["status"] = "approved"
+    claim["claim_details"] = {"compensation_amount": 100, "status": "Approved"}
+    await db.claims.insert_one(claim)
+    return claim
+
+async def pay_in_parallel(claim_id: str, headers: dict) -> list:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+        return await asyncio.gather(*(
+            http.post(f"/api/claim/{claim_id}/pay", headers=headers) for _ in range(REQUESTS)
+        ))
+
+def status_codes(responses) -> dict:
+    codes = {}
+    for response in responses:
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+    return codes
+
+async def test_parallel_pay_requests_pay_once(mock_db, gateway_calls):
+    claim = await approved_claim(mock_db)
+    responses = await pay_in_parallel(claim["id"], {})
+
+    assert status_codes(responses) == {200: 1, 409: REQUESTS - 1}
+    assert len(gateway_calls) == 1
+    stored = await mock_db.claims.find_one({"id": claim["id"]}, {"_id": 0, "status": 1})
+    assert stored["status"] == "paid"
+
+async def test_parallel_pay_requests_with_one_idempotency_key_share_one_payment(mock_db, gateway_calls):
+    claim = await approved_claim(mock_db)
+    responses = await pay_in_parallel(claim["id"], {"Idempotency-Key": f"pay-{claim['id']}"})
+
+    assert len(gateway_calls) == 1
+    transactions = {
+        response.json()["payment"]["payment"]["transaction_id"] for response in responses if response.status_code == 200
+    }
+    assert len(transactions) == 1
+    assert set(status_codes(responses)) <= {200, 409}
+
+async def test_paying_a_paid_claim_is_rejected(mock_db, gateway_calls):
+    claim = await approved_claim(mock_db)
+    await server.pay_claim_idempotently(claim["id"])
+    with pytest.raises(server.HTTPException) as rejected:
+        await server.pay_claim_idempotently(claim["id"])
+    assert rejected.value.status_code == 409
+    assert len(gateway_calls) == 1
+
+async def crashed_payment(db, claim: dict, key: str, started_seconds_ago: float):
+    """Leave the claim and its idempotency key as a request that died mid-payment would"""
+    started = datetime.now(timezone.utc) - timedelta(seconds=started_seconds_ago)
+    await db.claims.update_one({"id": claim["id"]}, {"$set": {"status": "paying", "payment_started_at": started}})
+    await db.payment_requests.insert_one(
+        {"key": key, "claim_id": claim["id"], "status": "pending", "created_at": started, "started_at": started}
+    )
+
+async def test_retry_after_a_crash_takes_over_once_the_payment_lease_lapses(mock_db, gateway_calls):
+    claim = await approved_claim(mock_db)
+    key = f"pay-{claim['id']}"
+    await crashed_payment(mock_db, claim, key, server.PAYMENT_LEASE_SECONDS + 1)
+
+    response = await server.pay_claim_idempotently(claim["id"], key)
+
+    assert response["claim"]["status"] == "paid"
+    assert len(gateway_calls) == 1
+    stored_key = await mock_db.payment_requests.find_one({"key": key}, {"_id": 0})
+    assert stored_key["status"] == "completed"
+    # Later retries replay the stored response
+    assert await server.pay_claim_idempotently(claim["id"], key) == response
+    assert len(gateway_calls) == 1
+
+async def test_retry_within_the_payment_lease_is_still_in_progress(mock_db, gateway_calls):
+    claim = await approved_claim(mock_db)
+    key = f"pay-{claim['id']}"
+    await crashed_payment(mock_db, claim, key, 5)
+
+    with pytest.raises(server.HTTPException) as rejected:
+        await server.pay_claim_idempotently(claim["id"], key)
+    assert rejected.value.status_code == 409
+    assert not gateway_calls
+
+@pytest.fixture
+def batch_calls(monkeypatch):
+    """Count settlement batches sent to the payment gateway, with their payment references"""
+    calls = []
+    process_payment_batch = server.external_services.process_payment_batch
+
+    async def counting_process_payment_batch(currency, bank, payments):
+        calls.append((currency, [payment["reference"] for payment in payments]))
+        return await process_payment_batch(currency, bank, payments)
+
+    monkeypatch.setattr(server.external_services, "process_payment_batch", counting_process_payment_batch)
+    return calls
+
+async def stored_statuses(db, claims: list) -> set:
+    return {doc["status"] async for doc in db.claims.find({"id": {"$in": [claim["id"] for claim in claims]}})}
+
+async def test_claims_paid_together_share_one_gateway_batch_per_currency(mock_db, gateway_calls, batch_calls):
+    claims = [await approved_claim(mock_db) for _ in range(6)]
+    for claim in claims[4:]:
+        await mock_db.claims.update_one({"id": claim["id"]}, {"$set": {"policy_details.currency": "USD"}})
+
+    results = await server.pay_claims([claim["id"] for claim in claims])
+
+    assert [result["status"] for result in results] == ["paid"] * 6
+    assert len({result["transaction_id"] for result in results}) == 6
+    assert sorted((currency, len(references)) for currency, references in batch_calls) == [("SGD", 4), ("USD", 2)]
+    assert not gateway_calls
+    assert await stored_statuses(mock_db, claims) == {"paid"}
+
+async def test_failed_gateway_batch_returns_its_claims_to_approved(mock_db, monkeypatch):
+    claims = [await approved_claim(mock_db) for _ in range(3)]
+
+    async def gateway_down(currency, bank, payments):
+        raise server.UpstreamError("payment", "HTTP 503")
+
+    monkeypatch.setattr(server.external_services, "process_payment_batch", gateway_down)
+    results = await server.pay_claims([claim["id"] for claim in claims])
+
+    assert [(result["status"], result["status_code"]) for result in results] == [("error", 503)] * 3
+    assert await stored_statuses(mock_db, claims) == {"approved"}
+
+async def test_payment_the_gateway_declines_leaves_only_its_claim_unpaid(mock_db, monkeypatch):
+    claims = [await approved_claim(mock_db) for _ in range(3)]
+    process_payment_batch = server.external_services.process_payment_batch
+    declined = server.payment_reference(claims[1]["id"])
+
+    async def declining(currency, bank, payments):
+        response = await process_payment_batch(currency, bank, payments)
+        response["results"] = [
+            {**payment, "status": "DECLINED"} if payment["reference"] == declined else payment
+            for payment in response["results"]
+        ]
+        return response
+
+    monkeypatch.setattr(server.external_services, "process_payment_batch", declining)
+    results = await server.pay_claims([claim["id"] for claim in claims])
+
+    assert [result["status"] for result in results] == ["paid", "error", "paid"]
+    assert results[1]["detail"] == "Payment DECLINED"
+    assert await stored_statuses(mock_db, claims[1:2]) == {"approved"}
+    assert await stored_statuses(mock_db, claims[::2]) == {"paid"}
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import Response
+
+import server
+from responses import ORJSONRoute, dumps
+
+pytestmark = pytest.mark.anyio
+
+class Leg(BaseModel):
+    flight_number: str
+    delay_hours: float
+
+def test_dumps_matches_fastapis_encoding():
+    content = {
+        "id": "claim-1",
+        "created_at": datetime(2026, 10, 16, 9, 15, tzinfo=timezone.utc),
+        "compensation": np.float64(100.5),
+        "segments": np.int64(2),
+        "leg": Leg(flight_number="SQ656", delay_hours=6),
+        "steps": [{"step_number": 1, "status": "completed"}],
+        3: "numbered",
+    }
+    decoded = json.loads(dumps(content))
+    assert decoded == json.loads(json.dumps(jsonable_encoder({**content, "compensation": 100.5, "segments": 2})))
+    assert decoded["leg"] == {"flight_number": "SQ656", "delay_hours": 6.0}
+    assert decoded["3"] == "numbered"
+
+@pytest.fixture
+def app() -> FastAPI:
+    router = APIRouter(route_class=ORJSONRoute)
+
+    @router.get("/claim")
+    async def claim():
+        return {"id": "claim-1", "leg": Leg(flight_number="SQ656", delay_hours=6)}
+
+    @router.get("/empty")
+    async def empty():
+        return Response(status_code=304, headers={"ETag": '"3"'})
+
+    @router.get("/sync")
+    def sync():
+        return {"threadpool": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+async def get(app: FastAPI, path: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        return await http.get(path)
+
+async def test_route_serializes_the_endpoints_result_with_orjson(app):
+    response = await get(app, "/claim")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"id": "claim-1", "leg": {"flight_number": "SQ656", "delay_hours": 6.0}}
+
+async def test_route_passes_responses_through(app):
+    response = await get(app, "/empty")
+    assert (response.status_code, response.headers["etag"], response.content) == (304, '"3"', b"")
+
+async def test_route_leaves_sync_endpoints_to_fastapi(app):
+    assert (await get(app, "/sync")).json() == {"threadpool": True}
+
+async def test_claim_is_returned_as_stored(mock_db):
+    started = await server.start_claim(policy_number="JSON-0001")
+    await server.validate_claim(started["id"])
+    stored = await mock_db.claims.find_one({"id": started["id"]}, {"_id": 0})
+
+    response = await get(server.app, f"/api/claim/{started['id']}")
+    assert response.json() == jsonable_encoder(stored)
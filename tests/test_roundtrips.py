@@ -0,0 +1,51 @@
+import pytest
+
+import server
+from claim_logs import ClaimLogWriter
+from mock_database import CountingDatabase
+
+pytestmark = pytest.mark.anyio
+
+CLAIMS = 5
+
+async def step_by_step(claim_id):
+    for step_number in range(1, 7):
+        await server.process_step(claim_id, step_number)
+
+async def count_lifecycle_operations(mock_db, monkeypatch, validate) -> dict:
+    """DB operations per claim from start to paid, with each claim's log rows flushed before the next"""
+    counting = CountingDatabase(mock_db)
+    monkeypatch.setattr(server, "db", counting)
+    # Log rows are only written when flushed below, however long a claim takes
+    monkeypatch.setattr(server, "claim_log_writer", ClaimLogWriter(
+        lambda rows: counting.claim_logs.insert_many(rows, ordered=False), linger=60
+    ))
+    for n in range(CLAIMS):
+        started = await server.start_claim(policy_number=f"ROUNDTRIP-{n:04d}")
+        await validate(started["id"])
+        await server.approve_claim(started["id"])
+        await server.pay_claim_idempotently(started["id"])
+        await server.claim_log_writer.flush()
+    return {name: count / CLAIMS for name, count in counting.counts.items()}
+
+async def test_step_by_step_lifecycle_round_trips(mock_db, monkeypatch):
+    operations = await count_lifecycle_operations(mock_db, monkeypatch, step_by_step)
+    # One read and one update per step, one update each for approve and the
+    # payment, and every log row of the claim written with one insert_many
+    assert operations == {"insert_one": 1, "find_one": 6, "find_one_and_update": 9, "insert_many": 1}
+    assert sum(operations.values()) == 17
+
+async def test_validate_lifecycle_round_trips(mock_db, monkeypatch):
+    operations = await count_lifecycle_operations(mock_db, monkeypatch, server.validate_claim)
+    assert operations == {"insert_one": 1, "find_one": 1, "find_one_and_update": 4, "insert_many": 1}
+    assert sum(operations.values()) == 7
+
+async def test_revalidating_a_validated_claim_writes_nothing(mock_db, monkeypatch):
+    started = await server.start_claim(policy_number="ROUNDTRIP-REVALIDATE")
+    first = await server.validate_claim(started["id"])
+    counting = CountingDatabase(mock_db)
+    monkeypatch.setattr(server, "db", counting)
+    second = await server.validate_claim(started["id"])
+    assert second["steps"] == []
+    assert second["claim"]["log_count"] == first["claim"]["log_count"]
+    assert counting.counts == {"find_one": 1}
@@ -0,0 +1,67 @@
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+
+import server
+from server import SCENARIO_ITINERARY, ClaimWorkflow, ScenarioTemplate
+
+pytestmark = pytest.mark.anyio
+
+JOURNEY_TIME = datetime(2026, 10, 16, 14, 30, 45, tzinfo=server.SINGAPORE_TZ)
+
+def times(claim: dict) -> list:
+    return [
+        (segment["scheduled_departure"], segment["scheduled_arrival"], segment["actual_departure"], segment["actual_arrival"])
+        for segment in claim["flight_segments"]
+    ]
+
+def test_render_places_the_itinerary_at_the_journey_time():
+    claim = ScenarioTemplate(SCENARIO_ITINERARY).render(JOURNEY_TIME)
+    assert times(claim) == [
+        ("16 Oct 2026, 14:30", "16 Oct 2026, 19:00", "16 Oct 2026, 20:30", "17 Oct 2026, 01:00"),
+        ("16 Oct 2026, 21:00", "17 Oct 2026, 01:00", "17 Oct 2026, 03:00", "17 Oct 2026, 07:00"),
+    ]
+    assert (claim["policy_details"]["coverage_start"], claim["policy_details"]["coverage_end"]) == ("15 October 2026", "30 October 2026")
+    assert [step["status"] for step in claim["validation_steps"]] == ["pending"] * 6
+    assert claim["agent_logs"] == []
+    ClaimWorkflow.model_validate(claim)
+
+def test_renders_do_not_share_state():
+    template = ScenarioTemplate(SCENARIO_ITINERARY)
+    first = template.render(JOURNEY_TIME)
+    first["flight_segments"][0]["status"] = "Cancelled"
+    first["policy_details"]["policy_number"] = "CHANGED"
+    first["validation_steps"][0]["status"] = "completed"
+
+    second = template.render(JOURNEY_TIME)
+    assert second["id"] != first["id"]
+    assert second["flight_segments"][0]["status"] == "Delayed"
+    assert second["policy_details"]["policy_number"] != "CHANGED"
+    assert second["validation_steps"][0]["status"] == "pending"
+
+def test_timed_fields_follow_the_journey_minute():
+    template = ScenarioTemplate(SCENARIO_ITINERARY)
+    assert times(template.render(JOURNEY_TIME)) == times(template.render(JOURNEY_TIME.replace(second=5)))
+    later = template.render(JOURNEY_TIME.replace(minute=31))
+    assert later["flight_segments"][0]["scheduled_departure"] == "16 Oct 2026, 14:31"
+
+def test_json_body_matches_the_rendered_document(monkeypatch):
+    monkeypatch.setattr(server, "get_dynamic_journey_datetime", lambda: JOURNEY_TIME)
+    template = ScenarioTemplate(SCENARIO_ITINERARY)
+    rendered = json.loads(template.render_json())
+    expected = template.render()
+    assert rendered["id"] != expected["id"]
+    for key in ("id", "created_at"):
+        rendered.pop(key)
+        expected.pop(key)
+    assert rendered == expected
+
+async def test_scenario_endpoint_returns_a_valid_claim():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+        first, second = [await http.get("/api/scenario") for _ in range(2)]
+    assert first.headers["content-type"] == "application/json"
+    claims = [ClaimWorkflow.model_validate(response.json()) for response in (first, second)]
+    assert claims[0].id != claims[1].id
+    assert [segment.flight_number for segment in claims[0].flight_segments] == ["SQ656", "CA168"]
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+from opentelemetry import trace
+
+import server
+import tracing
+from mock_database import CountingDatabase
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def spans():
+    """Record spans in memory for the test, then go back to the configured exporter"""
+    tracing.configure("memory")
+    yield lambda: tracing.memory_exporter.get_finished_spans()
+    tracing.configure(tracing.TRACE_EXPORTER, tracing.TRACE_SAMPLE_RATIO)
+
+async def test_claim_lifecycle_is_one_trace(mock_db, spans):
+    started = await server.start_claim(policy_number="TRACING-0001")
+    await server.validate_claim(started["id"])
+    await server.approve_claim(started["id"])
+    await server.pay_claim(started["id"], idempotency_key=None)
+
+    finished = spans()
+    by_name = {}
+    for span in finished:
+        by_name.setdefault(span.name, []).append(span)
+    root = by_name["start_claim"][0]
+    trace_id = root.context.trace_id
+    assert {span.context.trace_id for span in finished} == {trace_id}
+
+    # Later requests for the claim are children of the span that started it
+    for name in ("validate_claim", "approve_claim", "pay_claim"):
+        (span,) = by_name[name]
+        assert span.parent.span_id == root.context.span_id
+        assert span.attributes["claim.id"] == started["id"]
+
+    validate = by_name["validate_claim"][0]
+    for call in ("verify_policy", "get_flight_status", "get_weather", "check_eligibility", "security_screening"):
+        assert by_name[f"external.{call}"], call
+        assert all(span.parent.span_id == validate.context.span_id for span in by_name[f"external.{call}"])
+    assert by_name["external.process_payment"][0].parent.span_id == by_name["pay_claim"][0].context.span_id
+
+    claim = await mock_db.claims.find_one({"id": started["id"]}, {"_id": 0, "trace": 1, "agent_logs": 1})
+    assert claim["trace"]["trace_id"] == trace.format_trace_id(trace_id)
+    assert {log["trace_id"] for log in claim["agent_logs"]} == {claim["trace"]["trace_id"]}
+
+async def test_unsampled_claims_record_no_spans_but_keep_a_trace_id(mock_db, spans):
+    tracing.configure("memory", sample_ratio=0.0)
+    started = await server.start_claim(policy_number="TRACING-0002")
+    await server.validate_claim(started["id"])
+
+    assert tracing.memory_exporter.get_finished_spans() == ()
+    claim = await mock_db.claims.find_one({"id": started["id"]}, {"_id": 0, "trace": 1})
+    assert claim["trace"]["sampled"] is False
+    assert int(claim["trace"]["trace_id"], 16) != 0
+
+async def job_reads(mock_db, monkeypatch, policy_number: str, cold: bool) -> int:
+    """Database reads made by the worker processing a new claim end to end"""
+    started = await server.start_claim(policy_number=policy_number)
+    if cold:
+        # An instance that did not start the claim has no trace contexts in memory
+        monkeypatch.setattr(tracing, "_claim_contexts", OrderedDict())
+    counting = CountingDatabase(mock_db)
+    monkeypatch.setattr(server, "db", counting)
+    await server.process_claim_job({"payload": {"claim_id": started["id"]}})
+    monkeypatch.setattr(server, "db", mock_db)
+    return counting.counts.get("find_one", 0)
+
+async def test_cold_instance_takes_the_trace_from_the_claim_it_already_read(mock_db, monkeypatch, spans):
+    warm = await job_reads(mock_db, monkeypatch, "TRACING-0003", cold=False)
+    cold = await job_reads(mock_db, monkeypatch, "TRACING-0004", cold=True)
+    assert cold == warm
+
+    claim = await mock_db.claims.find_one({"policy_details.policy_number": "TRACING-0004"})
+    trace_id = int(claim["trace"]["trace_id"], 16)
+    job_spans = [span for span in spans() if span.attributes.get("claim.id") == claim["id"]]
+    assert {span.name for span in job_spans} >= {"validate_claim", "approve_claim", "pay_claim"}
+    assert {span.context.trace_id for span in job_spans} == {trace_id}
+
+async def test_opening_a_claim_remembers_its_trace(mock_db, monkeypatch):
+    started = await server.start_claim(policy_number="TRACING-0005")
+    monkeypatch.setattr(tracing, "_claim_contexts", OrderedDict())
+    await server.get_claim(started["id"])
+
+    claim = await mock_db.claims.find_one({"id": started["id"]})
+    assert tracing.known_claim_trace(started["id"]) == claim["trace"]
+
+def test_mongodb_commands_are_child_spans(spans):
+    listener = tracing.CommandTracing()
+    with tracing.claim_span("process_step", "claim-1") as parent:
+        listener.started(SimpleNamespace(command={"find": "claims"}, command_name="find", connection_id=("db", 27017), request_id=7))
+        listener.succeeded(SimpleNamespace(command_name="find", connection_id=("db", 27017), request_id=7))
+        listener.started(SimpleNamespace(command={"insert": "claims"}, command_name="insert", connection_id=("db", 27017), request_id=8))
+        listener.failed(SimpleNamespace(command_name="insert", connection_id=("db", 27017), request_id=8, failure={"errmsg": "duplicate key"}))
+
+    find, insert = (span for span in spans() if span.name.startswith("mongodb."))
+    assert find.name == "mongodb.find"
+    assert find.parent.span_id == parent.get_span_context().span_id
+    assert find.attributes["db.mongodb.collection"] == "claims"
+    assert insert.status.status_code == trace.StatusCode.ERROR
+    assert insert.status.description == "duplicate key"
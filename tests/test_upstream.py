@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from upstream import CircuitBreaker, CircuitOpenError, UpstreamBusyError, UpstreamClient, UpstreamError
+
+pytestmark = pytest.mark.anyio
+
+def client(handler, **options) -> UpstreamClient:
+    options.setdefault("retries", 0)
+    options.setdefault("backoff_base", 0)
+    return UpstreamClient("flight", "http://upstream", transport=httpx.MockTransport(handler), **options)
+
+async def test_server_errors_are_retried_and_open_the_breaker():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    upstream = client(handler, retries=2, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    with pytest.raises(UpstreamError):
+        await upstream.get("/status")
+    assert len(calls) == 3
+    assert upstream.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        await upstream.get("/status")
+    assert len(calls) == 3
+
+async def test_client_errors_are_not_retried_and_keep_the_breaker_closed():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(404)
+
+    upstream = client(handler, retries=2, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(UpstreamError) as rejected:
+        await upstream.get("/status")
+    assert not rejected.value.retryable
+    assert len(calls) == 1
+    assert upstream.breaker.state == "closed"
+
+async def test_waiting_too_long_for_a_slot_does_not_count_against_the_upstream():
+    release = asyncio.Event()
+
+    async def handler(request):
+        await release.wait()
+        return httpx.Response(200, json={"ok": True})
+
+    upstream = client(handler, timeout=0.05, max_concurrency=1, retries=2, breaker=CircuitBreaker(failure_threshold=1))
+    in_flight = asyncio.create_task(upstream.get("/status"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(UpstreamBusyError) as busy:
+        await upstream.get("/status")
+    assert busy.value.retryable
+    assert (upstream.breaker.state, upstream.breaker.failures) == ("closed", 0)
+
+    release.set()
+    assert await in_flight == {"ok": True}
+    assert await upstream.get("/status") == {"ok": True}
+    await upstream.aclose()
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+def test_every_step_runs_after_the_steps_it_depends_on():
+    waves = server.validation_waves()
+    assert waves == [[1, 2], [3, 4], [5], [6]]
+    wave_of = {step: n for n, wave in enumerate(waves) for step in wave}
+    for step, dependencies in server.STEP_DEPENDENCIES.items():
+        assert all(wave_of[dependency] < wave_of[step] for dependency in dependencies)
+
+async def test_weather_and_eligibility_checks_overlap(mock_db, monkeypatch):
+    services = server.external_services
+    weather_started = asyncio.Event()
+    eligibility_started = asyncio.Event()
+    get_weather, check_eligibility = services.get_weather, services.check_eligibility
+
+    async def slow_weather(*args):
+        weather_started.set()
+        # Only returns if the eligibility check starts while this one is still running
+        await asyncio.wait_for(eligibility_started.wait(), timeout=2)
+        return await get_weather(*args)
+
+    async def slow_eligibility(*args):
+        eligibility_started.set()
+        await asyncio.wait_for(weather_started.wait(), timeout=2)
+        return await check_eligibility(*args)
+
+    monkeypatch.setattr(services, "get_weather", slow_weather)
+    monkeypatch.setattr(services, "check_eligibility", slow_eligibility)
+
+    started = await server.start_claim(policy_number="WAVES-0001")
+    validated = await server.validate_claim(started["id"])
+    assert [step["status"] for step in validated["claim"]["validation_steps"]] == ["completed"] * 6